@@ -0,0 +1,89 @@
+# bbserver/booking/async_views.py
+
+"""
+Async versions of the booking read views, routed instead of the sync ones
+when settings.ASYNC_READ_VIEWS is on (the ASGI serving mode). They return the
+same responses as their counterparts in views.py; a week snapshot hit is
+served without leaving the event loop.
+"""
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
+
+from common.fastjson import FastJsonResponse
+from common import counters
+from common.models import DateHasDish
+from common.serializers import DATE_HAS_DISH_COLUMNS, date_has_dish_row
+from . import export
+from .views import (
+    RateDishView, dish_detail_query, dish_history_query, export_response, logger, parse_history_page, render_dish,
+    render_week_rows, week_bounds, week_rows,
+)
+from .week_cache import week_menu_cache, week_key
+
+_rate_dish_view = sync_to_async(RateDishView.as_view())
+
+
+async def get_week_dishes(request):
+    """
+    Async get_week_dishes: GET /booking/week?date=2025-01-15
+    """
+    date_str = request.GET.get('date', None)
+    start_date, end_date = week_bounds(date_str)
+    logger.debug("week date=%s start=%s end=%s", date_str, start_date, end_date)
+
+    async def build():
+        return render_week_rows(start_date, [row async for row in week_rows(start_date, end_date)])
+
+    # Hits return without leaving the event loop; concurrent misses share one build
+    body = await week_menu_cache.aget_or_build(week_key(start_date), build)
+    return HttpResponse(body, content_type='application/json')
+
+
+@csrf_exempt
+async def rate_dish(request):
+    """
+    GET /booking/rate/?date_has_dish_id=<id> natively async; the other
+    methods are handed to the sync RateDishView.
+    """
+    if request.method != 'GET':
+        return await _rate_dish_view(request)
+
+    dhd_id = request.GET.get('date_has_dish_id')
+    if not dhd_id:
+        return FastJsonResponse({'detail': 'Missing date_has_dish_id'}, status=400)
+    rows = [row async for row in DateHasDish.objects.filter(pk=dhd_id).values_list(*DATE_HAS_DISH_COLUMNS)]
+    if not rows:
+        return FastJsonResponse({'detail': 'Not found'}, status=404)
+    return FastJsonResponse(date_has_dish_row(rows[0], timezone.get_current_timezone()))
+
+
+@require_GET
+async def export_menus(request):
+    """
+    Async export_menus, streamed from an async iterator so ASGI sends each
+    piece as it is encoded.
+    """
+    return export_response(request, export.astream_export)
+
+
+@require_GET
+async def get_dish(request, dish_id):
+    """
+    Async get_dish: GET /booking/dish/<dish_id>/?before=YYYY-MM-DD&limit=20
+    """
+    try:
+        before, limit = parse_history_page(request.GET)
+    except ValueError as e:
+        return FastJsonResponse({'error': str(e)}, status=400)
+
+    row = await dish_detail_query(dish_id).afirst()
+    if row is None:
+        return FastJsonResponse({'error': 'Dish not found'}, status=404)
+
+    history = [entry async for entry in dish_history_query(dish_id, before, limit)]
+    attendance = await counters.aattendance_totals([entry[0] for entry in history[:limit]])
+    return FastJsonResponse(render_dish(row, history, attendance, limit), status=200)
@@ -0,0 +1,178 @@
+# bbserver/booking/export.py
+
+"""
+Streaming export of served menus, attendance and ratings for a date range.
+
+One flat record per (date, dish) link, or a single record with empty dish
+columns for a date that has no dishes. Rows come from one LEFT JOIN query
+walked in date order along the date_saved primary key and the
+(date, dish_id) unique index, so SQLite never sorts or materializes the
+range: memory stays constant and the first bytes go out as soon as the
+first chunk is read, however many years are requested.
+"""
+
+import csv
+import io
+from datetime import datetime
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from common.models import AttendanceShard, DateSaved
+from common.fastjson import dumps
+from common.serializers import DISH_FIELDS, format_datetime
+
+FORMATS = ('ndjson', 'csv')
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+COLUMNS = (
+    'date', 'attendance', 'date_has_dish_id', *DISH_FIELDS,
+    'quantity', 'rating_sum', 'rating_count', 'average_rating',
+)
+
+# Rows fetched from SQLite per round trip
+CHUNK_SIZE = 2000
+
+# Encoded output is handed to the server in pieces of about this size
+FLUSH_BYTES = 64 * 1024
+
+_QUERY_COLUMNS = (
+    'date_saved', 'attendance', 'pending', 'datehasdish__pk', 'datehasdish__dish_id',
+    *(f'datehasdish__dish_id__{field}' for field in DISH_FIELDS[1:]),
+    'datehasdish__quantity', 'datehasdish__rating_sum', 'datehasdish__rating_count',
+)
+_CREATED_AT = COLUMNS.index('created_at')
+
+
+def parse_range(start, end):
+    """
+    Parse 'YYYY-MM-DD' bounds into (start, end) dates. Raises ValueError if
+    either is missing or invalid, or if end is before start.
+    """
+    if not start or not end:
+        raise ValueError('Provide both start and end as YYYY-MM-DD.')
+    try:
+        start, end = (datetime.strptime(value, '%Y-%m-%d').date() for value in (start, end))
+    except ValueError:
+        raise ValueError('Invalid date. Use YYYY-MM-DD.')
+    if end < start:
+        raise ValueError('end must not be before start.')
+    return start, end
+
+
+def export_rows(start, end):
+    """
+    values_list() queryset of the export rows for ``start``..``end``
+    (inclusive), attendance including unfolded shard counts.
+    """
+    shard_sum = (
+        AttendanceShard.objects
+        .filter(date_saved=OuterRef('pk'))
+        .values('date_saved')
+        .annotate(total=Sum('count'))
+        .values('total')
+    )
+    return (
+        DateSaved.objects
+        .filter(date_saved__gte=start, date_saved__lte=end)
+        .annotate(pending=Coalesce(Subquery(shard_sum), 0))
+        .order_by('date_saved', 'datehasdish__dish_id')
+        .values_list(*_QUERY_COLUMNS)
+    )
+
+
+def export_record(row, tz):
+    """
+    Turn an export_rows() tuple into the list of COLUMNS values.
+    """
+    day, attendance, pending, *link = row
+    rating_sum, rating_count = link[-2], link[-1]
+    record = [day.isoformat(), (attendance or 0) + pending, *link]
+    if link[0] is None:
+        # Date without dishes: the LEFT JOIN leaves every link column empty
+        record.append(None)
+        return record
+    record[_CREATED_AT] = format_datetime(record[_CREATED_AT], tz)
+    record[_CREATED_AT + 1] = format_datetime(record[_CREATED_AT + 1], tz)
+    record.append(rating_sum / rating_count if rating_count else None)
+    return record
+
+
+class ExportEncoder:
+    """
+    Encode export records as NDJSON lines or CSV rows (with a header).
+    """
+
+    def __init__(self, fmt):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown export format {fmt!r}. Use one of: {', '.join(FORMATS)}.")
+        self.fmt = fmt
+        self.tz = timezone.get_current_timezone()
+        if fmt == 'csv':
+            self._text = io.StringIO()
+            self._writer = csv.writer(self._text)
+
+    def header(self):
+        if self.fmt == 'csv':
+            return self._csv_line(COLUMNS)
+        return b''
+
+    def encode(self, row):
+        record = export_record(row, self.tz)
+        if self.fmt == 'csv':
+            return self._csv_line(record)
+        return dumps(dict(zip(COLUMNS, record))) + b'\n'
+
+    def _csv_line(self, values):
+        self._writer.writerow(values)
+        line = self._text.getvalue()
+        self._text.seek(0)
+        self._text.truncate()
+        return line.encode('utf-8')
+
+
+def stream_export(start, end, fmt='ndjson', chunk_size=CHUNK_SIZE):
+    """
+    Yield the encoded export for ``start``..``end`` in pieces of roughly
+    FLUSH_BYTES.
+    """
+    encoder = ExportEncoder(fmt)
+    buffer = bytearray(encoder.header())
+    for row in export_rows(start, end).iterator(chunk_size=chunk_size):
+        buffer += encoder.encode(row)
+        if len(buffer) >= FLUSH_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+async def astream_export(start, end, fmt='ndjson', chunk_size=CHUNK_SIZE):
+    """
+    Async version of stream_export(), for StreamingHttpResponse under ASGI
+    (which would otherwise read a sync iterator to the end before sending).
+    """
+    encoder = ExportEncoder(fmt)
+    buffer = bytearray(encoder.header())
+    # QuerySet.aiterator() runs a values_list() query on the event loop, so
+    # the chunks are pulled from a sync iterator on the ORM thread instead
+    rows = export_rows(start, end).iterator(chunk_size=chunk_size)
+    next_chunk = sync_to_async(lambda: list(islice(rows, chunk_size)))
+    try:
+        while chunk := await next_chunk():
+            for row in chunk:
+                buffer += encoder.encode(row)
+            if len(buffer) >= FLUSH_BYTES:
+                yield bytes(buffer)
+                buffer.clear()
+        if buffer:
+            yield bytes(buffer)
+    finally:
+        await sync_to_async(rows.close)()
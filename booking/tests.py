@@ -0,0 +1,458 @@
+import asyncio
+import json
+import threading
+import time
+from datetime import date, timedelta
+
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from booking import async_views, views
+from booking.week_cache import WeekMenuCache, week_key, week_menu_cache
+from common import counters
+from common.changes import watcher
+from common.dish_stats import check_dish_stats, rebuild_dish_stats
+from common.models import AttendanceShard, Dish, DateSaved, DateHasDish
+from common.forecast import forecaster
+from common.signals import RATINGS, menu_changed
+
+
+class WeekMenuCacheTests(TestCase):
+    """
+    Snapshot hits, invalidation and coalescing of concurrent misses.
+    """
+
+    def setUp(self):
+        self.cache = WeekMenuCache()
+        self.builds = 0
+
+    def build(self, body=b'{}', delay=0.0):
+        def builder():
+            self.builds += 1
+            time.sleep(delay)
+            return body
+        return builder
+
+    def test_hit(self):
+        key = week_key(date(2025, 1, 15))
+        self.assertEqual(self.cache.get_or_build(key, self.build(b'a')), b'a')
+        self.assertEqual(self.cache.get_or_build(key, self.build(b'b')), b'a')
+        self.assertEqual(self.builds, 1)
+
+    def test_invalidated_by_menu_changed(self):
+        key = week_key(date(2025, 1, 15))
+        week_menu_cache.get_or_build(key, self.build(b'a'))
+        menu_changed.send(sender=None, dates={date(2025, 1, 14)})
+        self.assertIsNone(week_menu_cache.get(key))
+        self.assertEqual(week_menu_cache.get_or_build(key, self.build(b'b')), b'b')
+
+    def test_build_racing_invalidation_is_not_stored(self):
+        key = week_key(date(2025, 1, 15))
+
+        def builder():
+            self.cache.invalidate({key})
+            return b'stale'
+        self.assertEqual(self.cache.get_or_build(key, builder), b'stale')
+        self.assertIsNone(self.cache.get(key))
+
+    def test_concurrent_misses_build_once(self):
+        key = week_key(date(2025, 1, 15))
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.cache.get_or_build(key, self.build(delay=0.05))))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [b'{}'] * 8)
+        self.assertEqual(self.builds, 1)
+
+    def test_concurrent_async_misses_build_once(self):
+        key = week_key(date(2025, 1, 15))
+
+        async def builder():
+            self.builds += 1
+            await asyncio.sleep(0.05)
+            return b'{}'
+
+        async def misses():
+            return await asyncio.gather(*[self.cache.aget_or_build(key, builder) for _ in range(8)])
+
+        self.assertEqual(asyncio.run(misses()), [b'{}'] * 8)
+        self.assertEqual(self.builds, 1)
+        self.assertEqual(asyncio.run(self.cache.aget_or_build(key, builder)), b'{}')
+        self.assertEqual(self.builds, 1)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class CrossProcessInvalidationTests(TestCase):
+    """
+    Writes that bypass menu_changed (another process, the admin, raw SQL)
+    reach the week snapshots through common.changes.
+    """
+
+    def setUp(self):
+        week_menu_cache.clear()
+        watcher.poll(force=True)
+
+    def week(self):
+        return json.loads(self.client.get('/booking/week/', {'date': '2030-03-04'}).content)['dishes']
+
+    def test_raw_write_invalidates_week(self):
+        dish = Dish.objects.create(dish_name='Soup', dish_type='main')
+        DateSaved.objects.create(date_saved=date(2030, 3, 4), attendance=0)
+        watcher.poll(force=True)
+        self.assertEqual(self.week(), [])
+
+        # What a management command in another process does: no signal here
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO date_has_dish (date, dish_id, rating_sum, rating_count) VALUES (%s, %s, 0, 0)',
+                ['2030-03-04', dish.pk],
+            )
+        self.assertEqual(self.week(), [])
+        self.assertEqual(watcher.poll(force=True), {date(2030, 3, 4)})
+        self.assertEqual([entry['dish']['dish_name'] for entry in self.week()], ['Soup'])
+
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE dish SET dish_name = %s WHERE dish_id = %s', ['Stew', dish.pk])
+        watcher.poll(force=True)
+        self.assertEqual([entry['dish']['dish_name'] for entry in self.week()], ['Stew'])
+
+    def test_raw_rating_keeps_forecast(self):
+        dish = Dish.objects.create(dish_name='Soup', dish_type='main')
+        DateSaved.objects.create(date_saved=date(2030, 3, 4), attendance=0)
+        link = DateHasDish.objects.create(date_saved_id=date(2030, 3, 4), dish_id=dish)
+        watcher.poll(force=True)
+        self.assertEqual([entry['rating_count'] for entry in self.week()], [0])
+        forecaster.invalidate()
+        fitted = forecaster.current()
+
+        received = []
+        menu_changed.connect(lambda sender, dates, kind, **kwargs: received.append((dates, kind)), weak=False,
+                             dispatch_uid='test_raw_rating')
+        self.addCleanup(menu_changed.disconnect, dispatch_uid='test_raw_rating')
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE date_has_dish SET rating_sum = 4, rating_count = 1 WHERE date_has_dish_id = %s',
+                           [link.pk])
+        self.assertEqual(watcher.poll(force=True), {date(2030, 3, 4)})
+        self.assertEqual(received, [({date(2030, 3, 4)}, RATINGS)])
+        self.assertIs(forecaster.cached(), fitted)
+        self.assertEqual([entry['rating_count'] for entry in self.week()], [1])
+
+    def test_unrelated_weeks_stay_cached(self):
+        week_menu_cache.get_or_build(week_key(date(2030, 3, 11)), lambda: b'cached')
+        dish = Dish.objects.create(dish_name='Soup', dish_type='main')
+        DateSaved.objects.create(date_saved=date(2030, 3, 4), attendance=0)
+        DateHasDish.objects.create(date_saved_id=date(2030, 3, 4), dish_id=dish)
+        watcher.poll(force=True)
+        self.assertEqual(week_menu_cache.get(week_key(date(2030, 3, 11))), b'cached')
+
+    def test_async_view_sees_raw_write(self):
+        dish = Dish.objects.create(dish_name='Soup', dish_type='main')
+        DateSaved.objects.create(date_saved=date(2030, 3, 4), attendance=0)
+
+        def get():
+            request = AsyncRequestFactory().get('/booking/week/', {'date': '2030-03-04'})
+            return json.loads(async_to_sync(async_views.get_week_dishes)(request).content)['dishes']
+
+        self.assertEqual(get(), [])
+        DateHasDish.objects.create(date_saved_id=date(2030, 3, 4), dish_id=dish)
+        watcher.poll(force=True)
+        self.assertEqual(len(get()), 1)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class BulkAttendanceTests(TestCase):
+    """
+    bulk-attendance applies every change or none.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        DateSaved.objects.create(date_saved=date(2025, 1, 13), attendance=5)
+        DateSaved.objects.create(date_saved=date(2025, 1, 14), attendance=0)
+
+    def post(self, changes):
+        return self.client.post('/booking/bulk-attendance/', json.dumps(changes), content_type='application/json')
+
+    def attendance(self):
+        return dict(DateSaved.objects.values_list('date_saved', 'attendance'))
+
+    def test_applies_all(self):
+        response = self.post({'changes': [
+            {'date': '2025-01-13', 'delta': 1}, {'date': '2025-01-13', 'delta': 1}, {'date': '2025-01-15', 'delta': 1},
+        ]})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(json.loads(response.content)['results'], [
+            {'date': '2025-01-13', 'delta': 2, 'attendance': 7, 'created': False},
+            {'date': '2025-01-15', 'delta': 1, 'attendance': 1, 'created': True},
+        ])
+
+    def test_negative_rolls_back_batch(self):
+        before = self.attendance()
+        response = self.post([
+            {'date': '2025-01-13', 'delta': 1}, {'date': '2025-01-14', 'delta': -1}, {'date': '2025-01-15', 'delta': 1},
+        ])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(json.loads(response.content)['dates'], ['2025-01-14'])
+        self.assertEqual(self.attendance(), before)
+
+    def test_unfolded_bookings_count(self):
+        counters.increment(date(2025, 1, 14), 1)
+        response = self.post([{'date': '2025-01-14', 'delta': -1}])
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(json.loads(response.content)['results'][0]['attendance'], 0)
+
+    def test_invalid_item_applies_nothing(self):
+        before = self.attendance()
+        response = self.post([{'date': '2025-01-13', 'delta': 1}, {'date': '2025-01-14', 'delta': 2}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.attendance(), before)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class RateDishBatchTests(TestCase):
+    """
+    Each validation branch of the batch rating endpoint rejects the whole
+    batch.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        past, future = date(2025, 1, 13), timezone.now().date() + timedelta(days=30)
+        dish = Dish.objects.create(dish_name='Soup', dish_type='main')
+        for day in (past, future):
+            DateSaved.objects.create(date_saved=day, attendance=0)
+        cls.rated = DateHasDish.objects.create(date_saved_id=past, dish_id=dish, rating_sum=4, rating_count=1)
+        cls.unrated = DateHasDish.objects.create(date_saved_id=past, dish_id=Dish.objects.create(
+            dish_name='Stew', dish_type='main'))
+        cls.future = DateHasDish.objects.create(date_saved_id=future, dish_id=dish)
+
+    def send(self, method, items):
+        return getattr(self.client, method)(
+            '/booking/rate/batch/', json.dumps({'items': items}), content_type='application/json',
+        )
+
+    def ratings(self):
+        return sorted(DateHasDish.objects.values_list('pk', 'rating_sum', 'rating_count'))
+
+    def test_rates_all(self):
+        response = self.send('post', [
+            {'date_has_dish_id': self.rated.pk, 'rating': 5}, {'date_has_dish_id': self.unrated.pk, 'rating': 3},
+        ])
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(
+            [(row['rating_sum'], row['rating_count']) for row in json.loads(response.content)['results']],
+            [(9, 2), (3, 1)],
+        )
+
+    def test_missing_is_not_found(self):
+        before = self.ratings()
+        response = self.send('post', [
+            {'date_has_dish_id': self.rated.pk, 'rating': 5}, {'date_has_dish_id': 999999, 'rating': 5},
+        ])
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(json.loads(response.content)['missing'], [999999])
+        self.assertEqual(self.ratings(), before)
+
+    def test_future_is_bad_request(self):
+        before = self.ratings()
+        response = self.send('post', [
+            {'date_has_dish_id': self.rated.pk, 'rating': 5}, {'date_has_dish_id': self.future.pk, 'rating': 5},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.content)['date_has_dish_ids'], [self.future.pk])
+        self.assertEqual(self.ratings(), before)
+
+    def test_underflow_is_bad_request(self):
+        before = self.ratings()
+        response = self.send('delete', [
+            {'date_has_dish_id': self.rated.pk, 'rating': 4}, {'date_has_dish_id': self.unrated.pk, 'rating': 2},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.content)['date_has_dish_ids'], [self.unrated.pk])
+        self.assertEqual(self.ratings(), before)
+
+
+def sync_response(view, path, params=None, *args):
+    response = view(RequestFactory().get(path, params or {}), *args)
+    if hasattr(response, 'render'):
+        # DRF responses
+        response.render()
+    content = b''.join(response.streaming_content) if response.streaming else response.content
+    return response.status_code, content
+
+
+def async_response(view, path, params=None, *args):
+    async def run():
+        response = await view(AsyncRequestFactory().get(path, params or {}), *args)
+        if response.streaming:
+            return response.status_code, b''.join([chunk async for chunk in response.streaming_content])
+        return response.status_code, response.content
+    return async_to_sync(run)()
+
+
+class AsyncViewParityTests(TestCase):
+    """
+    The async read views routed under ASYNC_READ_VIEWS return the same
+    status and body as their sync counterparts.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        soup, stew = (Dish.objects.create(dish_name=name, dish_type='main') for name in ('Soup', 'Crème stew'))
+        cls.soup = soup
+        for i, day in enumerate((date(2025, 1, 13), date(2025, 1, 14), date(2025, 1, 20))):
+            DateSaved.objects.create(date_saved=day, attendance=10 + i)
+            DateHasDish.objects.create(date_saved_id=day, dish_id=soup, quantity=5, rating_sum=7, rating_count=2)
+        cls.link = DateHasDish.objects.create(date_saved_id=date(2025, 1, 13), dish_id=stew)
+        counters.increment(date(2025, 1, 14), 3)
+
+    def assertSameResponse(self, sync_view, async_view, path, params=None, *args):
+        week_menu_cache.clear()
+        expected = sync_response(sync_view, path, params, *args)
+        week_menu_cache.clear()
+        self.assertEqual(async_response(async_view, path, params, *args), expected)
+        return expected
+
+    def test_week(self):
+        for params in ({'date': '2025-01-15'}, {'date': 'bad'}, {}):
+            self.assertSameResponse(views.get_week_dishes, async_views.get_week_dishes, '/booking/week/', params)
+
+    def test_rate(self):
+        sync_view = views.RateDishView.as_view()
+        for params in ({'date_has_dish_id': self.link.pk}, {'date_has_dish_id': 999999}, {}):
+            status, _ = self.assertSameResponse(sync_view, async_views.rate_dish, '/booking/rate/', params)
+        self.assertEqual(status, 400)
+
+    def test_export(self):
+        statuses = [
+            self.assertSameResponse(views.export_menus, async_views.export_menus, '/booking/export/', params)[0]
+            for params in (
+                {'start': '2025-01-01', 'end': '2025-01-31'},
+                {'start': '2025-01-01', 'end': '2025-01-31', 'format': 'csv'},
+                {'format': 'xml'},
+            )
+        ]
+        self.assertEqual(statuses, [200, 200, 400])
+
+    def test_dish(self):
+        statuses = [
+            self.assertSameResponse(
+                views.get_dish, async_views.get_dish, f'/booking/dish/{dish_id}/', params, dish_id,
+            )[0]
+            for dish_id, params in (
+                (self.soup.pk, {}), (self.soup.pk, {'before': '2025-01-20', 'limit': 1}),
+                (self.soup.pk, {'limit': 0}), (999999, {}),
+            )
+        ]
+        self.assertEqual(statuses, [200, 200, 400, 404])
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class DeleteTests(TestCase):
+    """
+    Batch deletes are all or nothing and take dependent rows with them.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.future = timezone.now().date() + timedelta(days=7)
+        cls.soup, cls.stew, cls.unused = (
+            Dish.objects.create(dish_name=name, dish_type='main') for name in ('Soup', 'Stew', 'Unused')
+        )
+        for day in (date(2025, 1, 13), cls.future):
+            DateSaved.objects.create(date_saved=day, attendance=0)
+            DateHasDish.objects.create(date_saved_id=day, dish_id=cls.soup)
+        DateHasDish.objects.create(date_saved_id=cls.future, dish_id=cls.stew)
+        counters.increment(cls.future, 1)
+        rebuild_dish_stats()
+
+    def delete(self, path, payload=None):
+        if payload is None:
+            return self.client.delete(path)
+        return self.client.delete(path, json.dumps(payload), content_type='application/json')
+
+    def test_delete_dishes(self):
+        response = self.delete('/booking/delete-dishes/', {'dish_ids': [self.unused.pk, self.stew.pk, 0]})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(json.loads(response.content), {
+            'error': 'Dishes not found', 'missing': [0], 'linked': [self.stew.pk],
+        })
+        response = self.delete('/booking/delete-dishes/', {'dish_ids': [self.unused.pk, self.stew.pk]})
+        self.assertEqual((response.status_code, json.loads(response.content)['linked']), (400, [self.stew.pk]))
+        self.assertEqual(Dish.objects.count(), 3)
+
+        self.assertEqual(self.delete('/booking/delete-dishes/', {'dish_ids': [self.unused.pk]}).status_code, 204)
+        self.assertFalse(Dish.objects.filter(pk=self.unused.pk).exists())
+
+    def test_delete_future_dates(self):
+        response = self.delete('/booking/delete-future-dates/', {'dates': ['2025-01-13', self.future.isoformat()]})
+        self.assertEqual((response.status_code, json.loads(response.content)['past']), (400, ['2025-01-13']))
+        response = self.delete('/booking/delete-future-dates/', {'dates': [self.future.isoformat(), '2099-01-01']})
+        self.assertEqual((response.status_code, json.loads(response.content)['missing']), (404, ['2099-01-01']))
+        self.assertTrue(DateHasDish.objects.filter(date_saved=self.future).exists())
+
+        self.assertEqual(
+            self.delete('/booking/delete-future-dates/', {'dates': [self.future.isoformat()]}).status_code, 204,
+        )
+        self.assertFalse(DateSaved.objects.filter(date_saved=self.future).exists())
+        self.assertFalse(DateHasDish.objects.filter(date_saved=self.future).exists())
+        self.assertFalse(AttendanceShard.objects.filter(date_saved=self.future).exists())
+        self.assertEqual(check_dish_stats(), [])
+
+    def test_delete_date(self):
+        self.assertEqual(self.delete('/booking/date/2025-01-13/').status_code, 204)
+        self.assertFalse(DateHasDish.objects.filter(date_saved=date(2025, 1, 13)).exists())
+        self.assertEqual(self.delete('/booking/date/2025-01-13/').status_code, 404)
+        self.assertEqual(self.delete('/booking/date/bad/').status_code, 400)
+        self.assertEqual(check_dish_stats(), [])
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class DishDetailTests(TestCase):
+    """
+    Dish detail pages through the serving history newest first.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dish = Dish.objects.create(dish_name='Soup', dish_type='main')
+        cls.days = [date(2025, 1, 13) - timedelta(days=7 * i) for i in range(6)]
+        for i, day in enumerate(cls.days):
+            DateSaved.objects.create(date_saved=day, attendance=10 + i)
+            DateHasDish.objects.create(date_saved_id=day, dish_id=cls.dish, quantity=i, rating_sum=4, rating_count=1)
+        counters.increment(cls.days[0], 2)
+        rebuild_dish_stats()
+
+    def get(self, dish_id, **params):
+        return self.client.get(f'/booking/dish/{dish_id}/', params)
+
+    def test_pages(self):
+        seen, params = [], {'limit': 4}
+        while True:
+            body = json.loads(self.get(self.dish.pk, **params).content)
+            seen += [entry['date'] for entry in body['history']]
+            if not body['next_before']:
+                break
+            params['before'] = body['next_before']
+        self.assertEqual(seen, [day.isoformat() for day in self.days])
+        self.assertEqual(body['dish']['dish_name'], 'Soup')
+        self.assertEqual(body['stats']['times_served'], 6)
+        self.assertEqual(body['stats']['average_rating'], 4.0)
+
+    def test_history_entries(self):
+        first = json.loads(self.get(self.dish.pk, limit=1).content)['history'][0]
+        # Includes bookings not folded yet
+        self.assertEqual(first['attendance'], 12)
+        self.assertEqual(first['quantity'], 0)
+
+    def test_errors(self):
+        self.assertEqual(self.get(0).status_code, 404)
+        self.assertEqual(self.get(self.dish.pk, limit=0).status_code, 400)
+        self.assertEqual(self.get(self.dish.pk, before='bad').status_code, 400)
@@ -1,15 +1,27 @@
 # bbserver/booking/urls.py
 
+from django.conf import settings
 from django.urls import path
-from . import views
-from .views import RateDishView
+from . import views, async_views
+from .views import RateDishView, RateDishBatchView
+
+# Read views: async versions under ASGI (see settings.ASYNC_READ_VIEWS)
+read_views = async_views if settings.ASYNC_READ_VIEWS else views
+rate_view = async_views.rate_dish if settings.ASYNC_READ_VIEWS else RateDishView.as_view()
 
 
 urlpatterns = [
-    path('week/', views.get_week_dishes, name='week_dishes'),
+    path('week/', read_views.get_week_dishes, name='week_dishes'),
     path('add-attendance/', views.add_attendance, name='add_attendance'),
     path('remove-attendance/', views.remove_attendance, name='remove_attendance'),
+    path('bulk-attendance/', views.bulk_attendance, name='bulk_attendance'),
     # path('week/', views.get_week_dishes, name='week'),
     # path('week/<int:week>/', views.get_week_dishes, name='week_id'),
-    path('rate/', RateDishView.as_view(), name='rate_dish'),
+    path('rate/', rate_view, name='rate_dish'),
+    path('rate/batch/', RateDishBatchView.as_view(), name='rate_dish_batch'),
+    path('export/', read_views.export_menus, name='export_menus'),
+    path('dish/<int:dish_id>/', read_views.get_dish, name='dish_detail'),
+    path('delete-dishes/', views.delete_dishes, name='delete_dishes'),
+    path('delete-future-dates/', views.delete_future_dates, name='delete_future_dates'),
+    path('date/<str:date_id>/', views.delete_date, name='delete_date'),
 ]
@@ -1,33 +1,42 @@
 # bbserver/booking/views.py
 
 import json
-from django.http import JsonResponse, HttpResponseBadRequest, HttpResponseNotAllowed
+import logging
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.views.decorators.csrf import csrf_exempt
-from django.db import transaction
+from django.db import transaction, IntegrityError
 
 from common.models import Dish, DateSaved, DateHasDish
-from common.serializers import DishSerializer, DateHasDishSerializer
+from common.serializers import (
+    DishSerializer, DateHasDishSerializer, DATE_HAS_DISH_COLUMNS, DISH_FIELDS, date_has_dish_row, date_has_dish_rows,
+    dish_row,
+)
+from common.signals import RATINGS, notify_menu_changed
+from common import counters, deletes, dish_stats
+from common.fastjson import FastJsonResponse, dumps
+from common.timing import timed
+from .week_cache import week_menu_cache, week_key
+from . import export
 from datetime import datetime
-from django.db.models import Q, F
+from django.db.models import Q, F, Case, When, Value, IntegerField
+from django.db.models.functions import Coalesce
 from django.utils import timezone
-from django.core.exceptions import ObjectDoesNotExist
 from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_GET, require_http_methods
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 
+logger = logging.getLogger(__name__)
 
 
-def get_week_dishes(request):
+def week_bounds(date_str):
     """
-    Retrieve dishes for the week containing the date provided via query parameter, e.g.:
-    GET /booking/week?date=2025-01-15
+    Return (Monday, Friday) of the week containing ``date_str`` (YYYY-MM-DD),
+    or of the current week if it is missing or invalid.
     """
-    # Read ?date=YYYY-MM-DD from query params
-    date_str = request.GET.get('date', None)
-
     if date_str:
         try:
             # Convert the string to a date object
@@ -44,65 +53,205 @@ def get_week_dishes(request):
     monday_offset = current_date.weekday()  # 0=Monday, 6=Sunday
     start_date = current_date - timezone.timedelta(days=monday_offset)
     end_date = start_date + timezone.timedelta(days=4)  # Monday + 4 days = Friday
+    return start_date, end_date
+
+
+def get_week_dishes(request):
+    """
+    Retrieve dishes for the week containing the date provided via query parameter, e.g.:
+    GET /booking/week?date=2025-01-15
+    """
+    # Read ?date=YYYY-MM-DD from query params
+    date_str = request.GET.get('date', None)
+    start_date, end_date = week_bounds(date_str)
 
-    # Debug info
-    print("\n\nDebugging Info:")
-    print(f"Current Date Param: {date_str}")
-    print(f"Start Date (Monday): {start_date}, End Date (Friday): {end_date}")
+    logger.debug("week date=%s start=%s end=%s", date_str, start_date, end_date)
 
-    # Retrieve dishes for Monday-to-Friday of that week
-    date_has_dishes = DateHasDish.objects.filter(date_saved__date_saved__gte=start_date, date_saved__date_saved__lte=end_date)
+    # Serve the rendered week straight from the snapshot cache when possible
+    body = week_menu_cache.get_or_build(
+        week_key(start_date),
+        lambda: render_week_dishes(start_date, end_date),
+    )
+    return HttpResponse(body, content_type='application/json')
 
-    # Print the number of DateHasDish instances retrieved for debugging
-    print(f"Number of DateHasDish instances: {len(date_has_dishes)}\n")
 
-    dishes_info = []
-    
-    
-    
-    for dhd in date_has_dishes:
-        try:
-            # Base dish data
-            dish_data = DishSerializer(dhd.dish_id).data
-            # Format date string
-            date_str = dhd.date_saved.date_saved.strftime("%Y-%m-%d")
+def week_rows(start_date, end_date):
+    """
+    DATE_HAS_DISH_COLUMNS rows for Monday-to-Friday of a week, joining the
+    dish in the same query.
+    """
+    return (
+        DateHasDish.objects
+        .filter(date_saved__gte=start_date, date_saved__lte=end_date)
+        .order_by('date_saved', 'pk')
+        .values_list(*DATE_HAS_DISH_COLUMNS)
+    )
+
 
+def render_week_dishes(start_date, end_date):
+    """
+    Render the JSON body of get_week_dishes for Monday-to-Friday of a week.
+    """
+    return render_week_rows(start_date, list(week_rows(start_date, end_date)))
+
+
+def render_week_rows(start_date, rows):
+    """
+    Render the JSON body of get_week_dishes from already fetched week_rows().
+    """
+    logger.debug("week %s rendered %d DateHasDish rows", start_date, len(rows))
+
+    with timed('render'):
+        tz = timezone.get_current_timezone()
+        dishes_info = []
+        for row in rows:
+            dhd = date_has_dish_row(row, tz)
             # Append all relevant fields, including rating aggregates
             dishes_info.append({
-                'date_has_dish_id': dhd.pk,
-                'dish': dish_data,
-                'date': date_str,
-                'quantity': dhd.quantity,
-                'rating_sum': dhd.rating_sum,
-                'rating_count': dhd.rating_count,
-                'average_rating': dhd.average_rating,
+                'date_has_dish_id': dhd['date_has_dish_id'],
+                'dish': dhd['dish'],
+                'date': dhd['date_saved']['date_saved'],
+                'quantity': dhd['quantity'],
+                'rating_sum': dhd['rating_sum'],
+                'rating_count': dhd['rating_count'],
+                'average_rating': dhd['average_rating'],
             })
-        except ObjectDoesNotExist:
-            print(f"No DateSaved found for DateHasDish ID: {dhd.pk}")
 
-    return JsonResponse({'dishes': dishes_info})
+        return dumps({'dishes': dishes_info})
 
 
-def get_dish(request, dish_id):
+def export_response(request, stream):
     """
-    Get details of a dish, including associated dates.
+    Validate the export query parameters and wrap ``stream(start, end, fmt)``
+    in a StreamingHttpResponse.
     """
+    fmt = request.GET.get('format', 'ndjson')
+    if fmt not in export.FORMATS:
+        return FastJsonResponse({'error': f"Invalid format. Use one of: {', '.join(export.FORMATS)}."}, status=400)
     try:
-        dish = Dish.objects.get(pk=dish_id)
-        dish_serializer = DishSerializer(dish)
+        start, end = export.parse_range(request.GET.get('start'), request.GET.get('end'))
+    except ValueError as e:
+        return FastJsonResponse({'error': str(e)}, status=400)
 
-        date_has_dishes = DateHasDish.objects.filter(dish_id=dish).order_by('-date')
-        date_list = [str(date_has_dish.date) for date_has_dish in date_has_dishes]
+    response = StreamingHttpResponse(stream(start, end, fmt), content_type=export.CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="menus_{start}_{end}.{fmt}"'
+    return response
 
-        response_data = {
-            'dish': dish_serializer.data,
-            'dates': date_list,
-        }
 
-        return JsonResponse(response_data, status=200)
+@require_GET
+def export_menus(request):
+    """
+    Stream menus, attendance and ratings for a date range:
+    GET /booking/export/?start=2024-01-01&end=2024-12-31&format=ndjson|csv
+    """
+    return export_response(request, export.stream_export)
+
+
+# Serving history entries per page of get_dish
+DISH_HISTORY_LIMIT = 20
+DISH_HISTORY_MAX_LIMIT = 100
+
+DISH_STATS_COLUMNS = (
+    'stats__times_served', 'stats__last_served', 'stats__rating_sum', 'stats__rating_count', 'stats__attendance_sum',
+)
+
+
+def parse_history_page(params):
+    """
+    Return (before, limit) from ?before=YYYY-MM-DD&limit=N. Raises ValueError.
+    """
+    before = params.get('before')
+    if before:
+        try:
+            before = datetime.strptime(before, '%Y-%m-%d').date()
+        except ValueError:
+            raise ValueError('Invalid before date. Use YYYY-MM-DD.')
+    try:
+        limit = int(params.get('limit', DISH_HISTORY_LIMIT))
+    except ValueError:
+        raise ValueError('limit must be an integer.')
+    if not 1 <= limit <= DISH_HISTORY_MAX_LIMIT:
+        raise ValueError(f'limit must be between 1 and {DISH_HISTORY_MAX_LIMIT}.')
+    return before or None, limit
+
+
+def dish_detail_query(dish_id):
+    """
+    The dish's DISH_FIELDS and DishStats columns in one row.
+    """
+    return Dish.objects.filter(pk=dish_id).values_list(*DISH_FIELDS, *DISH_STATS_COLUMNS)
+
+
+def dish_history_query(dish_id, before, limit):
+    """
+    One page of (date, quantity, rating_sum, rating_count), newest first, plus
+    one extra row that tells whether another page follows. The keyset seek on
+    date_has_dish_dish_date_idx reads only the page's entries however often
+    the dish was served.
+    """
+    links = DateHasDish.objects.filter(dish_id=dish_id)
+    if before is not None:
+        links = links.filter(date_saved__lt=before)
+    return (
+        links.order_by('-date_saved')
+        .values_list('date_saved', 'quantity', 'rating_sum', 'rating_count')[:limit + 1]
+    )
+
+
+def render_dish(row, history, attendance, limit):
+    """
+    Build the get_dish response from a dish_detail_query row, a
+    dish_history_query page and {date: total attendance} of its dates.
+    """
+    times_served, last_served, rating_sum, rating_count, attendance_sum = row[len(DISH_FIELDS):]
+    page = history[:limit]
+    return {
+        'dish': dish_row(row[:len(DISH_FIELDS)], timezone.get_current_timezone()),
+        'stats': {
+            'times_served': times_served or 0,
+            'last_served': last_served.isoformat() if last_served else None,
+            'average_rating': rating_sum / rating_count if rating_count else None,
+            'average_attendance': attendance_sum / times_served if times_served else None,
+        },
+        'history': [
+            {
+                'date': day.isoformat(),
+                'attendance': attendance.get(day),
+                'quantity': quantity,
+                'rating_sum': entry_rating_sum,
+                'rating_count': entry_rating_count,
+                'average_rating': entry_rating_sum / entry_rating_count if entry_rating_count else None,
+            }
+            for day, quantity, entry_rating_sum, entry_rating_count in page
+        ],
+        # Pass as ?before= for the next (older) page
+        'next_before': page[-1][0].isoformat() if len(history) > limit else None,
+    }
+
+
+@require_GET
+def get_dish(request, dish_id):
+    """
+    Get details of a dish, including where it has been served.
+
+    GET /booking/dish/<dish_id>/?before=YYYY-MM-DD&limit=20
 
-    except Dish.DoesNotExist:
-        return JsonResponse({'error': 'Dish not found'}, status=404)
+    Returns the dish, its lifetime stats (from DishStats) and one page of its
+    serving history, newest first: date, attendance, quantity and ratings.
+    ``next_before`` is the ``before`` of the next page, or null on the last.
+    """
+    try:
+        before, limit = parse_history_page(request.GET)
+    except ValueError as e:
+        return FastJsonResponse({'error': str(e)}, status=400)
+
+    row = dish_detail_query(dish_id).first()
+    if row is None:
+        return FastJsonResponse({'error': 'Dish not found'}, status=404)
+
+    history = list(dish_history_query(dish_id, before, limit))
+    attendance = counters.attendance_totals([entry[0] for entry in history[:limit]])
+    return FastJsonResponse(render_dish(row, history, attendance, limit), status=200)
 
 
 @csrf_exempt
@@ -115,105 +264,117 @@ def update_dish(request, dish_id):
 
     # Check if the dish has associated DateHasDish entries
     if DateHasDish.objects.filter(dish_id=dish_id).exists():
-        return JsonResponse({'error': 'Cannot update dish with associated DateHasDish entries'}, status=400)
+        return FastJsonResponse({'error': 'Cannot update dish with associated DateHasDish entries'}, status=400)
 
     # Update Dish
     dish_serializer = DishSerializer(instance=dish, data=data.get('dish', {}), partial=True)
     if dish_serializer.is_valid():
         dish_serializer.save()
-        return JsonResponse({'message': 'Entry updated successfully'}, status=200)
+        return FastJsonResponse({'message': 'Entry updated successfully'}, status=200)
     else:
-        return JsonResponse({'error': dish_serializer.errors}, status=400)
+        return FastJsonResponse({'error': dish_serializer.errors}, status=400)
 
 
+@require_http_methods(["DELETE"])
 @csrf_exempt
 def delete_dishes(request):
     """
     Delete one or more dishes if they have no associated DateHasDish entries.
+
+    DELETE /booking/delete-dishes/
+    {"dish_ids": [ID, ...]}
+
+    All or nothing: if any dish does not exist (404, "missing") or is still
+    on a date (400, "linked"), none are deleted.
     """
     try:
         data = json.loads(request.body)
         dish_ids = data.get('dish_ids', [])
 
-        if not dish_ids:
+        if not isinstance(dish_ids, list) or not dish_ids or not all(isinstance(i, int) for i in dish_ids):
             return HttpResponseBadRequest('Invalid dish IDs format. Please provide a list of dish IDs.')
 
-        with transaction.atomic():
-            for dish_id in dish_ids:
-                try:
-                    dish = Dish.objects.get(pk=dish_id)
-                except Dish.DoesNotExist:
-                    continue  # Skip this dish_id if it doesn't exist
-
-                date_has_dishes = DateHasDish.objects.filter(dish_id=dish_id)
-                if date_has_dishes.exists():
-                    return JsonResponse({
-                        'error': f'DateHasDish entries exist for Dish ID {dish_id}, cannot delete Dish'
-                    }, status=400)
-
-                # If no DateHasDish entries, proceed with deletion
-                dish.delete()
-
-            return JsonResponse({'message': 'Dishes deleted successfully'}, status=204)
+        deletes.delete_dishes(dish_ids)
+        return FastJsonResponse({'message': 'Dishes deleted successfully'}, status=204)
 
+    except deletes.DeleteError as e:
+        if e.missing:
+            return FastJsonResponse({'error': 'Dishes not found', 'missing': e.missing, 'linked': e.linked}, status=404)
+        return FastJsonResponse({
+            'error': 'DateHasDish entries exist for these dishes, cannot delete them', 'missing': [], 'linked': e.linked,
+        }, status=400)
     except json.JSONDecodeError:
         return HttpResponseBadRequest('Invalid JSON format. Please provide a valid JSON payload.')
     except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
+        return FastJsonResponse({'error': str(e)}, status=500)
 
 
+def parse_dates(values):
+    """
+    Parse a non-empty list of 'YYYY-MM-DD' strings into a set of dates.
+    Raises ValueError.
+    """
+    if not isinstance(values, list) or not values:
+        raise ValueError('Invalid dates format. Please provide a list of dates in YYYY-MM-DD format.')
+    try:
+        return {datetime.strptime(str(value), '%Y-%m-%d').date() for value in values}
+    except ValueError:
+        raise ValueError('Invalid dates format. Please provide a list of dates in YYYY-MM-DD format.')
+
+
+@require_http_methods(["DELETE"])
 @csrf_exempt
 def delete_future_dates(request):
     """
     Delete future dates and associated entries (if any).
+
+    DELETE /booking/delete-future-dates/
+    {"dates": ["YYYY-MM-DD", ...]}
+
+    Past dates and today are refused (400, "past") since they hold booked
+    attendance and ratings. If any date does not exist (404, "missing"),
+    none are deleted.
     """
     try:
         data = json.loads(request.body)
-        dates_to_delete = data.get('dates', [])
+        dates_to_delete = parse_dates(data.get('dates', []))
 
-        if not dates_to_delete:
-            return HttpResponseBadRequest('Invalid dates format. Please provide a list of dates in YYYY-MM-DD format.')
+        today = timezone.now().date()
+        past = sorted(day.isoformat() for day in dates_to_delete if day <= today)
+        if past:
+            return FastJsonResponse({'error': 'Only future dates can be deleted', 'past': past}, status=400)
 
-        with transaction.atomic():
-            for date_to_delete in dates_to_delete:
-                date_instance = get_date_instance(date_to_delete)
-                if date_instance:
-                    date_has_dishes = DateHasDish.objects.filter(date=date_instance)
-                    date_has_dishes.delete()
-                    date_instance.delete()
-                else:
-                    return JsonResponse({'error': f'Date not found for {date_to_delete}'}, status=404)
-
-        return JsonResponse({'message': 'Dates and associated entries deleted successfully'}, status=204)
+        deletes.delete_dates(dates_to_delete)
+        return FastJsonResponse({'message': 'Dates and associated entries deleted successfully'}, status=204)
 
+    except deletes.DeleteError as e:
+        return FastJsonResponse({'error': 'Dates not found', 'missing': e.missing}, status=404)
     except json.JSONDecodeError:
         return HttpResponseBadRequest('Invalid JSON format. Please provide a valid JSON payload.')
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
     except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
-
-
-def get_date_instance(date_str):
-    """
-    Get a Date instance based on a date string.
-    """
-    try:
-        return Date.objects.get(date=date_str)
-    except Date.DoesNotExist:
-        return None
+        return FastJsonResponse({'error': str(e)}, status=500)
 
 
+@require_http_methods(["DELETE"])
+@csrf_exempt
 def delete_date(request, date_id):
     """
     Delete a specific date and associated entries.
-    """
-    date_instance = get_object_or_404(Date, pk=date_id)
 
-    with transaction.atomic():
-        date_has_dishes = DateHasDish.objects.filter(date=date_instance)
-        date_has_dishes.delete()
-        date_instance.delete()
+    DELETE /booking/date/<YYYY-MM-DD>/
+    """
+    try:
+        day = datetime.strptime(date_id, '%Y-%m-%d').date()
+    except ValueError:
+        return HttpResponseBadRequest('Invalid date format. Use YYYY-MM-DD.')
 
-    return JsonResponse({'message': 'Date deleted successfully'}, status=204)
+    try:
+        deletes.delete_dates([day])
+    except deletes.DeleteError:
+        return FastJsonResponse({'error': 'Date not found', 'missing': [day.isoformat()]}, status=404)
+    return FastJsonResponse({'message': 'Date deleted successfully'}, status=204)
 
 
 @csrf_exempt
@@ -222,24 +383,16 @@ def add_attendance(request):
         try:
             data = request.body.decode('utf-8')
             dates = json.loads(data)  # directly parse into a list of date strings
-            print("DATA:", dates)
+            logger.debug("add attendance dates=%s", dates)
 
             for date_str in dates:
-                print("Date String:", date_str)
-                date_saved, created = DateSaved.objects.get_or_create(date_saved=date_str)
-                print("DishDate:", date_saved, "Created:", created)
-
-                if date_saved is not None:
-                    date_saved.attendance = F('attendance') + 1
-                    date_saved.save()
-                    print("SAVED +1")
-                else:
-                    raise ValueError(f"DateSaved not found for date: {date_str}")
-
-            return JsonResponse({'message': 'Attendance added successfully'}, status=200)
+                # Single-row UPDATE on one of the date's attendance shards
+                counters.increment(date_str, 1)
+
+            return FastJsonResponse({'message': 'Attendance added successfully'}, status=200)
         except Exception as e:
-            print("Error:", e)
-            return JsonResponse({'error': str(e)}, status=500)
+            logger.exception("add attendance failed")
+            return FastJsonResponse({'error': str(e)}, status=500)
     else:
         return HttpResponseNotAllowed(['POST'])
 
@@ -251,27 +404,145 @@ def remove_attendance(request):
             data = json.loads(request.body)
             dates = data  # this is already a list of date strings
 
-            for date_str in dates:
-                date_saved = DateSaved.objects.get(date_saved=date_str)
-                if date_saved is not None:
-                    if date_saved.attendance is not None and date_saved.attendance > 0:
-                        date_saved.attendance = F('attendance') - 1
-                        date_saved.save()
-                        print("SAVED -1")
-                    else:
-                        raise ValueError(f"Attendance count is already 0 for date: {date_str}")
-                else:
-                    raise ValueError(f"DateSaved not found for date: {date_str}")
-
-            return JsonResponse({'message': 'Attendance removed successfully'}, status=200)
+            # All dates or none; each decrement checks the total in the same UPDATE
+            with transaction.atomic():
+                for date_str in dates:
+                    removed = counters.decrement(date_str)
+                    if removed is None:
+                        raise ValueError(f"DateSaved not found for date: {date_str}")
+                    if not removed:
+                        raise AttendanceConflict([date_str])
+            logger.debug("remove attendance dates=%s", dates)
+
+            return FastJsonResponse({'message': 'Attendance removed successfully'}, status=200)
+        except AttendanceConflict as e:
+            logger.warning("remove attendance conflict: %s", e.dates)
+            return FastJsonResponse({
+                'error': f"Attendance count is already 0 for date: {e.dates[0]}; no changes were applied.",
+                'dates': e.dates,
+            }, status=409)
         except Exception as e:
-            print("Error:", e)
-            return JsonResponse({'error': str(e)}, status=500)
+            logger.warning("remove attendance failed: %s", e)
+            return FastJsonResponse({'error': str(e)}, status=500)
     else:
         return HttpResponseNotAllowed(['DELETE'])
-    
-    
-    
+
+
+class AttendanceConflict(Exception):
+    """
+    Raised inside bulk_attendance's and remove_attendance's transaction to
+    roll back every change when a date would end up with negative
+    attendance.
+    """
+
+    def __init__(self, dates):
+        super().__init__(dates)
+        self.dates = dates
+
+
+def parse_attendance_changes(payload):
+    """
+    Collapse a bulk attendance payload into an ordered {date: net_delta} dict.
+
+    Accepts either {"changes": [{"date": "YYYY-MM-DD", "delta": 1 | -1}, ...]}
+    or the bare list. Raises ValueError on malformed entries.
+    """
+    changes = payload.get('changes') if isinstance(payload, dict) else payload
+    if not isinstance(changes, list) or not changes:
+        raise ValueError('Provide a non-empty list of {"date", "delta"} changes.')
+
+    deltas = {}
+    for change in changes:
+        if not isinstance(change, dict):
+            raise ValueError(f'Invalid change entry: {change!r}')
+        try:
+            day = datetime.strptime(str(change.get('date')), '%Y-%m-%d').date()
+        except ValueError:
+            raise ValueError(f"Invalid date {change.get('date')!r}. Use YYYY-MM-DD.")
+        delta = change.get('delta')
+        if delta not in (1, -1) or isinstance(delta, bool):
+            raise ValueError(f'Invalid delta {delta!r} for {day.isoformat()}. Use 1 or -1.')
+        deltas[day] = deltas.get(day, 0) + delta
+    return deltas
+
+
+def apply_attendance_deltas(deltas):
+    """
+    Apply {date: delta} to DateSaved.attendance with one UPDATE, one SELECT
+    and (if needed) one bulk INSERT. Must run inside a transaction; raises
+    AttendanceConflict if any date's total (including unfolded shard counts)
+    would drop below zero.
+
+    Returns {date: (total attendance, created)}.
+    """
+    dates = list(deltas)
+
+    # Write first so the transaction takes SQLite's write lock up front
+    DateSaved.objects.filter(date_saved__in=dates).update(
+        attendance=Case(
+            *[When(date_saved=day, then=Coalesce(F('attendance'), 0) + Value(delta))
+              for day, delta in deltas.items()],
+            default=F('attendance'),
+        )
+    )
+    results = {day: (attendance, False) for day, attendance in counters.attendance_totals(dates).items()}
+    # Only dates that already existed can have dishes
+    dish_stats.add_attendance({day: deltas[day] for day in results})
+
+    missing = [day for day in dates if day not in results]
+    DateSaved.objects.bulk_create(
+        [DateSaved(date_saved=day, attendance=deltas[day]) for day in missing]
+    )
+    results.update({day: (deltas[day], True) for day in missing})
+
+    negative = sorted(day.isoformat() for day, (attendance, _) in results.items() if attendance < 0)
+    if negative:
+        raise AttendanceConflict(negative)
+    return results
+
+
+@csrf_exempt
+def bulk_attendance(request):
+    """
+    Apply a whole booking's attendance changes in one transaction:
+    POST /booking/bulk-attendance/
+    { "changes": [{ "date": "YYYY-MM-DD", "delta": 1 | -1 }, ...] }
+
+    Either every change is applied or none is. Returns the resulting
+    attendance per date.
+    """
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+
+    try:
+        deltas = parse_attendance_changes(json.loads(request.body))
+    except json.JSONDecodeError:
+        return FastJsonResponse({'error': 'Invalid JSON payload.'}, status=400)
+    except ValueError as e:
+        return FastJsonResponse({'error': str(e)}, status=400)
+
+    try:
+        with transaction.atomic():
+            results = apply_attendance_deltas(deltas)
+    except AttendanceConflict as e:
+        return FastJsonResponse({
+            'error': 'Attendance cannot drop below 0; no changes were applied.',
+            'dates': e.dates,
+        }, status=409)
+    except Exception as e:
+        return FastJsonResponse({'error': str(e)}, status=500)
+
+    return FastJsonResponse({'results': [
+        {
+            'date': day.isoformat(),
+            'delta': delta,
+            'attendance': results[day][0],
+            'created': results[day][1],
+        }
+        for day, delta in deltas.items()
+    ]}, status=200)
+
+
 class RateDishView(APIView):
     """
     GET  /booking/rate/?date_has_dish_id=<id>  
@@ -323,10 +594,14 @@ class RateDishView(APIView):
 
 
         # Atomic update
-        DateHasDish.objects.filter(pk=dhd_id).update(
-            rating_sum=F('rating_sum') + rating,
-            rating_count=F('rating_count') + 1
-        )
+        with transaction.atomic():
+            DateHasDish.objects.filter(pk=dhd_id).update(
+                rating_sum=F('rating_sum') + rating,
+                rating_count=F('rating_count') + 1
+            )
+            dish_stats.add_ratings({dhd.dish_id_id: (rating, 1)})
+        notify_menu_changed([dhd.date_saved_id], RATINGS)
+        logger.debug("rated date_has_dish=%s rating=%s", dhd_id, rating)
         # Refresh & serialize
         dhd.refresh_from_db()
         serializer = DateHasDishSerializer(dhd)
@@ -376,9 +651,12 @@ class RateDishView(APIView):
 
 
         # Atomic update: subtract old, add new
-        DateHasDish.objects.filter(pk=dhd_id).update(
-            rating_sum=F('rating_sum') - old + new
-        )
+        with transaction.atomic():
+            DateHasDish.objects.filter(pk=dhd_id).update(
+                rating_sum=F('rating_sum') - old + new
+            )
+            dish_stats.add_ratings({dhd.dish_id_id: (new - old, 0)})
+        notify_menu_changed([dhd.date_saved_id], RATINGS)
         dhd.refresh_from_db()
         serializer = DateHasDishSerializer(dhd)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -424,12 +702,160 @@ class RateDishView(APIView):
 
 
         # Atomic removal
-        DateHasDish.objects.filter(pk=dhd_id).update(
-            rating_sum=F('rating_sum') - rating,
-            rating_count=F('rating_count') - 1
-        )
+        with transaction.atomic():
+            DateHasDish.objects.filter(pk=dhd_id).update(
+                rating_sum=F('rating_sum') - rating,
+                rating_count=F('rating_count') - 1
+            )
+            dish_stats.add_ratings({dhd.dish_id_id: (-rating, -1)})
+        notify_menu_changed([dhd.date_saved_id], RATINGS)
         dhd.refresh_from_db()
         serializer = DateHasDishSerializer(dhd)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+
+
+def parse_rating(value, name='rating'):
+    """
+    Convert a rating to an int in 1..5, raising ValueError with a client-facing message.
+    """
+    try:
+        rating = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be an integer')
+    if rating < 1 or rating > 5:
+        raise ValueError(f'{name} must be 1–5')
+    return rating
+
+
+class RateDishBatchView(APIView):
+    """
+    Batch variants of RateDishView, so a whole week can be rated in one call.
+
+    GET    /booking/rate/batch/?ids=1,2,3
+    POST   /booking/rate/batch/  { items: [{ date_has_dish_id, rating }, ...] }
+    PUT    /booking/rate/batch/  { items: [{ date_has_dish_id, old_rating, new_rating }, ...] }
+    DELETE /booking/rate/batch/  { items: [{ date_has_dish_id, rating }, ...] }
+
+    Writes are all-or-nothing: every item is validated with one query, the
+    aggregates move with one UPDATE in a transaction and the refreshed rows
+    come back from one read.
+    """
+    def get(self, request):
+        try:
+            ids = [int(i) for i in request.GET.get('ids', '').split(',') if i.strip()]
+        except ValueError:
+            return Response({'detail': 'ids must be a comma-separated list of integers'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not ids:
+            return Response({'detail': 'Missing ids'}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = self.fetch(ids)
+        found = {row['date_has_dish_id'] for row in results}
+        return Response({'results': results, 'missing': [i for i in dict.fromkeys(ids) if i not in found]})
+
+    def post(self, request):
+        def parse(item):
+            return parse_rating(item.get('rating')), 1
+        return self.apply(request, parse, 'rate')
+
+    def put(self, request):
+        def parse(item):
+            old = parse_rating(item.get('old_rating'), 'old_rating')
+            new = parse_rating(item.get('new_rating'), 'new_rating')
+            return new - old, 0
+        return self.apply(request, parse, 'update rating of')
+
+    def delete(self, request):
+        def parse(item):
+            return -parse_rating(item.get('rating')), -1
+        return self.apply(request, parse, 'delete rating from')
+
+    def fetch(self, ids):
+        """
+        Serialize the given DateHasDish rows (in request order) from one query.
+        """
+        by_id = {dhd['date_has_dish_id']: dhd for dhd in date_has_dish_rows(DateHasDish.objects.filter(pk__in=ids))}
+        return [by_id[i] for i in dict.fromkeys(ids) if i in by_id]
+
+    def apply(self, request, parse_item, verb):
+        """
+        Validate and apply per-item (rating_sum delta, rating_count delta) pairs
+        produced by ``parse_item``.
+        """
+        items = request.data.get('items') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items:
+            return Response({'detail': 'items must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+
+        sum_deltas, count_deltas = {}, {}
+        for item in items:
+            if not isinstance(item, dict) or not item.get('date_has_dish_id'):
+                return Response({'detail': 'Every item requires date_has_dish_id'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            try:
+                dhd_id = int(item['date_has_dish_id'])
+                sum_delta, count_delta = parse_item(item)
+            except (TypeError, ValueError) as e:
+                return Response({'detail': str(e), 'item': item}, status=status.HTTP_400_BAD_REQUEST)
+            sum_deltas[dhd_id] = sum_deltas.get(dhd_id, 0) + sum_delta
+            count_deltas[dhd_id] = count_deltas.get(dhd_id, 0) + count_delta
+
+        ids = list(sum_deltas)
+
+        # Validate every item with one query
+        current = {
+            pk: (dish_date, rating_sum, rating_count, dish_id)
+            for pk, dish_date, rating_sum, rating_count, dish_id in DateHasDish.objects
+            .filter(pk__in=ids)
+            .values_list('pk', 'date_saved', 'rating_sum', 'rating_count', 'dish_id')
+        }
+        missing = [i for i in ids if i not in current]
+        if missing:
+            return Response({'detail': 'Not found', 'missing': missing}, status=status.HTTP_404_NOT_FOUND)
+
+        today = timezone.now().date()
+        future = [i for i in ids if current[i][0] > today]
+        if future:
+            return Response({
+                'detail': f"Can only {verb} past dishes. today={today.isoformat()}",
+                'date_has_dish_ids': future,
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        underflow = [
+            i for i in ids
+            if current[i][1] + sum_deltas[i] < 0 or current[i][2] + count_deltas[i] < 0
+        ]
+        if underflow:
+            return Response({'detail': 'No ratings to delete', 'date_has_dish_ids': underflow},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # Apply every delta with one UPDATE
+        updates = {
+            'rating_sum': Case(
+                *[When(pk=i, then=F('rating_sum') + Value(d)) for i, d in sum_deltas.items() if d],
+                default=F('rating_sum'),
+                output_field=IntegerField(),
+            ),
+        }
+        if any(count_deltas.values()):
+            updates['rating_count'] = Case(
+                *[When(pk=i, then=F('rating_count') + Value(d)) for i, d in count_deltas.items() if d],
+                default=F('rating_count'),
+                output_field=IntegerField(),
+            )
+        dish_deltas = {}
+        for i in ids:
+            sum_delta, count_delta = dish_deltas.get(current[i][3], (0, 0))
+            dish_deltas[current[i][3]] = (sum_delta + sum_deltas[i], count_delta + count_deltas[i])
+        try:
+            with transaction.atomic():
+                DateHasDish.objects.filter(pk__in=ids).update(**updates)
+                dish_stats.add_ratings(dish_deltas)
+                notify_menu_changed((current[i][0] for i in ids), RATINGS)
+        except IntegrityError:
+            # A concurrent delete took the aggregates below zero; nothing was applied
+            return Response({'detail': 'Ratings changed concurrently, please retry'},
+                            status=status.HTTP_409_CONFLICT)
+
+        return Response({'results': self.fetch(ids)}, status=status.HTTP_200_OK)
@@ -0,0 +1,132 @@
+# bbserver/booking/week_cache.py
+
+"""
+In-process snapshots of the rendered ``booking/week/`` JSON body, keyed by ISO
+week. Entries are dropped whenever ``common.signals.menu_changed`` fires for a
+date in that week, so cache hits never touch SQLite. Changes committed by
+other processes arrive as ``menu_changed`` too, from ``common.changes``
+within CHANGE_POLL_SECONDS.
+"""
+
+import asyncio
+import threading
+
+from django.dispatch import receiver
+
+from common.signals import menu_changed
+
+# Roughly two years of weeks; the oldest snapshot is evicted first.
+MAX_WEEKS = 104
+
+# Misses for different weeks share one of these build locks
+BUILD_LOCK_STRIPES = 16
+
+
+def week_key(day):
+    """
+    Return the (ISO year, ISO week) key for a date.
+    """
+    iso = day.isocalendar()
+    return (iso[0], iso[1])
+
+
+class WeekMenuCache:
+    """
+    Thread-safe map of week key -> rendered JSON bytes.
+
+    Concurrent misses for the same week are coalesced: the first thread
+    rebuilds while the others wait on the week's build lock (one of a fixed
+    set of stripes) and then reuse its result; under ASGI, coroutines await
+    the first one's build task instead. A generation counter per week makes
+    sure a rebuild that raced with an invalidation is not stored.
+    """
+
+    def __init__(self, max_weeks=MAX_WEEKS):
+        self.max_weeks = max_weeks
+        self._entries = {}
+        self._generations = {}
+        self._build_locks = [threading.Lock() for _ in range(BUILD_LOCK_STRIPES)]
+        # (event loop, key) -> build task, only touched from that loop's thread
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self._entries.get(key)
+
+    def get_or_build(self, key, builder):
+        """
+        Return the cached body for ``key``, calling ``builder()`` to render it
+        on a miss.
+        """
+        body = self._entries.get(key)
+        if body is not None:
+            return body
+
+        with self._build_locks[hash(key) % len(self._build_locks)]:
+            # Another thread may have rebuilt it while we were waiting
+            body = self._entries.get(key)
+            if body is not None:
+                return body
+
+            generation = self._generations.get(key, 0)
+            body = builder()
+            self.store(key, body, generation)
+            return body
+
+    async def aget_or_build(self, key, builder):
+        """
+        Async get_or_build: ``builder()`` returns an awaitable, and every
+        coroutine that misses while it runs awaits the same build.
+        """
+        body = self._entries.get(key)
+        if body is not None:
+            return body
+
+        task_key = (asyncio.get_running_loop(), key)
+        task = self._tasks.get(task_key)
+        if task is None:
+            task = asyncio.ensure_future(self._abuild(key, builder, self.generation(key)))
+            self._tasks[task_key] = task
+            task.add_done_callback(lambda done: self._tasks.pop(task_key, None))
+        # A cancelled waiter must not cancel the build the others wait on
+        return await asyncio.shield(task)
+
+    async def _abuild(self, key, builder, generation):
+        body = await builder()
+        self.store(key, body, generation)
+        return body
+
+    def store(self, key, body, generation):
+        """
+        Store ``body`` unless the week was invalidated after ``generation``
+        was read.
+        """
+        with self._lock:
+            if self._generations.get(key, 0) != generation:
+                return
+            if key not in self._entries and len(self._entries) >= self.max_weeks:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = body
+
+    def generation(self, key):
+        return self._generations.get(key, 0)
+
+    def invalidate(self, keys):
+        with self._lock:
+            for key in keys:
+                self._generations[key] = self._generations.get(key, 0) + 1
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            for key in set(self._entries) | set(self._generations):
+                self._generations[key] = self._generations.get(key, 0) + 1
+            self._entries.clear()
+
+
+week_menu_cache = WeekMenuCache()
+
+
+@receiver(menu_changed)
+def invalidate_week_snapshots(sender, dates, **kwargs):
+    week_menu_cache.invalidate({week_key(d) for d in dates})
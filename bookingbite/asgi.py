@@ -14,5 +14,20 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bookingbite.settings')
+# Serve the read endpoints with their async views (see README, ASGI mode)
+os.environ.setdefault('ASYNC_READ_VIEWS', 'True')
+# Each ASGI request runs its sync code in a fresh thread, so a persistent
+# per-thread connection would never be reused
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
+
+# Build the in-process dish autocomplete index before the first request
+from django.db import DatabaseError  # noqa: E402
+from chef_management.autocomplete import dish_index  # noqa: E402
+
+try:
+    dish_index.warm()
+except DatabaseError:
+    # Not migrated yet; the index is built on first use instead
+    pass
@@ -8,6 +8,8 @@ import os
 from pathlib import Path
 from dotenv import load_dotenv
 
+from common.log import parse_levels
+
 # ─── BASE PATHS ───────────────────────────────────────────────────────────────
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -52,6 +54,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its total covers the rest of the stack (see common/middleware.py)
+    "common.middleware.ServerTimingMiddleware",
+    "common.middleware.MetricsMiddleware",
+    "common.middleware.ChangePollMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -83,13 +89,101 @@ TEMPLATES = [
 WSGI_APPLICATION = "bookingbite.wsgi.application"
 
 # ─── DATABASE ─────────────────────────────────────────────────────────────────
+# CONN_MAX_AGE: seconds a connection is reused across requests (one per
+# Waitress thread); 0 closes it after every request, "none" keeps it forever
+conn_max_age = os.getenv("DB_CONN_MAX_AGE", "600").strip().lower()
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "CONN_MAX_AGE": None if conn_max_age == "none" else int(conn_max_age),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            # Seconds the sqlite3 driver waits on a locked database
+            "timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")) / 1000,
+        },
     }
 }
 
+# PRAGMAs applied to every new SQLite connection (see common/db.py).
+# Set a variable to an empty string to leave that PRAGMA at SQLite's default.
+SQLITE_PRAGMAS = {
+    # WAL lets readers run while a write is in progress
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    # NORMAL is durable against application crashes in WAL mode
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"),
+    "mmap_size": os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)),
+    # Negative values are KiB: 64 MiB page cache per connection
+    "cache_size": os.getenv("SQLITE_CACHE_SIZE", "-65536"),
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+}
+
+# ─── ATTENDANCE COUNTERS ──────────────────────────────────────────────────────
+# Bookings increment one of N shard rows per date instead of a single hot row
+ATTENDANCE_SHARDS = int(os.getenv("ATTENDANCE_SHARDS", "8"))
+
+# ─── CROSS-PROCESS INVALIDATION ───────────────────────────────────────────────
+# Seconds between checks for menu changes committed by other processes
+# (management commands, admin, shell); see common/changes.py
+CHANGE_POLL_SECONDS = float(os.getenv("CHANGE_POLL_SECONDS", "1"))
+
+# ─── REQUEST TIMING ───────────────────────────────────────────────────────────
+# Server-Timing header + "bookingbite.timing" log line per request
+SERVER_TIMING = os.getenv("SERVER_TIMING", "True").lower() == "true"
+
+# ─── METRICS ──────────────────────────────────────────────────────────────────
+# Client addresses allowed to GET /metrics/; proxied requests are always refused
+raw_metrics_ips = os.getenv("METRICS_ALLOWED_IPS", "127.0.0.1,::1")
+METRICS_ALLOWED_IPS = [ip.strip() for ip in raw_metrics_ips.split(",") if ip.strip()]
+
+# ─── LOGGING ──────────────────────────────────────────────────────────────────
+# Request threads only enqueue records; a background thread writes them as
+# JSON lines to a rotating file (see common/log.py). LOG_FILE="" logs to stderr.
+LOG_FILE = os.getenv("LOG_FILE", str(BASE_DIR / "logs" / "bookingbite.log"))
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Per-module overrides, e.g. LOG_LEVELS="booking.views=DEBUG,bookingbite.timing=WARNING"
+LOG_LEVELS = parse_levels(os.getenv("LOG_LEVELS", ""))
+# Keep only a fraction of sub-WARNING records per module, e.g. "booking.views=0.01"
+LOG_SAMPLING = os.getenv("LOG_SAMPLING", "")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "filters": {
+        "sampling": {"()": "common.log.SamplingFilter", "rates": LOG_SAMPLING},
+    },
+    "handlers": {
+        "queue": {
+            "()": "common.log.queue_handler",
+            "filename": LOG_FILE,
+            "max_bytes": int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+            "backup_count": int(os.getenv("LOG_BACKUP_COUNT", "5")),
+            "filters": ["sampling"],
+        },
+    },
+    "root": {"handlers": ["queue"], "level": "WARNING"},
+    "loggers": {
+        **{name: {"level": LOG_LEVEL} for name in ("booking", "chef_management", "common", "bookingbite")},
+        **{name: {"level": level} for name, level in LOG_LEVELS.items()},
+    },
+}
+
+# ─── ASGI ─────────────────────────────────────────────────────────────────────
+# Route the read endpoints to their async views. bookingbite/asgi.py turns this
+# on; leave it off under Waitress (WSGI), where async views gain nothing.
+ASYNC_READ_VIEWS = os.getenv("ASYNC_READ_VIEWS", "False").lower() == "true"
+
+# ─── DJANGO REST FRAMEWORK ────────────────────────────────────────────────────
+REST_FRAMEWORK = {
+    # orjson-backed when installed (see common/fastjson.py)
+    "DEFAULT_RENDERER_CLASSES": [
+        "common.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+}
+
 # ─── AUTHENTICATION & PASSWORD VALIDATION ────────────────────────────────────
 AUTH_PASSWORD_VALIDATORS = [
     {
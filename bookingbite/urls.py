@@ -12,10 +12,13 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.views.generic import TemplateView
 
+from common.views import metrics
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('chef-management/', include('chef_management.urls')),
     path('booking/', include('booking.urls')),
+    path('metrics/', metrics, name='metrics'),
 ]
 
 # Serve static files during development
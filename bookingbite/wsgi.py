@@ -16,3 +16,13 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bookingbite.settings')
 
 application = get_wsgi_application()
+
+# Build the in-process dish autocomplete index before the first request
+from django.db import DatabaseError  # noqa: E402
+from chef_management.autocomplete import dish_index  # noqa: E402
+
+try:
+    dish_index.warm()
+except DatabaseError:
+    # Not migrated yet; the index is built on first use instead
+    pass
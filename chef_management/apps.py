@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ChefManagementConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'chef_management'
+
+    def ready(self):
+        # Connect the Dish receivers that keep the autocomplete index current
+        from . import autocomplete  # noqa: F401
@@ -0,0 +1,88 @@
+# bbserver/chef_management/async_views.py
+
+"""
+Async versions of the chef-management read views, routed instead of the sync
+ones when settings.ASYNC_READ_VIEWS is on (the ASGI serving mode). They
+return the same responses as their counterparts in views.py.
+"""
+
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
+
+from common import counters
+from common.fastjson import FastJsonResponse
+from common.forecast import forecaster
+from common.models import Dish
+from common.serializers import DISH_FIELDS, dish_row
+from . import catalog, search
+from .autocomplete import dish_index
+from .views import day_rows, like_matches, render_day_dishes
+
+
+async def dish_payloads(queryset):
+    tz = timezone.get_current_timezone()
+    return [dish_row(row, tz) async for row in queryset.values_list(*DISH_FIELDS)]
+
+
+@require_GET
+async def search_dishes(request):
+    """
+    Async search_dishes: same query string, modes and response.
+    """
+    q = request.GET.get('q', '').strip()
+    if not q:
+        return FastJsonResponse({'results': []})
+    category = request.GET.get('category', '').strip()
+    mode = request.GET.get('mode', '').strip().lower()
+
+    if mode == 'prefix':
+        # In memory once built; bookingbite/asgi.py builds it at startup
+        if not dish_index.built:
+            await sync_to_async(dish_index.warm)()
+        return FastJsonResponse({'results': dish_index.complete(q, category)})
+
+    if mode == 'fts' and search.build_match_query(q) and await sync_to_async(search.fts_available)():
+        ids = await sync_to_async(search.search_dish_ids)(q, category)
+        by_id = {payload['dish_id']: payload for payload in await dish_payloads(Dish.objects.filter(pk__in=ids))}
+        return FastJsonResponse({'results': [by_id[i] for i in ids if i in by_id]})
+
+    return FastJsonResponse({'results': await dish_payloads(like_matches(q, category))})
+
+
+@csrf_exempt
+async def get_day_dishes(request, date_str=None):
+    """
+    Async get_day_dishes: dishes and attendance for a date (default today).
+    """
+    try:
+        if date_str:
+            try:
+                date_instance = datetime.strptime(date_str, '%Y-%m-%d').date()
+            except ValueError:
+                return FastJsonResponse({'error': 'Invalid date format. Use YYYY-MM-DD.'}, status=400)
+        else:
+            date_instance = timezone.now().date()
+
+        rows = [row async for row in day_rows(date_instance)]
+        attendance_amount = await counters.aattendance_total(date_instance)
+        forecast = forecaster.cached() or await sync_to_async(forecaster.current)()
+        return render_day_dishes(rows, attendance_amount, forecast.get(date_instance))
+
+    except Exception as e:
+        return FastJsonResponse({'error': str(e)}, status=500)
+
+
+@require_GET
+async def list_dishes(request):
+    """
+    Async list_dishes: same filters, pages and response.
+    """
+    try:
+        rows, fields, limit = catalog.catalog_query(request.GET)
+    except ValueError as e:
+        return FastJsonResponse({'error': str(e)}, status=400)
+    return FastJsonResponse(catalog.render_catalog([row async for row in rows], fields, limit))
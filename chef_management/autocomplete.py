@@ -0,0 +1,234 @@
+# bbserver/chef_management/autocomplete.py
+
+"""
+In-process prefix index for dish-name autocomplete.
+
+Per (lower-cased) dish_type the index keeps two sorted lists of normalized
+keys: full dish names, and the name suffixes starting at every later word
+("grilled chicken soup" -> "chicken soup", "soup"). A query is answered with
+a bisect into each list, so completions never touch the database. Matches on
+the start of the name are returned before matches on a later word.
+
+The index is built on first use (or by ``warm()`` at startup) and kept up to
+date by the Dish post_save/post_delete receivers below, and by
+``dishes_changed`` for writes made in other processes (common.changes) or
+with raw SQL (common.deletes).
+"""
+
+import heapq
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from common.models import Dish
+from common.serializers import DISH_FIELDS, dish_row
+from common.signals import dishes_changed
+
+
+def normalize(text):
+    """
+    Lower-case, strip accents and collapse everything but letters and digits
+    to single spaces: "Crème  Brûlée!" -> "creme brulee".
+    """
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(''.join(c if c.isalnum() else ' ' for c in stripped.lower()).split())
+
+
+def _suffixes(name):
+    """
+    Yield the suffixes of a normalized name that start at its second, third...
+    word.
+    """
+    start = name.find(' ')
+    while start != -1:
+        yield name[start + 1:]
+        start = name.find(' ', start + 1)
+
+
+class _SortedKeys:
+    """
+    Sorted keys with a parallel array of dish ids.
+    """
+    __slots__ = ('keys', 'ids')
+
+    def __init__(self):
+        self.keys = []
+        self.ids = array('l')
+
+    def add(self, key, dish_id):
+        i = bisect_left(self.keys, key)
+        self.keys.insert(i, key)
+        self.ids.insert(i, dish_id)
+
+    def remove(self, key, dish_id):
+        i = bisect_left(self.keys, key)
+        while i < len(self.keys) and self.keys[i] == key:
+            if self.ids[i] == dish_id:
+                del self.keys[i]
+                del self.ids[i]
+                return
+            i += 1
+
+    def iter_prefix(self, prefix):
+        """
+        Yield (key, dish_id) for keys starting with prefix, in key order.
+        """
+        keys, ids = self.keys, self.ids
+        i = bisect_left(keys, prefix)
+        while i < len(keys) and keys[i].startswith(prefix):
+            yield keys[i], ids[i]
+            i += 1
+
+
+class DishPrefixIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built = False
+        self._rows = {}        # dish_id -> tuple of DISH_FIELDS values
+        self._names = {}       # dish_type key -> _SortedKeys of full names
+        self._words = {}       # dish_type key -> _SortedKeys of later-word suffixes
+
+    @property
+    def built(self):
+        return self._built
+
+    def warm(self):
+        """
+        Build the index from the database if it has not been built yet.
+        """
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self._build()
+
+    def rebuild(self):
+        with self._lock:
+            self._built = False
+            self._build()
+
+    def _build(self):
+        self._rows, self._names, self._words = {}, {}, {}
+        for row in Dish.objects.order_by().values_list(*DISH_FIELDS).iterator(chunk_size=5000):
+            self._add_row(row)
+        # Sorting once is much cheaper than inserting 100k keys one by one
+        for index in (*self._names.values(), *self._words.values()):
+            order = sorted(range(len(index.keys)), key=index.keys.__getitem__)
+            index.keys = [index.keys[i] for i in order]
+            index.ids = array('l', (index.ids[i] for i in order))
+        self._built = True
+
+    def _add_row(self, row, keep_sorted=False):
+        dish_id, name, dish_type = row[0], normalize(row[1]), (row[3] or '').lower()
+        self._rows[dish_id] = row
+        names = self._names.setdefault(dish_type, _SortedKeys())
+        words = self._words.setdefault(dish_type, _SortedKeys())
+        if keep_sorted:
+            names.add(name, dish_id)
+            for suffix in _suffixes(name):
+                words.add(suffix, dish_id)
+        else:
+            names.keys.append(name)
+            names.ids.append(dish_id)
+            for suffix in _suffixes(name):
+                words.keys.append(suffix)
+                words.ids.append(dish_id)
+
+    def add(self, dish):
+        """
+        Insert or replace a Dish instance. Ignored until the index is built.
+        """
+        with self._lock:
+            if not self._built:
+                return
+            self._remove(dish.pk)
+            self._add_row(tuple(getattr(dish, field) for field in DISH_FIELDS), keep_sorted=True)
+
+    def remove(self, dish_id):
+        with self._lock:
+            if self._built:
+                self._remove(dish_id)
+
+    def refresh(self, dish_ids):
+        """
+        Re-read the given dishes from the database (None: all of them).
+        Ignored until the index is built.
+        """
+        if not self._built:
+            return
+        if dish_ids is None:
+            self.rebuild()
+            return
+        rows = list(Dish.objects.filter(pk__in=dish_ids).order_by().values_list(*DISH_FIELDS))
+        with self._lock:
+            if not self._built:
+                return
+            for dish_id in dish_ids:
+                self._remove(dish_id)
+            for row in rows:
+                self._add_row(row, keep_sorted=True)
+
+    def _remove(self, dish_id):
+        row = self._rows.pop(dish_id, None)
+        if row is None:
+            return
+        name, dish_type = normalize(row[1]), (row[3] or '').lower()
+        self._names[dish_type].remove(name, dish_id)
+        for suffix in _suffixes(name):
+            self._words[dish_type].remove(suffix, dish_id)
+
+    def complete(self, q, category='', limit=10):
+        """
+        Return up to ``limit`` DishSerializer payloads whose name (or a later
+        word of it) starts with ``q``; optionally only for one dish_type.
+        """
+        prefix = normalize(q)
+        if not prefix:
+            return []
+        self.warm()
+
+        with self._lock:
+            if category:
+                types = [category.lower()]
+            else:
+                types = list(self._names)
+            matches = []
+            seen = set()
+            for indexes in (self._names, self._words):
+                ranges = [indexes[t].iter_prefix(prefix) for t in types if t in indexes]
+                for _, dish_id in heapq.merge(*ranges):
+                    if dish_id not in seen:
+                        seen.add(dish_id)
+                        matches.append(self._rows[dish_id])
+                        if len(matches) == limit:
+                            break
+                if len(matches) == limit:
+                    break
+
+        tz = timezone.get_current_timezone()
+        return [dish_row(row, tz) for row in matches]
+
+
+dish_index = DishPrefixIndex()
+
+
+@receiver(post_save, sender=Dish)
+def index_saved_dish(sender, instance, **kwargs):
+    transaction.on_commit(lambda: dish_index.add(instance))
+
+
+@receiver(post_delete, sender=Dish)
+def unindex_deleted_dish(sender, instance, **kwargs):
+    dish_id = instance.pk
+    transaction.on_commit(lambda: dish_index.remove(dish_id))
+
+
+@receiver(dishes_changed)
+def refresh_changed_dishes(sender, dish_ids=None, **kwargs):
+    dish_index.refresh(dish_ids)
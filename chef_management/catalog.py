@@ -0,0 +1,131 @@
+# bbserver/chef_management/catalog.py
+
+"""
+Catalog listing: every dish, in dish_id order, a page at a time.
+
+Pages are keyed on dish_id (``?after=`` the last id of the previous page), so
+each page starts with a primary key seek instead of skipping an OFFSET of
+rows. ``?fields=`` picks the DISH_FIELDS to return; only those columns are
+selected, and rows are built straight from the values_list tuples.
+"""
+
+from datetime import datetime, time
+
+from django.db.models.functions import Collate
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from common.models import Dish
+from common.serializers import DISH_FIELDS, format_datetime
+
+CATALOG_LIMIT = 500
+CATALOG_MAX_LIMIT = 2000
+
+_DATETIME_FIELDS = ('created_at', 'updated_at')
+_BOOLEANS = {'true': True, '1': True, 'false': False, '0': False}
+
+
+def _integer(params, name, default=None):
+    value = params.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f'{name} must be an integer.')
+
+
+def _boolean(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return _BOOLEANS[value.lower()]
+    except KeyError:
+        raise ValueError(f'{name} must be true or false.')
+
+
+def _datetime(params, name):
+    """
+    An aware datetime from 'YYYY-MM-DD' (midnight) or an ISO 8601 datetime.
+    """
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'{name} must be a date or datetime (ISO 8601).')
+        parsed = datetime.combine(day, time.min)
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+
+def parse_fields(value):
+    """
+    Validate ?fields=a,b,c. dish_id is always included (it is the page key).
+    """
+    if not value:
+        return DISH_FIELDS
+    requested = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in requested if field not in DISH_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Choose from {', '.join(DISH_FIELDS)}.")
+    return ('dish_id', *(field for field in DISH_FIELDS[1:] if field in requested))
+
+
+def catalog_query(params):
+    """
+    Return (values_list queryset of one page plus one row, fields, limit)
+    for the query string. Raises ValueError.
+
+        ?dish_type=main&light_healthy=true&sugar_free=false
+        &min_calories=200&max_calories=600
+        &updated_after=2025-01-01&updated_before=2025-02-01T12:00:00
+        &after=<dish_id>&limit=500&fields=dish_id,dish_name
+    """
+    fields = parse_fields(params.get('fields'))
+    limit = _integer(params, 'limit', CATALOG_LIMIT)
+    if not 1 <= limit <= CATALOG_MAX_LIMIT:
+        raise ValueError(f'limit must be between 1 and {CATALOG_MAX_LIMIT}.')
+
+    # Always a primary key range, also for the first page
+    dishes = Dish.objects.filter(dish_id__gt=_integer(params, 'after', 0))
+
+    dish_type = params.get('dish_type', '').strip()
+    if dish_type:
+        # Uses dish_type_name_idx, like the search-dishes category filter
+        dishes = dishes.annotate(type_nocase=Collate('dish_type', 'NOCASE')).filter(type_nocase=dish_type)
+    for name in ('light_healthy', 'sugar_free'):
+        value = _boolean(params, name)
+        if value is not None:
+            dishes = dishes.filter(**{name: value})
+
+    filters = {
+        'dish_calories__gte': _integer(params, 'min_calories'),
+        'dish_calories__lte': _integer(params, 'max_calories'),
+        'updated_at__gte': _datetime(params, 'updated_after'),
+        'updated_at__lt': _datetime(params, 'updated_before'),
+    }
+    dishes = dishes.filter(**{lookup: value for lookup, value in filters.items() if value is not None})
+
+    return dishes.order_by('dish_id').values_list(*fields)[:limit + 1], fields, limit
+
+
+def render_catalog(rows, fields, limit):
+    """
+    Build the response from a catalog_query page.
+    """
+    tz = timezone.get_current_timezone()
+    dates = [i for i, field in enumerate(fields) if field in _DATETIME_FIELDS]
+    results = []
+    for row in rows[:limit]:
+        dish = dict(zip(fields, row))
+        for i in dates:
+            dish[fields[i]] = format_datetime(row[i], tz)
+        results.append(dish)
+    return {
+        'results': results,
+        # Pass as ?after= for the next page
+        'next_after': rows[limit - 1][0] if len(rows) > limit else None,
+    }
@@ -0,0 +1,143 @@
+# bbserver/chef_management/clone.py
+
+"""
+Copy a previous menu to new dates.
+
+Every link dated ``source_start``..``source_end`` is copied to the same
+weekday of the week(s) starting at ``target_start`` (the whole range moves by
+``target_start - source_start``, so both must fall on the same weekday). ``weekdays`` optionally moves a source
+weekday to another day of the same week, e.g. {0: 1} serves Monday's dishes
+on Tuesday.
+
+The copy is two set-based statements, one ``INSERT OR IGNORE ... SELECT``
+for the missing DateSaved rows and one for the links, whatever the size of
+the range. Links already on the menu are left alone; copied links start
+without ratings and, unless ``copy_quantities``, without a quantity.
+"""
+
+from datetime import datetime
+
+from django.db import connection, transaction
+
+from common.dish_stats import refresh_dish_stats
+from common.signals import notify_menu_changed
+
+WEEKDAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+# Day offset per source weekday (Monday = 0; SQLite's %w counts from Sunday)
+_SHIFTED = """
+    WITH shift(weekday, days) AS (VALUES {values})
+    SELECT date(h.date, printf('%%+d days', s.days)) AS target, h.date AS source, h.dish_id, h.quantity
+    FROM date_has_dish AS h
+    JOIN shift AS s ON s.weekday = (CAST(strftime('%%w', h.date) AS INTEGER) + 6) %% 7
+    WHERE h.date BETWEEN %s AND %s
+"""
+
+
+def parse_weekday(value):
+    """
+    Return the weekday number (Monday = 0) of 'mon'..'sun', 'monday'... or
+    '0'..'6'. Raises ValueError.
+    """
+    text = str(value).strip().lower()
+    if text.isdigit() and int(text) < 7:
+        return int(text)
+    if text[:3] in WEEKDAYS:
+        return WEEKDAYS.index(text[:3])
+    raise ValueError(f'Invalid weekday {value!r}. Use mon..sun or 0..6.')
+
+
+def _shifted(source_start, source_end, target_start, weekdays):
+    """
+    Return the SELECT of (target, source, dish_id, quantity) rows and its
+    params.
+    """
+    offset = (target_start - source_start).days
+    shifts = [(day, offset + weekdays.get(day, day) - day) for day in range(7)]
+    sql = _SHIFTED.format(values=', '.join(['(%s, %s)'] * 7))
+    params = [value for shift in shifts for value in shift]
+    return sql, params + [source_start.isoformat(), source_end.isoformat()]
+
+
+def preview_clone(source_start, source_end, target_start, weekdays=None):
+    """
+    Return the rows the clone would copy, in target date order:
+    {date, source_date, dish_id, dish_name, status} with status 'add' for a
+    new link and 'exists' for one already on the menu, plus the target dates
+    that have no DateSaved row yet. A dish that ``weekdays`` brings to one
+    target date from two source dates is listed once, with the earlier.
+    """
+    sql, params = _shifted(source_start, source_end, target_start, weekdays or {})
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT c.target, c.source, c.dish_id, d.dish_name, t.date_has_dish_id IS NOT NULL
+            -- Two source days remapped onto one target day copy a shared dish once
+            FROM (SELECT target, MIN(source) AS source, dish_id FROM ({sql}) GROUP BY target, dish_id) AS c
+            JOIN dish AS d ON d.dish_id = c.dish_id
+            LEFT JOIN date_has_dish AS t ON t.date = c.target AND t.dish_id = c.dish_id
+            ORDER BY c.target, d.dish_name
+        """, params)
+        rows = cursor.fetchall()
+        cursor.execute(f"""
+            SELECT DISTINCT c.target FROM ({sql}) AS c
+            WHERE NOT EXISTS (SELECT 1 FROM date_saved AS s WHERE s.date_saved = c.target)
+            ORDER BY c.target
+        """, params)
+        missing = [row[0] for row in cursor.fetchall()]
+
+    diff = [
+        {'date': target, 'source_date': str(source), 'dish_id': dish_id, 'dish_name': name,
+         'status': 'exists' if exists else 'add'}
+        for target, source, dish_id, name, exists in rows
+    ]
+    return diff, missing
+
+
+def clone_menu(source_start, source_end, target_start, weekdays=None, copy_quantities=False):
+    """
+    Copy the links and return (dates created, links created).
+    """
+    sql, params = _shifted(source_start, source_end, target_start, weekdays or {})
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"""
+            INSERT OR IGNORE INTO date_saved (date_saved, attendance)
+            SELECT DISTINCT c.target, 0 FROM ({sql}) AS c
+        """, params)
+        dates_created = cursor.rowcount
+        cursor.execute(f"""
+            INSERT OR IGNORE INTO date_has_dish (date, dish_id, quantity, rating_sum, rating_count)
+            SELECT c.target, c.dish_id, {'c.quantity' if copy_quantities else 'NULL'}, 0, 0 FROM ({sql}) AS c
+        """, params)
+        links_created = cursor.rowcount
+
+        cursor.execute(f'SELECT DISTINCT c.target, c.dish_id FROM ({sql}) AS c', params)
+        copied = cursor.fetchall()
+        if links_created:
+            refresh_dish_stats({dish_id for _, dish_id in copied})
+            notify_menu_changed(target for target, _ in copied)
+    return dates_created, links_created
+
+
+def parse_clone_request(data):
+    """
+    Validate {source_start, source_end, target_start, weekdays} and return
+    (source_start, source_end, target_start, weekdays). Raises ValueError.
+    """
+    try:
+        source_start, source_end, target_start = (
+            datetime.strptime(str(data.get(key)), '%Y-%m-%d').date()
+            for key in ('source_start', 'source_end', 'target_start')
+        )
+    except ValueError:
+        raise ValueError('source_start, source_end and target_start are required as YYYY-MM-DD.')
+    if source_end < source_start:
+        raise ValueError('source_end must not be before source_start.')
+    if target_start.weekday() != source_start.weekday():
+        # Ranges move by whole weeks; use weekdays to serve a day elsewhere
+        raise ValueError(f"target_start must be a {source_start.strftime('%A')}, like source_start.")
+
+    weekdays = data.get('weekdays') or {}
+    if not isinstance(weekdays, dict):
+        raise ValueError('weekdays must map source weekdays to target weekdays, e.g. {"mon": "tue"}.')
+    weekdays = {parse_weekday(source): parse_weekday(target) for source, target in weekdays.items()}
+    return source_start, source_end, target_start, weekdays
@@ -0,0 +1,57 @@
+# bbserver/chef_management/management/commands/clone_menu.py
+
+from itertools import groupby
+
+from django.core.management.base import BaseCommand, CommandError
+
+from chef_management.clone import clone_menu, parse_clone_request, parse_weekday, preview_clone
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the dish links of a date range to the same weekdays from --target-start on "
+        "(the same operation as POST chef-management/clone/). A running server "
+        "picks up the new menu within CHANGE_POLL_SECONDS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source-start', required=True, help="First date to copy (YYYY-MM-DD).")
+        parser.add_argument('--source-end', required=True, help="Last date to copy (YYYY-MM-DD).")
+        parser.add_argument('--target-start', required=True, help="Date --source-start is copied to (YYYY-MM-DD).")
+        parser.add_argument(
+            '--weekday', action='append', default=[], metavar='FROM=TO',
+            help="Serve a source weekday on another day of the week, e.g. mon=tue. Repeatable.",
+        )
+        parser.add_argument('--copy-quantities', action='store_true', help="Also copy DateHasDish.quantity.")
+        parser.add_argument('--dry-run', action='store_true', help="Only print the diff.")
+
+    def handle(self, *args, **options):
+        try:
+            weekdays = {}
+            for pair in options['weekday']:
+                source, _, target = pair.partition('=')
+                weekdays[parse_weekday(source)] = parse_weekday(target)
+            source_start, source_end, target_start, _ = parse_clone_request({
+                'source_start': options['source_start'],
+                'source_end': options['source_end'],
+                'target_start': options['target_start'],
+            })
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        diff, new_dates = preview_clone(source_start, source_end, target_start, weekdays)
+        # The diff comes in target date order
+        for day, links in groupby(diff, key=lambda row: row['date']):
+            self.stdout.write(f"{day}{'  (new date)' if day in new_dates else ''}")
+            for row in links:
+                sign = '+' if row['status'] == 'add' else '='
+                self.stdout.write(f"    {sign} {row['dish_id']:<6} {row['dish_name']}  (from {row['source_date']})")
+
+        if options['dry_run']:
+            added = sum(row['status'] == 'add' for row in diff)
+            self.stdout.write(f'Dry run: {added} link(s) and {len(new_dates)} date(s) to create, nothing saved.')
+            return
+        dates_created, links_created = clone_menu(
+            source_start, source_end, target_start, weekdays, options['copy_quantities'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Created {dates_created} date(s) and {links_created} dish link(s).'))
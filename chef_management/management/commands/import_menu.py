@@ -0,0 +1,49 @@
+# bbserver/chef_management/management/commands/import_menu.py
+
+import csv
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from chef_management.menu_import import MenuImportError, import_menu, parse_csv
+
+
+class Command(BaseCommand):
+    help = (
+        "Import menu entries from a JSON or CSV file in one transaction "
+        "(the same format as POST chef-management/import/). A running server "
+        "picks up the new menu within CHANGE_POLL_SECONDS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="A .json file (list of entries or {\"entries\": [...]}) or a .csv file.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            with open(path, encoding='utf-8-sig') as f:
+                if path.lower().endswith('.csv'):
+                    entries = parse_csv(f.read())
+                else:
+                    data = json.load(f)
+                    entries = data.get('entries') if isinstance(data, dict) else data
+        except OSError as e:
+            raise CommandError(str(e))
+        except csv.Error as e:
+            raise CommandError(f'Invalid CSV: {e}')
+        except ValueError as e:
+            raise CommandError(f'Invalid JSON: {e}')
+
+        try:
+            counts = import_menu(entries)
+        except MenuImportError as e:
+            for error in e.errors:
+                message = error['error'] if isinstance(error['error'], str) else json.dumps(error['error'])
+                self.stderr.write(f"entry {error['entry']}: {message}")
+            raise CommandError('No entries were imported.')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Dishes: {counts['dishes']['created']} created, {counts['dishes']['reused']} reused. "
+            f"Dates: {counts['dates']['created']} created, {counts['dates']['existing']} existing. "
+            f"Links: {counts['links']['created']} created, {counts['links']['skipped']} skipped."
+        ))
@@ -0,0 +1,49 @@
+# bbserver/chef_management/management/commands/plan_quantities.py
+
+from datetime import datetime, timedelta
+from itertools import groupby
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from chef_management.planner import apply_recommendations, plan_quantities
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Invalid date {value!r}. Use YYYY-MM-DD.')
+
+
+class Command(BaseCommand):
+    help = (
+        "Recommend DateHasDish.quantity for a date range from forecast attendance and each "
+        "dish's history, and save the recommendations for links without a quantity."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="First date (YYYY-MM-DD). Default: today.")
+        parser.add_argument('--end', help="Last date (YYYY-MM-DD). Default: six days after --start.")
+        parser.add_argument('--overwrite', action='store_true', help="Also replace quantities already set.")
+        parser.add_argument('--dry-run', action='store_true', help="Only print the recommendations.")
+
+    def handle(self, *args, **options):
+        start = parse_date(options['start']) if options['start'] else timezone.now().date()
+        end = parse_date(options['end']) if options['end'] else start + timedelta(days=6)
+        if end < start:
+            raise CommandError('--end must not be before --start.')
+
+        attendance, recommendations = plan_quantities(start, end)
+        # Recommendations come in date order
+        for day, links in groupby(recommendations, key=lambda r: r.date):
+            self.stdout.write(f'{day}  expected attendance {attendance[day]:g}')
+            for r in links:
+                current = '-' if r.quantity is None else r.quantity
+                self.stdout.write(f'    dish {r.dish_id:<6} {r.dish_type:<12} {current:>6} -> {r.recommended}')
+
+        if options['dry_run']:
+            self.stdout.write(f'Dry run: {len(recommendations)} recommendation(s), nothing saved.')
+            return
+        updated = apply_recommendations(recommendations, overwrite=options['overwrite'])
+        self.stdout.write(self.style.SUCCESS(f'Updated the quantity of {updated} dish link(s).'))
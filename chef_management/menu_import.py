@@ -0,0 +1,216 @@
+# bbserver/chef_management/menu_import.py
+
+"""
+Bulk menu import: link many dishes to many dates in one transaction.
+
+Each entry puts one dish on one or more dates, either an existing dish
+
+    {"date": "2025-02-03", "existing_dish_id": 12, "quantity": 40}
+
+or a new one (validated with DishSerializer)
+
+    {"dates": ["2025-02-03", "2025-02-10"], "dish": {"dish_name": "...", "dish_type": "..."}}
+
+CSV input has one entry per row with the columns ``date``,
+``existing_dish_id``, ``quantity`` and the DishSerializer fields; blank
+cells are left out.
+
+A new dish whose name and type match (ignoring case) a dish already in the
+catalog, or an earlier entry of the same import, reuses that dish. Case is
+folded for ASCII letters only, like SQLite's NOCASE collation that finds the
+catalog matches, so "Crème" and "CRÈME" stay two dishes. Dates and links are
+written with conflict-ignoring bulk inserts, so links that already exist
+are skipped rather than duplicated. Every entry is validated before anything
+is kept: one bad entry rejects the whole import.
+"""
+
+import csv
+import io
+import string
+from datetime import datetime
+
+from django.db import transaction
+from django.db.models.functions import Collate
+
+from common.dish_stats import refresh_dish_stats
+from common.models import DateHasDish, DateSaved, Dish
+from common.serializers import DishSerializer
+from common.signals import notify_menu_changed
+from .autocomplete import dish_index
+
+DISH_COLUMNS = ('dish_name', 'dish_description', 'dish_type', 'dish_calories', 'light_healthy', 'sugar_free')
+
+
+class MenuImportError(Exception):
+    """
+    Raised with a list of {"entry": index, "error": message} for the entries
+    that failed validation. Nothing is written.
+    """
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def parse_csv(text):
+    """
+    Turn CSV text into import entries.
+    """
+    entries = []
+    for row in csv.DictReader(io.StringIO(text)):
+        row = {key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()}
+        entry = {'date': row.get('date')}
+        if 'existing_dish_id' in row:
+            entry['existing_dish_id'] = row['existing_dish_id']
+        else:
+            entry['dish'] = {column: row[column] for column in DISH_COLUMNS if column in row}
+        if 'quantity' in row:
+            entry['quantity'] = row['quantity']
+        entries.append(entry)
+    return entries
+
+
+# Same folding as SQLite's NOCASE: only A-Z
+_NOCASE = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def _dish_key(name, dish_type):
+    return (name.translate(_NOCASE), dish_type.translate(_NOCASE))
+
+
+def _parse_entry(entry):
+    """
+    Return (dates, existing dish id or None, validated dish data or None,
+    quantity) for one entry. Raises ValueError with a client-facing message.
+    """
+    if not isinstance(entry, dict):
+        raise ValueError('Each entry must be an object.')
+
+    dates = entry.get('dates', [entry.get('date')] if 'date' in entry else None)
+    if not isinstance(dates, list) or not dates:
+        raise ValueError('Provide "date" or a non-empty "dates" list.')
+    try:
+        dates = [datetime.strptime(str(d), '%Y-%m-%d').date() for d in dates]
+    except ValueError:
+        raise ValueError('Invalid date format. Use YYYY-MM-DD.')
+
+    quantity = entry.get('quantity')
+    if quantity is not None:
+        try:
+            quantity = int(quantity)
+        except (TypeError, ValueError):
+            raise ValueError('quantity must be an integer.')
+        if quantity < 0:
+            raise ValueError('quantity must not be negative.')
+
+    if entry.get('existing_dish_id') is not None:
+        try:
+            return dates, int(entry['existing_dish_id']), None, quantity
+        except (TypeError, ValueError):
+            raise ValueError('existing_dish_id must be an integer.')
+
+    serializer = DishSerializer(data=entry.get('dish') or {})
+    if not serializer.is_valid():
+        raise ValueError(serializer.errors)
+    return dates, None, serializer.validated_data, quantity
+
+
+def index_dishes(dishes):
+    for dish in dishes:
+        dish_index.add(dish)
+
+
+def import_menu(entries):
+    """
+    Import menu entries in one transaction. Returns counts of created and
+    reused dishes, created and existing dates, and created and skipped links.
+    Raises MenuImportError if any entry is invalid.
+    """
+    if not isinstance(entries, list) or not entries:
+        raise MenuImportError([{'entry': None, 'error': 'Provide a non-empty list of entries.'}])
+
+    parsed, errors = [], []
+    for index, entry in enumerate(entries):
+        try:
+            parsed.append(_parse_entry(entry))
+        except ValueError as e:
+            errors.append({'entry': index, 'error': e.args[0]})
+    if errors:
+        raise MenuImportError(errors)
+
+    dates = {day for entry_dates, _, _, _ in parsed for day in entry_dates}
+    # Counted before the transaction, whose first statement must be a write
+    existing_dates = DateSaved.objects.filter(date_saved__in=dates).count()
+    with transaction.atomic():
+        # Take SQLite's write lock before reading anything
+        DateSaved.objects.bulk_create(
+            [DateSaved(date_saved=day, attendance=0) for day in sorted(dates)], ignore_conflicts=True,
+        )
+
+        # Existing dish references, resolved with one query
+        referenced = {dish_id for _, dish_id, _, _ in parsed if dish_id is not None}
+        found = set(Dish.objects.filter(pk__in=referenced).values_list('pk', flat=True))
+        errors = [
+            {'entry': index, 'error': f'Dish with ID {dish_id} not found.'}
+            for index, (_, dish_id, _, _) in enumerate(parsed)
+            if dish_id is not None and dish_id not in found
+        ]
+        if errors:
+            raise MenuImportError(errors)
+
+        # New dishes: reuse catalog dishes with the same name and type, create the rest once
+        new = {}
+        for _, _, data, _ in parsed:
+            if data is not None:
+                new.setdefault(_dish_key(data['dish_name'], data['dish_type']), data)
+        catalog = {
+            _dish_key(name, dish_type): pk
+            for pk, name, dish_type in Dish.objects
+            # Matches dish_name_idx, so candidates are found without scanning the catalog
+            .annotate(name_nocase=Collate('dish_name', 'NOCASE'))
+            .filter(name_nocase__in={data['dish_name'] for data in new.values()})
+            # Newest first, so the oldest of several matching dishes wins
+            .order_by('-pk')
+            .values_list('pk', 'dish_name', 'dish_type')
+        }
+        created_dishes = Dish.objects.bulk_create(
+            [Dish(**data) for key, data in new.items() if key not in catalog]
+        )
+        dish_ids = dict(catalog)
+        dish_ids.update({_dish_key(dish.dish_name, dish.dish_type): dish.pk for dish in created_dishes})
+
+        links = {}
+        for entry_dates, dish_id, data, quantity in parsed:
+            if dish_id is None:
+                dish_id = dish_ids[_dish_key(data['dish_name'], data['dish_type'])]
+            for day in entry_dates:
+                links.setdefault((day, dish_id), quantity)
+        linked = links.keys() & set(
+            DateHasDish.objects
+            .filter(date_saved__in=dates, dish_id__in={dish_id for _, dish_id in links})
+            .values_list('date_saved', 'dish_id')
+        )
+        DateHasDish.objects.bulk_create(
+            [
+                DateHasDish(date_saved_id=day, dish_id_id=dish_id, quantity=quantity)
+                for (day, dish_id), quantity in links.items()
+                if (day, dish_id) not in linked
+            ],
+            ignore_conflicts=True,
+        )
+
+        refresh_dish_stats({dish_id for _, dish_id in links})
+        notify_menu_changed(dates)
+        # bulk_create skips post_save, which keeps the autocomplete index current
+        transaction.on_commit(lambda: index_dishes(created_dishes))
+
+    requested_links = sum(len(entry_dates) for entry_dates, _, _, _ in parsed)
+    created_links = len(links) - len(linked)
+    return {
+        'dishes': {
+            'created': len(created_dishes),
+            'reused': len(referenced) + len(new) - len(created_dishes),
+        },
+        'dates': {'created': len(dates) - existing_dates, 'existing': existing_dates},
+        'links': {'created': created_links, 'skipped': requested_links - created_links},
+    }
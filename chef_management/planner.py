@@ -0,0 +1,180 @@
+# bbserver/chef_management/planner.py
+
+"""
+Portion planner: recommends DateHasDish.quantity for the dishes on upcoming
+dates.
+
+    quantity = ceil(expected attendance * portions per diner of the dish)
+
+Expected attendance is the larger of the forecast (common.forecast) and what
+is already booked. Portions per diner come from the dish's past quantities
+relative to the attendance of the dates it was served. A dish with little
+history is pulled towards a prior: the average rate of its dish_type, scaled
+by how often diners rated the dish compared to the rest of its type (rating
+counts are the only demand signal for a dish no one recorded quantities
+for). Every PRIOR_DINERS diners of real history weigh as much as the prior.
+
+History is read with three aggregate queries (per dish, per dish_type and
+overall) for the whole range; attendance includes unfolded shard counts.
+Recommendations are written back with one UPDATE; without overwrite it only
+touches links whose quantity is still NULL and returns the ids it changed.
+"""
+
+import math
+from dataclasses import dataclass
+
+from django.db import connection, transaction
+from django.db.models import Q, Sum
+
+from common import counters
+from common.forecast import forecaster
+from common.models import DateHasDish
+from common.signals import RATINGS, notify_menu_changed
+
+# Diners of history that weigh as much as the dish_type prior
+PRIOR_DINERS = 500
+
+
+@dataclass
+class Recommendation:
+    date_has_dish_id: int
+    date: object
+    dish_id: int
+    dish_type: str
+    quantity: int
+    recommended: int
+
+    def as_dict(self):
+        return {
+            'date_has_dish_id': self.date_has_dish_id,
+            'date': self.date.isoformat(),
+            'dish_id': self.dish_id,
+            'dish_type': self.dish_type,
+            'quantity': self.quantity,
+            'recommended': self.recommended,
+        }
+
+
+def _history(links, group):
+    """
+    Return {group value: (portions, diners with a quantity, ratings, diners)}
+    over past links, grouped by ``group``.
+    """
+    with_quantity = Q(quantity__isnull=False)
+    rows = (
+        links.order_by()
+        .values(group)
+        .annotate(
+            portions=Sum('quantity', filter=with_quantity, default=0),
+            quantity_diners=Sum(counters.total_attendance(), filter=with_quantity, default=0),
+            ratings=Sum('rating_count', default=0),
+            diners=Sum(counters.total_attendance(), default=0),
+        )
+        .values_list(group, 'portions', 'quantity_diners', 'ratings', 'diners')
+    )
+    return {row[0]: row[1:] for row in rows}
+
+
+def _rate(count, diners, fallback):
+    return count / diners if diners else fallback
+
+
+def plan_quantities(start, end):
+    """
+    Return (attendance, recommendations) for every link dated ``start`` to
+    ``end``: {date: expected attendance} and a list of Recommendation.
+    """
+    links = list(
+        DateHasDish.objects
+        .filter(date_saved__gte=start, date_saved__lte=end)
+        .order_by('date_saved', 'pk')
+        .values_list('pk', 'date_saved', 'dish_id', 'dish_id__dish_type', 'quantity')
+    )
+    if not links:
+        return {}, []
+
+    dates = sorted({row[1] for row in links})
+    booked = counters.attendance_totals(dates)
+    forecast = forecaster.current()
+    attendance = {day: max(forecast.get(day) or 0, booked.get(day) or 0) for day in dates}
+    menu_size = {}
+    for row in links:
+        menu_size[row[1]] = menu_size.get(row[1], 0) + 1
+
+    # Attendance includes bookings still in attendance shards
+    past = (
+        DateHasDish.objects
+        .filter(date_saved__lt=forecast.today)
+        .alias(diners=counters.total_attendance())
+        .filter(diners__gt=0)
+    )
+    by_dish = _history(past.filter(dish_id__in={row[2] for row in links}), 'dish_id')
+    by_type = _history(past.filter(dish_id__dish_type__in={row[3] for row in links}), 'dish_id__dish_type')
+    overall = past.aggregate(
+        portions=Sum('quantity', default=0),
+        quantity_diners=Sum(counters.total_attendance(), filter=Q(quantity__isnull=False), default=0),
+        ratings=Sum('rating_count', default=0),
+        diners=Sum(counters.total_attendance(), default=0),
+    )
+
+    recommendations = []
+    for pk, day, dish_id, dish_type, quantity in links:
+        # Without any recorded quantities, assume every diner takes one dish of the day
+        default_rate = _rate(overall['portions'], overall['quantity_diners'], 1 / menu_size[day])
+        type_portions, type_quantity_diners, type_ratings, type_diners = by_type.get(dish_type, (0, 0, 0, 0))
+        type_rate = _rate(type_portions, type_quantity_diners, default_rate)
+        type_rating_rate = _rate(type_ratings, type_diners, _rate(overall['ratings'], overall['diners'], 0))
+
+        portions, quantity_diners, ratings, diners = by_dish.get(dish_id, (0, 0, 0, 0))
+        popularity = 1.0
+        if type_rating_rate:
+            rating_rate = (ratings + PRIOR_DINERS * type_rating_rate) / (diners + PRIOR_DINERS)
+            popularity = rating_rate / type_rating_rate
+        rate = (portions + PRIOR_DINERS * type_rate * popularity) / (quantity_diners + PRIOR_DINERS)
+
+        recommendations.append(Recommendation(
+            date_has_dish_id=pk,
+            date=day,
+            dish_id=dish_id,
+            dish_type=dish_type,
+            quantity=quantity,
+            recommended=math.ceil(attendance[day] * rate),
+        ))
+    return attendance, recommendations
+
+
+def apply_recommendations(recommendations, overwrite=False):
+    """
+    Write recommended quantities. Quantities a chef already set are kept
+    unless ``overwrite``: the UPDATE is then guarded by quantity IS NULL, so a
+    quantity set after the plan was read is not replaced. Returns the number
+    of links changed.
+    """
+    changed = [
+        r for r in recommendations
+        if r.recommended != r.quantity and (overwrite or r.quantity is None)
+    ]
+    if not changed:
+        return 0
+    with transaction.atomic():
+        if overwrite:
+            DateHasDish.objects.bulk_update(
+                [DateHasDish(pk=r.date_has_dish_id, quantity=r.recommended) for r in changed],
+                ['quantity'],
+                batch_size=500,
+            )
+        else:
+            cases = ' '.join(['WHEN %s THEN %s'] * len(changed))
+            placeholders = ', '.join(['%s'] * len(changed))
+            params = [value for r in changed for value in (r.date_has_dish_id, r.recommended)]
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'UPDATE date_has_dish SET quantity = CASE date_has_dish_id {cases} END '
+                    f'WHERE date_has_dish_id IN ({placeholders}) AND quantity IS NULL '
+                    'RETURNING date_has_dish_id',
+                    params + [r.date_has_dish_id for r in changed],
+                )
+                updated = {row[0] for row in cursor.fetchall()}
+            changed = [r for r in changed if r.date_has_dish_id in updated]
+        notify_menu_changed((r.date for r in changed), RATINGS)
+    return len(changed)
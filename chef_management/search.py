@@ -0,0 +1,114 @@
+# bbserver/chef_management/search.py
+
+"""
+Dish search backed by the ``dish_fts`` FTS5 index (see common migration 0009).
+
+Every whitespace/punctuation separated token of the query is matched as a
+prefix, so "chi sou" finds "Chicken Soup". Results are ranked by bm25 (name
+hits weigh more than description hits), boosted for dishes served recently.
+"""
+
+import re
+
+from django.db import connection
+
+from common.models import Dish
+
+# bm25 column weights: dish_name, dish_description
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+# A dish served today ranks up to (1 + RECENCY_BOOST) times better than an
+# equally relevant one not served within RECENCY_DAYS.
+RECENCY_BOOST = 0.5
+RECENCY_DAYS = 365
+
+# Only the best bm25 candidates are re-ranked by recency
+CANDIDATES = 200
+
+# Shorter tokens would expand to most of the vocabulary (and the prefix
+# index only covers 2- and 3-character prefixes), so they are not searched
+MIN_TOKEN_LENGTH = 2
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+_fts_available = None
+
+
+def fts_available():
+    """
+    Return True when the dish_fts table exists on the default database.
+    """
+    global _fts_available
+    if _fts_available is None:
+        if connection.vendor != 'sqlite':
+            _fts_available = False
+        else:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'dish_fts'")
+                _fts_available = cursor.fetchone() is not None
+    return _fts_available
+
+
+def build_match_query(q):
+    """
+    Turn free text into an FTS5 MATCH expression of quoted prefix tokens,
+    e.g. 'chick soup' -> '"chick"* "soup"*'. Returns '' if q has no token of
+    at least MIN_TOKEN_LENGTH characters.
+    """
+    tokens = [t for t in _TOKEN_RE.findall(q.lower()) if len(t) >= MIN_TOKEN_LENGTH]
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def search_dish_ids(q, category='', limit=10):
+    """
+    Return up to ``limit`` dish ids matching ``q`` (optionally restricted to
+    a dish_type, case-insensitively), best match first.
+    """
+    match = build_match_query(q)
+    if not match:
+        return []
+
+    # Only touch the dish table when filtering on its dish_type
+    category_sql = (
+        'AND dish_fts.rowid IN (SELECT dish_id FROM dish WHERE dish_type = %s COLLATE NOCASE)'
+        if category else ''
+    )
+    params = [NAME_WEIGHT, DESCRIPTION_WEIGHT, match]
+    if category:
+        params.append(category)
+    params += [CANDIDATES, RECENCY_BOOST, RECENCY_DAYS, float(RECENCY_DAYS), limit]
+
+    # recency = 1 for a dish served today, falling linearly to 0 at RECENCY_DAYS
+    sql = f"""
+        SELECT m.dish_id
+        FROM (
+            SELECT dish_fts.rowid AS dish_id, bm25(dish_fts, %s, %s) AS score
+            FROM dish_fts
+            WHERE dish_fts MATCH %s {category_sql}
+            ORDER BY score
+            LIMIT %s
+        ) AS m
+        ORDER BY m.score * (1 + %s * MAX(0.0, 1.0 - MAX(0.0, COALESCE(
+            julianday('now') - julianday(
+                (SELECT MAX(h.date) FROM date_has_dish AS h WHERE h.dish_id = m.dish_id)
+            ),
+            %s
+        )) / %s)), m.dish_id
+        LIMIT %s
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search_dishes_fts(q, category='', limit=10):
+    """
+    Return matching Dish instances in rank order, or None if q has nothing
+    the index can search for (the caller should fall back to LIKE).
+    """
+    if not build_match_query(q):
+        return None
+    ids = search_dish_ids(q, category, limit)
+    dishes = Dish.objects.in_bulk(ids)
+    return [dishes[i] for i in ids if i in dishes]
@@ -0,0 +1,420 @@
+import csv
+import json
+import os
+import tempfile
+from datetime import date, timedelta
+
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from common import counters
+from common.changes import watcher
+from common.deletes import delete_dishes
+from common.dish_stats import check_dish_stats, rebuild_dish_stats
+from common.models import DateHasDish, DateSaved, Dish
+from common.serializers import DishSerializer
+from . import async_views, views
+from .autocomplete import dish_index
+from .clone import parse_clone_request
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class MenuImportTests(TestCase):
+
+    def post_csv(self, text):
+        return self.client.post('/chef-management/import/', text, content_type='text/csv')
+
+    def test_csv_import(self):
+        existing = Dish.objects.create(dish_name='Soup', dish_type='main')
+        Dish.objects.create(dish_name='Stew', dish_type='main')
+        DateSaved.objects.create(date_saved=date(2025, 1, 13), attendance=0)
+        response = self.post_csv(
+            'date,existing_dish_id,dish_name,dish_type\n'
+            f'2025-01-13,{existing.pk},,\n'
+            '2025-01-20,,STEW,Main\n'
+            '2025-01-20,,New dish,main\n'
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(json.loads(response.content), {
+            'dishes': {'created': 1, 'reused': 2},
+            'dates': {'created': 1, 'existing': 1},
+            'links': {'created': 3, 'skipped': 0},
+        })
+        self.assertEqual(Dish.objects.count(), 3)
+
+        # Links already on the menu are skipped
+        response = self.client.post('/chef-management/import/', json.dumps({'entries': [
+            {'dates': ['2025-01-13', '2025-01-27'], 'existing_dish_id': existing.pk, 'quantity': 4},
+        ]}), content_type='application/json')
+        self.assertEqual(json.loads(response.content)['links'], {'created': 1, 'skipped': 1})
+
+    def test_invalid_entry_rejects_import(self):
+        response = self.client.post('/chef-management/import/', json.dumps({'entries': [
+            {'date': '2025-01-13', 'dish': {'dish_name': 'Soup', 'dish_type': 'main'}},
+            {'date': '2025-01-13', 'existing_dish_id': 999999},
+        ]}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.content)['entries'][0]['entry'], 1)
+        self.assertFalse(Dish.objects.exists())
+        self.assertFalse(DateSaved.objects.exists())
+
+    def test_csv_error_is_bad_request(self):
+        # csv raises csv.Error for a field longer than field_size_limit()
+        text = 'date,dish_name,dish_type\n2025-01-13,%s,main\n' % ('x' * (csv.field_size_limit() + 1))
+        response = self.post_csv(text)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Dish.objects.exists())
+
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as f:
+            f.write(text)
+        try:
+            with self.assertRaisesMessage(CommandError, 'Invalid CSV'):
+                call_command('import_menu', f.name)
+        finally:
+            os.unlink(f.name)
+
+    def test_dish_names_match_like_nocase(self):
+        Dish.objects.create(dish_name='Crème brûlée', dish_type='Dessert')
+        response = self.post_csv(
+            'date,dish_name,dish_type\n'
+            '2025-01-13,crème brûlée,dessert\n'
+            '2025-01-13,CRÈME BRÛLÉE,dessert\n'
+            '2025-01-14,CRÈME BRÛLÉE,DESSERT\n'
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        # Only ASCII letters fold: "CRÈME" is a different dish, created once
+        self.assertEqual(json.loads(response.content)['dishes'], {'created': 1, 'reused': 1})
+        self.assertEqual(
+            sorted(Dish.objects.values_list('dish_name', flat=True)), ['CRÈME BRÛLÉE', 'Crème brûlée'],
+        )
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class CloneMenuTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.soup, cls.salad = (Dish.objects.create(dish_name=name, dish_type='main') for name in ('Soup', 'Salad'))
+        for day, dishes in ((date(2025, 1, 13), [cls.soup]), (date(2025, 1, 14), [cls.soup, cls.salad])):
+            DateSaved.objects.create(date_saved=day, attendance=0)
+            for dish in dishes:
+                DateHasDish.objects.create(date_saved_id=day, dish_id=dish)
+        rebuild_dish_stats()
+
+    def clone(self, **payload):
+        return self.client.post('/chef-management/clone/', json.dumps(payload), content_type='application/json')
+
+    def test_clone(self):
+        payload = {'source_start': '2025-01-13', 'source_end': '2025-01-14', 'target_start': '2025-01-20'}
+        body = json.loads(self.clone(dry_run=True, **payload).content)
+        self.assertEqual(body['new_dates'], ['2025-01-20', '2025-01-21'])
+        self.assertEqual({row['status'] for row in body['diff']}, {'add'})
+        self.assertFalse(DateSaved.objects.filter(date_saved__gte='2025-01-20').exists())
+
+        response = self.clone(**payload)
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(json.loads(response.content)['created'], {'dates': 2, 'links': 3})
+        self.assertEqual(
+            sorted(DateHasDish.objects.filter(date_saved__gte='2025-01-20').values_list('date_saved', 'dish_id__dish_name')),
+            [(date(2025, 1, 20), 'Soup'), (date(2025, 1, 21), 'Salad'), (date(2025, 1, 21), 'Soup')],
+        )
+        self.assertEqual(check_dish_stats(), [])
+
+        # Cloning again adds nothing
+        body = json.loads(self.clone(**payload).content)
+        self.assertEqual(body['created'], {'dates': 0, 'links': 0})
+        self.assertEqual({row['status'] for row in body['diff']}, {'exists'})
+
+    def test_target_start_must_match_weekday(self):
+        with self.assertRaisesMessage(ValueError, 'target_start must be a Monday'):
+            parse_clone_request({'source_start': '2025-01-13', 'source_end': '2025-01-14', 'target_start': '2025-01-21'})
+        response = self.clone(source_start='2025-01-13', source_end='2025-01-14', target_start='2025-01-21')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(DateSaved.objects.filter(date_saved__gte='2025-01-20').exists())
+
+    def test_preview_lists_colliding_dish_once(self):
+        payload = {'source_start': '2025-01-13', 'source_end': '2025-01-14', 'target_start': '2025-01-20',
+                   'weekdays': {'tue': 'mon'}}
+        diff = json.loads(self.clone(dry_run=True, **payload).content)['diff']
+        self.assertEqual(
+            [(row['date'], row['source_date'], row['dish_name'], row['status']) for row in diff],
+            [('2025-01-20', '2025-01-14', 'Salad', 'add'), ('2025-01-20', '2025-01-13', 'Soup', 'add')],
+        )
+
+        response = self.clone(**payload)
+        self.assertEqual(json.loads(response.content)['created'], {'dates': 1, 'links': 2})
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class AutocompleteTests(TestCase):
+    """
+    The in-process prefix index answers like a query would and follows
+    renames and deletes.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dishes = {
+            name: Dish.objects.create(dish_name=name, dish_type=dish_type)
+            for name, dish_type in (
+                ('Crème brûlée', 'dessert'), ('Chicken soup', 'main'), ('Grilled chicken', 'main'),
+                ('Chickpea salad', 'starter'), ('Soup of the day', 'main'),
+            )
+        }
+
+    def setUp(self):
+        dish_index.rebuild()
+
+    def complete(self, q, category=''):
+        response = self.client.get('/chef-management/search-dishes/', {'q': q, 'category': category, 'mode': 'prefix'})
+        return [dish['dish_name'] for dish in json.loads(response.content)['results']]
+
+    def test_prefix(self):
+        # Name starts first (in name order), then later words
+        self.assertEqual(self.complete('chick'), ['Chicken soup', 'Chickpea salad', 'Grilled chicken'])
+        self.assertEqual(self.complete('chicken', 'MAIN'), ['Chicken soup', 'Grilled chicken'])
+        self.assertEqual(self.complete('creme BRU'), ['Crème brûlée'])
+        self.assertEqual(self.complete('soup'), ['Soup of the day', 'Chicken soup'])
+        self.assertEqual(self.complete('!!'), [])
+        dish = self.dishes['Crème brûlée']
+        self.assertEqual(dish_index.complete('creme'), [DishSerializer(Dish.objects.get(pk=dish.pk)).data])
+
+    def test_rename(self):
+        dish = self.dishes['Chicken soup']
+        dish.dish_name = 'Leek soup'
+        with self.captureOnCommitCallbacks(execute=True):
+            dish.save()
+        self.assertEqual(self.complete('chicken'), ['Grilled chicken'])
+        self.assertEqual(self.complete('leek'), ['Leek soup'])
+
+    def test_delete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dishes['Grilled chicken'].delete()
+        self.assertEqual(self.complete('chick'), ['Chicken soup', 'Chickpea salad'])
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class DeleteLinksTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        DateSaved.objects.create(date_saved=date(2025, 1, 13), attendance=0)
+        cls.links = [
+            DateHasDish.objects.create(date_saved_id=date(2025, 1, 13), dish_id=Dish.objects.create(
+                dish_name=name, dish_type='main'))
+            for name in ('Soup', 'Stew')
+        ]
+        rebuild_dish_stats()
+
+    def delete(self, ids):
+        return self.client.delete(
+            '/chef-management/delete-dish-from-date/', json.dumps({'date_has_dish_ids': ids}),
+            content_type='application/json',
+        )
+
+    def test_missing_deletes_nothing(self):
+        response = self.delete([self.links[0].pk, 0])
+        self.assertEqual((response.status_code, json.loads(response.content)['missing']), (404, [0]))
+        self.assertEqual(DateHasDish.objects.count(), 2)
+
+    def test_delete(self):
+        self.assertEqual(self.delete([link.pk for link in self.links]).status_code, 204)
+        self.assertFalse(DateHasDish.objects.exists())
+        self.assertEqual(check_dish_stats(), [])
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class CatalogTests(TestCase):
+    """
+    The dish catalog pages by dish_id and returns only the requested fields.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dishes = [
+            Dish.objects.create(
+                dish_name=f'Dish {i}', dish_type='main' if i % 2 else 'starter', dish_calories=100 * i,
+                sugar_free=i % 3 == 0,
+            )
+            for i in range(20)
+        ]
+
+    def get(self, **params):
+        response = self.client.get('/chef-management/dishes/', params)
+        return response.status_code, json.loads(response.content)
+
+    def test_pages(self):
+        seen, params = [], {'limit': 7, 'fields': 'dish_name,updated_at'}
+        while True:
+            _, body = self.get(**params)
+            seen += body['results']
+            if not body['next_after']:
+                break
+            params['after'] = body['next_after']
+        self.assertEqual([dish['dish_id'] for dish in seen], [dish.pk for dish in self.dishes])
+        self.assertEqual(set(seen[0]), {'dish_id', 'dish_name', 'updated_at'})
+        self.assertEqual(seen[0], {
+            key: value for key, value in DishSerializer(self.dishes[0]).data.items() if key in seen[0]
+        })
+
+    def test_filters(self):
+        _, body = self.get(dish_type='Main', min_calories=500, sugar_free='true', fields='dish_name')
+        self.assertEqual([dish['dish_name'] for dish in body['results']], ['Dish 9', 'Dish 15'])
+        _, body = self.get(updated_after='2999-01-01')
+        self.assertEqual(body, {'results': [], 'next_after': None})
+
+    def test_errors(self):
+        for params in ({'fields': 'price'}, {'limit': 0}, {'after': 'x'}, {'light_healthy': 'maybe'},
+                       {'updated_before': 'soon'}):
+            self.assertEqual(self.get(**params)[0], 400, params)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class SearchTests(TestCase):
+    """
+    mode=fts ranks by bm25 with a recency boost, filters by dish_type and
+    follows dish writes through the dish_fts triggers.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        today = timezone.now().date()
+        cls.never, cls.old, cls.recent = [
+            Dish.objects.create(dish_name='Chicken soup', dish_type='main', dish_description='Clear broth')
+            for _ in range(3)
+        ]
+        cls.dessert = Dish.objects.create(dish_name='Chicken pudding', dish_type='dessert')
+        for dish, days_ago in ((cls.old, 300), (cls.recent, 1)):
+            day = DateSaved.objects.create(date_saved=today - timedelta(days=days_ago), attendance=10)
+            DateHasDish.objects.create(date_saved=day, dish_id=dish)
+
+    def search(self, q, **params):
+        response = self.client.get('/chef-management/search-dishes/', {'q': q, 'mode': 'fts', **params})
+        self.assertEqual(response.status_code, 200)
+        return [dish['dish_id'] for dish in json.loads(response.content)['results']]
+
+    def test_ranking(self):
+        # Equal bm25: the dish served most recently first, never served last
+        self.assertEqual(self.search('chi sou'), [self.recent.pk, self.old.pk, self.never.pk])
+        # Name hits outrank description hits
+        broth = Dish.objects.create(dish_name='Broth of the day', dish_type='main')
+        self.assertEqual(self.search('broth')[0], broth.pk)
+
+    def test_category(self):
+        self.assertEqual(set(self.search('chicken')), {self.never.pk, self.old.pk, self.recent.pk, self.dessert.pk})
+        self.assertEqual(self.search('chicken', category='DESSERT'), [self.dessert.pk])
+        self.assertNotIn(self.dessert.pk, self.search('chicken', category='main'))
+
+    def test_index_follows_writes(self):
+        dish = Dish.objects.create(dish_name='Pumpkin risotto', dish_type='main')
+        self.assertEqual(self.search('pumpk'), [dish.pk])
+        dish.dish_name = 'Leek risotto'
+        dish.save()
+        self.assertEqual(self.search('pumpk'), [])
+        self.assertEqual(self.search('leek'), [dish.pk])
+        dish.delete()
+        self.assertEqual(self.search('risotto'), [])
+
+
+class AutocompleteChangeTests(TestCase):
+    """
+    Dish writes made by another process reach the autocomplete index
+    through common.changes, raw in-process deletes through dishes_changed.
+    """
+
+    def setUp(self):
+        dish_index.rebuild()
+        watcher.poll(force=True)
+
+    def names(self, q):
+        return [dish['dish_name'] for dish in dish_index.complete(q)]
+
+    def test_raw_writes_refresh_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO dish (dish_name, dish_type, light_healthy, sugar_free, created_at, updated_at) "
+                "VALUES ('Pumpkin soup', 'main', 0, 0, '2025-01-01 00:00:00', '2025-01-01 00:00:00')"
+            )
+            dish_id = cursor.lastrowid
+        self.assertEqual(self.names('pump'), [])
+        watcher.poll(force=True)
+        self.assertEqual(self.names('pump'), ['Pumpkin soup'])
+
+        with connection.cursor() as cursor:
+            cursor.execute("UPDATE dish SET dish_name = 'Leek soup' WHERE dish_id = %s", [dish_id])
+        watcher.poll(force=True)
+        self.assertEqual(self.names('pump'), [])
+        self.assertEqual(self.names('leek'), ['Leek soup'])
+
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM dish WHERE dish_id = %s', [dish_id])
+        watcher.poll(force=True)
+        self.assertEqual(self.names('soup'), [])
+
+
+    def test_batch_delete_drops_dishes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            dish = Dish.objects.create(dish_name='Pumpkin soup', dish_type='main')
+        self.assertEqual(self.names('pump'), ['Pumpkin soup'])
+        with self.captureOnCommitCallbacks(execute=True):
+            delete_dishes([dish.pk])
+        self.assertEqual(self.names('pump'), [])
+
+class AsyncViewParityTests(TestCase):
+    """
+    The async read views routed under ASYNC_READ_VIEWS return the same
+    status and body as their sync counterparts.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        for name, dish_type in (('Chicken soup', 'main'), ('Crème brûlée', 'dessert'), ('Soup of the day', 'main')):
+            dish = Dish.objects.create(dish_name=name, dish_type=dish_type, dish_calories=300)
+            DateSaved.objects.get_or_create(date_saved=date(2025, 1, 13), defaults={'attendance': 10})
+            DateHasDish.objects.create(date_saved_id=date(2025, 1, 13), dish_id=dish, quantity=4)
+        counters.increment(date(2025, 1, 13), 2)
+
+    def setUp(self):
+        dish_index.rebuild()
+
+    def assertSameResponse(self, sync_view, async_view, path, params=None, *args):
+        response = sync_view(RequestFactory().get(path, params or {}), *args)
+        expected = response.status_code, response.content
+
+        async def run():
+            response = await async_view(AsyncRequestFactory().get(path, params or {}), *args)
+            return response.status_code, response.content
+        self.assertEqual(async_to_sync(run)(), expected)
+        return expected[0]
+
+    def test_search(self):
+        for params in (
+            {'q': 'soup'}, {'q': 'soup', 'mode': 'prefix'}, {'q': 'soup', 'mode': 'fts'},
+            {'q': 'cr', 'mode': 'prefix', 'category': 'DESSERT'}, {'q': ''},
+        ):
+            self.assertSameResponse(
+                views.search_dishes, async_views.search_dishes, '/chef-management/search-dishes/', params,
+            )
+
+    def test_day_dishes(self):
+        statuses = [
+            self.assertSameResponse(
+                views.get_day_dishes, async_views.get_day_dishes, f'/chef-management/day-dishes/{day}/', {}, day,
+            )
+            for day in ('2025-01-13', '2025-01-14', 'bad')
+        ]
+        self.assertEqual(statuses, [200, 200, 400])
+
+    def test_list_dishes(self):
+        statuses = [
+            self.assertSameResponse(views.list_dishes, async_views.list_dishes, '/chef-management/dishes/', params)
+            for params in (
+                {}, {'limit': 2, 'fields': 'dish_name,updated_at'}, {'dish_type': 'MAIN', 'max_calories': 400},
+                {'limit': 0},
+            )
+        ]
+        self.assertEqual(statuses, [200, 200, 200, 400])
@@ -1,14 +1,23 @@
 #bbserver/menu_management/urls.py
 
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import views, async_views
+
+# Read views: async versions under ASGI (see settings.ASYNC_READ_VIEWS)
+read_views = async_views if settings.ASYNC_READ_VIEWS else views
 
 urlpatterns = [
       
     path('create/', views.create_dish, name='create_dish'),
-    path('day-dishes/', views.get_day_dishes, name='day_dishes'),
-    path('day-dishes/<str:date_str>/', views.get_day_dishes, name='day_dishes_specific'),
+    path('day-dishes/', read_views.get_day_dishes, name='day_dishes'),
+    path('day-dishes/<str:date_str>/', read_views.get_day_dishes, name='day_dishes_specific'),
     path('delete-dish-from-date/', views.delete_dish_from_date, name='delete_dish_from_date'),
-    path('search-dishes/', views.search_dishes, name='search_dishes'),
+    path('search-dishes/', read_views.search_dishes, name='search_dishes'),
+    path('dishes/', read_views.list_dishes, name='list_dishes'),
+    path('forecast/', views.get_forecasts, name='forecasts'),
+    path('plan-quantities/', views.plan_quantities, name='plan_quantities'),
+    path('import/', views.import_menu, name='import_menu'),
+    path('clone/', views.clone_menu, name='clone_menu'),
 ]
 
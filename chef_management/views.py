@@ -1,40 +1,92 @@
 # bbserver/chef_management/views.py
 
+import csv
 import json
-from django.http import JsonResponse, HttpResponseBadRequest
+from django.http import HttpResponseBadRequest
 from django.views.decorators.csrf import csrf_exempt
 from django.db import transaction
 
 from common.models import Dish, DateSaved, DateHasDish
-from common.serializers import DishSerializer, DateHasDishSerializer
+from common.serializers import DishSerializer, DATE_HAS_DISH_COLUMNS, date_has_dish_row
+from common.signals import notify_menu_changed
+from common import counters, deletes
+from common.dish_stats import refresh_dish_stats
+from common.fastjson import FastJsonResponse
+from common.forecast import forecaster
+from common.timing import timed
+from . import catalog, clone, menu_import, planner, search
+from .autocomplete import dish_index
 from django.utils import timezone
-from datetime import datetime
+from datetime import datetime, timedelta
 from django.views.decorators.http import require_http_methods, require_GET
 
 @require_GET
 def search_dishes(request):
     """
     Search existing Dish entries by name (or other fields if desired).
-    Query string: ?q=<partial_name>
+    Query string: ?q=<partial_name>[&category=<dish_type>][&mode=fts|prefix]
     Returns a JSON array of matching dishes (dish_id, dish_name, dish_calories, light_healthy, sugar_free, etc.).
+
+    mode=fts uses the dish_fts full-text index: every token is matched as a
+    prefix against name and description, and results are ranked by relevance
+    with a boost for recently served dishes.
+
+    mode=prefix answers from the in-process autocomplete index without a
+    database query: dishes whose name, or a later word of it, starts with q.
     """
     q = request.GET.get('q', '').strip()
     if not q:
-        return JsonResponse({'results': []})
+        return FastJsonResponse({'results': []})
     # Read the `category` query‐param (may be empty)
     category = request.GET.get('category', '').strip()
+    mode = request.GET.get('mode', '').strip().lower()
+
+    if mode == 'prefix':
+        return FastJsonResponse({'results': dish_index.complete(q, category)})
+
+    matches = None
+    if mode == 'fts' and search.fts_available():
+        matches = search.search_dishes_fts(q, category)
+
+    if matches is None:
+        matches = like_matches(q, category)
+
+    serializer = DishSerializer(matches, many=True)
+    return FastJsonResponse({'results': serializer.data})
+
+
+@require_GET
+def list_dishes(request):
+    """
+    Browse the dish catalog in dish_id order, a page at a time.
+
+    GET /chef-management/dishes/?dish_type=&light_healthy=&sugar_free=
+        &min_calories=&max_calories=&updated_after=&updated_before=
+        &after=<dish_id>&limit=500&fields=dish_id,dish_name,...
+
+    Returns {"results": [...], "next_after": <dish_id> or null}; pass
+    next_after as ?after= for the next page. fields limits each result to
+    the given DishSerializer fields (dish_id is always included).
+    """
+    try:
+        rows, fields, limit = catalog.catalog_query(request.GET)
+    except ValueError as e:
+        return FastJsonResponse({'error': str(e)}, status=400)
+    return FastJsonResponse(catalog.render_catalog(list(rows), fields, limit))
+
+
+def like_matches(q, category=''):
+    """
+    The default search: up to 10 dishes whose name contains q.
+    """
     # Example: case-insensitive name search (you can extend Q to more fields if needed)
     if category:
        # Only return dishes whose name contains q AND whose type matches exactly
-       matches = Dish.objects.filter(
+       return Dish.objects.filter(
            dish_name__icontains=q,
            dish_type__iexact=category
        )[:10]
-    else:
-       matches = Dish.objects.filter(dish_name__icontains=q)[:10]
-
-    serializer = DishSerializer(matches, many=True)
-    return JsonResponse({'results': serializer.data})
+    return Dish.objects.filter(dish_name__icontains=q)[:10]
 
 @csrf_exempt
 def create_dish(request):
@@ -69,7 +121,7 @@ def create_dish(request):
             try:
                 dish_instance = Dish.objects.get(pk=dish_id)
             except Dish.DoesNotExist:
-                return JsonResponse({'error': f'Dish with ID {dish_id} not found.'}, status=404)
+                return FastJsonResponse({'error': f'Dish with ID {dish_id} not found.'}, status=404)
         
         # Case B: Create a brand-new dish
         else:
@@ -79,30 +131,33 @@ def create_dish(request):
             # print('Serializer Errors:', dish_serializer.errors)
             
             if not dish_serializer.is_valid():
-                return JsonResponse({'error': dish_serializer.errors}, status=400)
+                return FastJsonResponse({'error': dish_serializer.errors}, status=400)
             
             dish_instance = dish_serializer.save()
 
         # Now, link to dates (if any)
         if 'dates' in data and isinstance(data['dates'], list):
-            for date_str in data['dates']:
-                date_instance, _ = DateSaved.objects.get_or_create(
-                    date_saved=date_str,
-                    defaults={'attendance': 0}
-                )
-                # Avoid duplicate DateHasDish entries for same dish + date
-                DateHasDish.objects.get_or_create(
-                    date_saved=date_instance,
-                    dish_id=dish_instance,
-                    defaults={'quantity': None}
-                )
-
-        return JsonResponse({'message': 'Dish linked successfully'}, status=201)
+            with transaction.atomic():
+                for date_str in data['dates']:
+                    date_instance, _ = DateSaved.objects.get_or_create(
+                        date_saved=date_str,
+                        defaults={'attendance': 0}
+                    )
+                    # Avoid duplicate DateHasDish entries for same dish + date
+                    DateHasDish.objects.get_or_create(
+                        date_saved=date_instance,
+                        dish_id=dish_instance,
+                        defaults={'quantity': None}
+                    )
+                refresh_dish_stats([dish_instance.pk])
+                notify_menu_changed(data['dates'])
+
+        return FastJsonResponse({'message': 'Dish linked successfully'}, status=201)
     
     except json.JSONDecodeError:
-        return JsonResponse({'error': 'Invalid JSON payload.'}, status=400)
+        return FastJsonResponse({'error': 'Invalid JSON payload.'}, status=400)
     except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
+        return FastJsonResponse({'error': str(e)}, status=500)
 
 
 
@@ -124,30 +179,81 @@ def get_day_dishes(request, date_str=None):
             try:
                 date_instance = datetime.strptime(date_str, '%Y-%m-%d').date()
             except ValueError:
-                return JsonResponse({'error': 'Invalid date format. Use YYYY-MM-DD.'}, status=400)
+                return FastJsonResponse({'error': 'Invalid date format. Use YYYY-MM-DD.'}, status=400)
         else:
             # If no date is provided, use today's date
             date_instance = timezone.now().date()
 
         # Retrieve dishes for the specified date
-        date_has_dishes = DateHasDish.objects.filter(date_saved=date_instance)
-        
-        # Retrieve attendance amount for the specified date
-        attendance_amount = DateSaved.objects.filter(date_saved=date_instance).values_list('attendance', flat=True).first()
+        rows = list(day_rows(date_instance))
 
-        dishes_info = []
-        for date_has_dish in date_has_dishes:
-            # Serialize the instance to get its data
-            date_has_dish_serializer = DateHasDishSerializer(date_has_dish)
-            # Get the serialized data, including date_has_dish_id
-            serialized_data = date_has_dish_serializer.data
-            dishes_info.append(serialized_data)
+        # Retrieve attendance amount for the specified date
+        attendance_amount = counters.attendance_total(date_instance)
 
-        return JsonResponse({'dishes': dishes_info, 'attendance': attendance_amount})
+        return render_day_dishes(rows, attendance_amount, forecaster.get(date_instance))
 
     except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
+        return FastJsonResponse({'error': str(e)}, status=500)
+
+
+def day_rows(day):
+    """
+    DATE_HAS_DISH_COLUMNS rows of one date, joining the dish in the same query.
+    """
+    return DateHasDish.objects.filter(date_saved=day).order_by('pk').values_list(*DATE_HAS_DISH_COLUMNS)
+
 
+def render_day_dishes(rows, attendance_amount, forecast_attendance):
+    with timed('render'):
+        # Same output as DateHasDishSerializer, without DRF per row
+        tz = timezone.get_current_timezone()
+        dishes_info = [date_has_dish_row(row, tz) for row in rows]
+
+        return FastJsonResponse({
+            'dishes': dishes_info,
+            'attendance': attendance_amount,
+            'forecast_attendance': forecast_attendance,
+        })
+
+
+@require_GET
+def get_forecasts(request):
+    """
+    Forecast attendance of every upcoming date with a DateSaved row:
+    GET /chef-management/forecast/[?start=YYYY-MM-DD][&end=YYYY-MM-DD]
+
+    Each entry also carries the attendance booked so far. ``model`` describes
+    the fit (past dates used, residual RMSE, seconds to refit).
+    """
+    try:
+        start, end = (
+            datetime.strptime(value, '%Y-%m-%d').date() if value else None
+            for value in (request.GET.get('start'), request.GET.get('end'))
+        )
+    except ValueError:
+        return FastJsonResponse({'error': 'Invalid date format. Use YYYY-MM-DD.'}, status=400)
+
+    forecast = forecaster.current()
+    days = sorted(
+        day for day in forecast.attendance
+        if (start is None or day >= start) and (end is None or day <= end)
+    )
+    booked = counters.attendance_totals(days)
+    return FastJsonResponse({
+        'forecasts': [
+            {
+                'date': day.isoformat(),
+                'forecast_attendance': forecast.attendance[day],
+                'attendance': booked.get(day),
+            }
+            for day in days
+        ],
+        'model': {
+            'trained_dates': forecast.trained_dates,
+            'rmse': forecast.rmse,
+            'seconds': round(forecast.seconds, 3),
+        },
+    })
 
 
 @require_http_methods(["DELETE"])
@@ -156,38 +262,150 @@ def delete_dish_from_date(request):
     """
     Delete one or more DateHasDish entries from the database.
 
-    Args:
-        request (HttpRequest): The incoming request.
+    DELETE /chef-management/delete-dish-from-date/
+    {"date_has_dish_ids": [ID, ...]}
 
-    Returns:
-        JsonResponse: JSON response with success or error message.
+    Either every entry is deleted (204) or, if any ID does not exist, none
+    are and the response (404) lists the missing IDs.
     """
     try:
         data = json.loads(request.body)
         date_has_dish_ids = data.get('date_has_dish_ids', [])
 
         # Ensure valid date_has_dish_ids are provided
-        if not date_has_dish_ids:
+        if not isinstance(date_has_dish_ids, list) or not date_has_dish_ids or \
+                not all(isinstance(i, int) for i in date_has_dish_ids):
             return HttpResponseBadRequest('Invalid date_has_dish_ids format. Please provide a list of date_has_dish_ids.')
 
-        # Use a database transaction to ensure atomicity
-        with transaction.atomic():
-            for date_has_dish_id in date_has_dish_ids:
-                # Retrieve the DateHasDish instance
-                date_has_dish = DateHasDish.objects.filter(date_has_dish_id=date_has_dish_id).first()
-
-                # Check if the DateHasDish instance exists
-                if date_has_dish:
-                    # Delete the DateHasDish entry
-                    date_has_dish.delete()
-                else:
-                    return JsonResponse({'error': f'DateHasDish entry with ID {date_has_dish_id} not found'}, status=404)
+        deletes.delete_links(date_has_dish_ids)
+        return FastJsonResponse({'message': 'DateHasDish entries deleted successfully'}, status=204)
 
-            return JsonResponse({'message': 'DateHasDish entries {date_has_dish_id} deleted successfully'}, status=204)
+    except deletes.DeleteError as e:
+        return FastJsonResponse({'error': 'DateHasDish entries not found', 'missing': e.missing}, status=404)
 
     except json.JSONDecodeError:
         return HttpResponseBadRequest('Invalid JSON format. Please provide a valid JSON payload.')
 
     except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
-    
+        return FastJsonResponse({'error': str(e)}, status=500)
+
+
+@require_http_methods(["POST"])
+@csrf_exempt
+def plan_quantities(request):
+    """
+    Recommend (and by default save) DateHasDish.quantity for a date range.
+
+    POST /chef-management/plan-quantities/
+    {
+        "start": "YYYY-MM-DD",   // optional, default today
+        "end": "YYYY-MM-DD",     // optional, default start + 6 days
+        "overwrite": false,      // also replace quantities a chef already set
+        "dry_run": false         // only return the recommendations
+    }
+    """
+    try:
+        data = json.loads(request.body or b'{}')
+        if not isinstance(data, dict):
+            raise ValueError
+    except ValueError:
+        return FastJsonResponse({'error': 'Invalid JSON payload.'}, status=400)
+
+    try:
+        start = datetime.strptime(data['start'], '%Y-%m-%d').date() if data.get('start') else timezone.now().date()
+        end = datetime.strptime(data['end'], '%Y-%m-%d').date() if data.get('end') else start + timedelta(days=6)
+    except (TypeError, ValueError):
+        return FastJsonResponse({'error': 'Invalid date format. Use YYYY-MM-DD.'}, status=400)
+    if end < start:
+        return FastJsonResponse({'error': 'end must not be before start.'}, status=400)
+
+    attendance, recommendations = planner.plan_quantities(start, end)
+    dry_run = bool(data.get('dry_run'))
+    updated = 0 if dry_run else planner.apply_recommendations(recommendations, bool(data.get('overwrite')))
+
+    return FastJsonResponse({
+        'attendance': [
+            {'date': day.isoformat(), 'expected_attendance': expected} for day, expected in attendance.items()
+        ],
+        'recommendations': [r.as_dict() for r in recommendations],
+        'updated': updated,
+        'dry_run': dry_run,
+    })
+
+
+@require_http_methods(["POST"])
+@csrf_exempt
+def import_menu(request):
+    """
+    Link many dishes to many dates in one transaction.
+
+    POST /chef-management/import/
+    JSON: {"entries": [{"date": "YYYY-MM-DD", "existing_dish_id": ID, "quantity": INTEGER}, ...]}
+          or entries with "dish": {...} (a new dish) and/or "dates": [...] instead of "date"
+    CSV (Content-Type: text/csv): columns date, existing_dish_id, quantity and the dish fields
+
+    Returns created/reused dishes, created/existing dates and created/skipped
+    links. Any invalid entry rejects the whole import.
+    """
+    try:
+        if request.content_type == 'text/csv':
+            entries = menu_import.parse_csv(request.body.decode('utf-8-sig'))
+        else:
+            data = json.loads(request.body)
+            entries = data.get('entries') if isinstance(data, dict) else data
+    except (UnicodeDecodeError, ValueError, csv.Error):
+        return FastJsonResponse({'error': 'Invalid JSON or CSV payload.'}, status=400)
+
+    try:
+        counts = menu_import.import_menu(entries)
+    except menu_import.MenuImportError as e:
+        return FastJsonResponse({'error': 'No entries were imported.', 'entries': e.errors}, status=400)
+    return FastJsonResponse(counts, status=201)
+
+
+@require_http_methods(["POST"])
+@csrf_exempt
+def clone_menu(request):
+    """
+    Copy the menu of a date range to new dates.
+
+    POST /chef-management/clone/
+    {
+        "source_start": "YYYY-MM-DD",
+        "source_end": "YYYY-MM-DD",
+        "target_start": "YYYY-MM-DD",   // source_start moves here, the rest of the range with it
+        "weekdays": {"mon": "tue"},     // optional: serve a source weekday on another day of the week
+        "copy_quantities": false,       // also copy DateHasDish.quantity
+        "dry_run": false                // only return the diff
+    }
+
+    Returns the diff (every link to copy, with status "add" or "exists"),
+    the target dates that had no DateSaved row and, unless dry_run, the
+    number of dates and links created.
+    """
+    try:
+        data = json.loads(request.body or b'{}')
+        if not isinstance(data, dict):
+            raise ValueError
+    except ValueError:
+        return FastJsonResponse({'error': 'Invalid JSON payload.'}, status=400)
+
+    try:
+        source_start, source_end, target_start, weekdays = clone.parse_clone_request(data)
+    except ValueError as e:
+        return FastJsonResponse({'error': str(e)}, status=400)
+
+    diff, new_dates = clone.preview_clone(source_start, source_end, target_start, weekdays)
+    dry_run = bool(data.get('dry_run'))
+    created = {'dates': 0, 'links': 0}
+    if not dry_run:
+        created['dates'], created['links'] = clone.clone_menu(
+            source_start, source_end, target_start, weekdays, bool(data.get('copy_quantities')),
+        )
+
+    return FastJsonResponse({
+        'diff': diff,
+        'new_dates': new_dates,
+        'created': created,
+        'dry_run': dry_run,
+    }, status=200 if dry_run else 201)
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class CommonConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'common'
+
+    def ready(self):
+        from .db import apply_sqlite_pragmas
+        from .timing import install_sql_timer
+        connection_created.connect(apply_sqlite_pragmas, dispatch_uid='common.apply_sqlite_pragmas')
+        connection_created.connect(install_sql_timer, dispatch_uid='common.install_sql_timer')
@@ -0,0 +1,154 @@
+# bbserver/common/benchmarking.py
+
+"""
+Helpers shared by the ``bench_*`` management commands. Benchmarks never run
+against the real ``db.sqlite3``: they migrate a throwaway SQLite file and
+point the default connection at it.
+"""
+
+import asyncio
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection, connections
+from django.test.utils import setup_databases, teardown_databases
+
+
+@contextmanager
+def scratch_database():
+    """
+    Create and migrate a temporary SQLite database file, yield its path, and
+    delete it afterwards.
+    """
+    tmpdir = tempfile.mkdtemp(prefix='bookingbite-bench-')
+    path = os.path.join(tmpdir, 'bench.sqlite3')
+    settings.DATABASES['default'].setdefault('TEST', {})['NAME'] = path
+    old_config = setup_databases(verbosity=0, interactive=False, serialized_aliases=set())
+    try:
+        yield path
+    finally:
+        connections.close_all()
+        teardown_databases(old_config, verbosity=0)
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def run_threads(workers, target, duration):
+    """
+    Call ``target()`` repeatedly from ``workers`` threads for ``duration``
+    seconds. ``target`` returns True on success and False on a handled
+    failure.
+
+    Returns (successes, failures, elapsed_seconds).
+    """
+    successes = [0] * workers
+    failures = [0] * workers
+    window = {}
+
+    def open_window():
+        window['start'] = time.perf_counter()
+        window['deadline'] = window['start'] + duration
+
+    start = threading.Barrier(workers, action=open_window)
+
+    def work(slot):
+        start.wait()
+        try:
+            while time.perf_counter() < window['deadline']:
+                if target():
+                    successes[slot] += 1
+                else:
+                    failures[slot] += 1
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=work, args=(i,), daemon=True) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(successes), sum(failures), time.perf_counter() - window['start']
+
+
+def percentile(sorted_values, pct):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def make_environ(method, path, query='', body=b''):
+    """
+    Minimal WSGI environ for an in-process request, as Waitress would pass it.
+    """
+    return {
+        'REQUEST_METHOD': method,
+        'SCRIPT_NAME': '',
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'testserver',
+        'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+
+
+async def asgi_request(application, method, path, query='', body=b''):
+    """
+    Send one HTTP request through an ASGI application in-process and return
+    the response status.
+    """
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': [
+            (b'host', b'testserver'),
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+        ],
+        'client': ('127.0.0.1', 50000),
+        'server': ('testserver', 80),
+    }
+    received = False
+    status = []
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        # The client never disconnects; Django cancels this wait when done
+        await asyncio.Future()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await application(scope, receive, send)
+    return status[0]
@@ -0,0 +1,158 @@
+# bbserver/common/changes.py
+
+"""
+Cross-process invalidation of the in-process caches.
+
+``menu_changed`` only reaches receivers in the process that made the change.
+Management commands (import_menu, clone_menu, plan_quantities), the admin and
+the shell write from other processes, so triggers from migration
+0012_change_tracking stamp every date whose links or dishes changed with an
+increasing ``change_version('menu')``.
+
+``watcher.poll()`` reads that version at most every
+``settings.CHANGE_POLL_SECONDS``. When it has moved, the dates stamped since
+the last poll are sent as a local ``menu_changed``, so the week snapshots and
+the forecast are dropped within one poll interval of any commit.
+
+Migration 0014_rating_change_tracking stamps rating and quantity updates of
+links separately, with ``change_version('rating')`` and ``rating_change``;
+those dates are sent with kind RATINGS, which drops the week snapshots (they
+embed ratings) but not the forecast.
+
+Migration 0013_dish_change_tracking does the same for the dish catalog with
+``change_version('dish')`` and ``dish_change``; changed dish ids are sent as
+``dishes_changed`` (the autocomplete index refreshes them).
+ChangePollMiddleware polls before each request.
+
+Bulk loads can set the per-row triggers aside with ``untracked`` and
+``stamp`` what they wrote once at the end.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+
+from common.signals import MENU, RATINGS, _as_date, dishes_changed, menu_changed
+
+
+def poll_seconds():
+    return getattr(settings, 'CHANGE_POLL_SECONDS', 1.0)
+
+
+class ChangeWatcher:
+    """
+    Remembers the last version seen by this process. The first poll only
+    takes the baseline: nothing is cached before the first request.
+    """
+
+    def __init__(self):
+        self._versions = None
+        self._next_poll = 0.0
+        self._lock = threading.Lock()
+
+    def due(self):
+        return time.monotonic() >= self._next_poll
+
+    def poll(self, force=False):
+        """
+        Send ``menu_changed`` for the dates and ``dishes_changed`` for the
+        dishes changed since the last poll. Returns the set of dates sent,
+        of either kind (empty if nothing changed or the poll was not due).
+        """
+        if not force and not self.due():
+            return set()
+        with self._lock:
+            if not force and not self.due():
+                return set()
+            self._next_poll = time.monotonic() + poll_seconds()
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT name, version FROM change_version')
+                    versions = dict(cursor.fetchall())
+                    seen = self._versions
+                    self._versions = versions
+                    if seen is None:
+                        return set()
+                    dates = self._changed(cursor, 'SELECT date FROM menu_change', 'menu', versions, seen)
+                    rated = self._changed(cursor, 'SELECT date FROM rating_change', 'rating', versions, seen)
+                    dish_ids = self._changed(cursor, 'SELECT dish_id FROM dish_change', 'dish', versions, seen)
+            except DatabaseError:
+                # Not migrated yet
+                return set()
+
+        if dish_ids:
+            dishes_changed.send(sender=ChangeWatcher, dish_ids=dish_ids)
+        dates = {_as_date(value) for value in dates}
+        rated = {_as_date(value) for value in rated} - dates
+        if dates:
+            menu_changed.send(sender=ChangeWatcher, dates=dates, kind=MENU)
+        if rated:
+            menu_changed.send(sender=ChangeWatcher, dates=rated, kind=RATINGS)
+        return dates | rated
+
+    @staticmethod
+    def _changed(cursor, select, name, versions, seen):
+        """
+        The keys stamped by ``select`` since the ``seen`` version of ``name``.
+        """
+        version, last = versions.get(name, 0), seen.get(name, 0)
+        if version == last:
+            return set()
+        if version > last:
+            cursor.execute(f'{select} WHERE version > %s', [last])
+        else:
+            # The version went backwards (a restored backup): every stamped key is suspect
+            cursor.execute(select)
+        return {row[0] for row in cursor.fetchall()}
+
+
+watcher = ChangeWatcher()
+
+# Key column of each ``{name}_change`` table
+STAMP_KEYS = {'menu': 'date', 'rating': 'date', 'dish': 'dish_id'}
+
+
+@contextmanager
+def untracked(*triggers):
+    """
+    Drop the named change-tracking triggers for the body of the block and
+    recreate them from their stored SQL afterwards. Use it inside the
+    transaction of the bulk write (a failed block leaves recreating them to
+    the rollback), and ``stamp`` the written keys before it commits.
+    """
+    if connection.vendor != 'sqlite':
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name IN ({', '.join(['%s'] * len(triggers))})",
+            list(triggers),
+        )
+        saved = [row[0] for row in cursor.fetchall()]
+        for name in triggers:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+    yield
+    with connection.cursor() as cursor:
+        for sql in saved:
+            cursor.execute(sql)
+
+
+def stamp(name, select, params=()):
+    """
+    Bump ``change_version(name)`` once and stamp every key returned by
+    ``select`` (a SELECT of one key column) with it, as the triggers would.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('UPDATE change_version SET version = version + 1 WHERE name = %s', [name])
+        cursor.execute(
+            f'WITH changed(key) AS ({select}) '
+            f'INSERT INTO {name}_change ({STAMP_KEYS[name]}, version) '
+            'SELECT changed.key, v.version FROM changed, change_version AS v WHERE v.name = %s '
+            f'ON CONFLICT({STAMP_KEYS[name]}) DO UPDATE SET version = excluded.version',
+            [*params, name],
+        )
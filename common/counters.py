@@ -0,0 +1,167 @@
+# bbserver/common/counters.py
+
+"""
+Sharded attendance counters.
+
+Each booking adds its +1/-1 to one of ``settings.ATTENDANCE_SHARDS`` rows of
+``attendance_shard`` for the date with a single UPDATE, instead of a
+read-modify-write on the shared ``date_saved`` row. Readers add the shard sum
+to ``DateSaved.attendance``; ``fold_attendance`` moves the shard counts into
+``DateSaved.attendance`` and resets the shards. The fold_attendance command
+is scheduled nightly (README 4.18); readers must not rely on it having run.
+"""
+
+import random
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from common import dish_stats
+from common.models import DateSaved, AttendanceShard
+
+
+def shard_count():
+    return max(1, getattr(settings, 'ATTENDANCE_SHARDS', 8))
+
+
+def increment(day, delta=1):
+    """
+    Add ``delta`` to the attendance of ``day`` (a date or 'YYYY-MM-DD').
+
+    The common case is one single-row UPDATE. The first booking of a date
+    also creates its DateSaved row and shard rows.
+    """
+    shards = shard_count()
+    shard = random.randrange(shards)
+    updated = AttendanceShard.objects.filter(date_saved=day, shard=shard).update(count=F('count') + delta)
+    if updated:
+        return
+
+    with transaction.atomic():
+        DateSaved.objects.bulk_create([DateSaved(date_saved=day, attendance=0)], ignore_conflicts=True)
+        AttendanceShard.objects.bulk_create(
+            [AttendanceShard(date_saved_id=day, shard=i) for i in range(shards)],
+            ignore_conflicts=True,
+        )
+        AttendanceShard.objects.filter(date_saved=day, shard=shard).update(count=F('count') + delta)
+
+
+def decrement(day):
+    """
+    Subtract one from the attendance of ``day`` unless its total (folded
+    plus shards) is already 0. The check and the write are one conditional
+    UPDATE, so concurrent removals cannot take a date below zero.
+
+    Returns True if one was subtracted, False if the total was 0 and None
+    if ``day`` has no DateSaved row.
+    """
+    shards = shard_count()
+    shard = random.randrange(shards)
+    removable = (
+        AttendanceShard.objects
+        .filter(date_saved=day, shard=shard)
+        .alias(total=total_attendance())
+        .filter(total__gt=0)
+    )
+    if removable.update(count=F('count') - 1):
+        return True
+    if not DateSaved.objects.filter(date_saved=day).exists():
+        return None
+
+    # No shard rows yet (all attendance folded or set in bulk), or nothing to remove
+    with transaction.atomic():
+        AttendanceShard.objects.bulk_create(
+            [AttendanceShard(date_saved_id=day, shard=i) for i in range(shards)],
+            ignore_conflicts=True,
+        )
+        return bool(removable.update(count=F('count') - 1))
+
+
+def _totals_query(dates):
+    return (
+        DateSaved.objects
+        .filter(date_saved__in=list(dates))
+        .annotate(pending=Coalesce(Sum('shards__count'), 0))
+        .values_list('date_saved', 'attendance', 'pending')
+    )
+
+
+def total_attendance(date_saved='date_saved'):
+    """
+    Expression for the total attendance (folded plus shards) of the DateSaved
+    row that the ``date_saved`` foreign key of a queryset's rows points to,
+    for filtering and aggregating links by attendance.
+    """
+    pending = (
+        AttendanceShard.objects
+        .filter(date_saved=OuterRef(date_saved))
+        .values('date_saved')
+        .annotate(total=Sum('count'))
+        .values('total')
+    )
+    return Coalesce(F(f'{date_saved}__attendance'), 0) + Coalesce(Subquery(pending), 0)
+
+
+def attendance_totals(dates):
+    """
+    Return {date: total attendance} for the DateSaved rows among ``dates``,
+    folding in unflushed shard counts. Dates without a row are omitted.
+    """
+    return {day: (attendance or 0) + pending for day, attendance, pending in _totals_query(dates)}
+
+
+def attendance_total(day):
+    """
+    Return the total attendance of one date, or None if it has no DateSaved row.
+    """
+    totals = attendance_totals([day])
+    return next(iter(totals.values()), None)
+
+
+async def aattendance_totals(dates):
+    """
+    Async version of attendance_totals().
+    """
+    return {day: (attendance or 0) + pending async for day, attendance, pending in _totals_query(dates)}
+
+
+async def aattendance_total(day):
+    """
+    Async version of attendance_total().
+    """
+    totals = await aattendance_totals([day])
+    return next(iter(totals.values()), None)
+
+
+def fold_attendance(dates=None):
+    """
+    Move shard counts into DateSaved.attendance and reset the shards, for the
+    given dates or every date with pending counts. Returns the number of
+    DateSaved rows updated.
+
+    The first statement is a write, so on SQLite the transaction holds the
+    write lock before anything is read and no increment can slip in between
+    the fold and the reset.
+    """
+    pending = AttendanceShard.objects.exclude(count=0)
+    if dates is not None:
+        pending = pending.filter(date_saved__in=list(dates))
+
+    shard_sum = (
+        AttendanceShard.objects
+        .filter(date_saved=OuterRef('pk'))
+        .values('date_saved')
+        .annotate(total=Sum('count'))
+        .values('total')
+    )
+    with transaction.atomic():
+        folded = DateSaved.objects.filter(pk__in=pending.values('date_saved')).update(
+            attendance=Coalesce(F('attendance'), 0) + Subquery(shard_sum)
+        )
+        dish_stats.add_attendance(dict(
+            pending.order_by().values('date_saved').annotate(total=Sum('count')).values_list('date_saved', 'total')
+        ))
+        pending.update(count=0)
+    return folded
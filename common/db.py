@@ -0,0 +1,60 @@
+# bbserver/common/db.py
+
+"""
+SQLite connection profile: applies ``settings.SQLITE_PRAGMAS`` to every new
+database connection (connected to ``connection_created`` in CommonConfig).
+"""
+
+import re
+
+from django.conf import settings
+
+# PRAGMAs the profile is allowed to set, in the order they are applied
+PROFILE_PRAGMAS = ('busy_timeout', 'journal_mode', 'synchronous', 'mmap_size', 'cache_size', 'temp_store')
+
+_VALUE_RE = re.compile(r'-?\w+')
+
+
+def configured_pragmas():
+    """
+    Return [(name, value)] for the PRAGMAs configured in settings, skipping
+    blank values. Raises ValueError on names or values that are not allowed.
+    """
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    unknown = set(pragmas) - set(PROFILE_PRAGMAS)
+    if unknown:
+        raise ValueError(f"Unsupported SQLITE_PRAGMAS: {', '.join(sorted(unknown))}")
+
+    result = []
+    for name in PROFILE_PRAGMAS:
+        value = str(pragmas.get(name) or '').strip()
+        if not value:
+            continue
+        if not _VALUE_RE.fullmatch(value):
+            raise ValueError(f"Invalid value for PRAGMA {name}: {value!r}")
+        result.append((name, value))
+    return result
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """
+    connection_created receiver: configure a new SQLite connection.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in configured_pragmas():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def active_pragmas(connection):
+    """
+    Return {name: current value} of the profile PRAGMAs on a connection.
+    """
+    values = {}
+    with connection.cursor() as cursor:
+        for name in PROFILE_PRAGMAS:
+            cursor.execute(f'PRAGMA {name}')
+            row = cursor.fetchone()
+            values[name] = row[0] if row else None
+    return values
@@ -0,0 +1,106 @@
+# bbserver/common/deletes.py
+
+"""
+Batch deletes of dish links, dishes and dates.
+
+Each delete is all or nothing: the rows are removed with one ``DELETE ...
+RETURNING`` statement per table, and if the returned ids do not cover every
+requested id the transaction is rolled back and ``DeleteError`` names the
+missing ones. Because the first statement is a write, the transaction holds
+SQLite's write lock before anything is read.
+
+Dependent rows go with one statement per table too (a date's links and
+attendance shards), and the DishStats rows of the affected dishes are
+recomputed once at the end.
+"""
+
+from django.db import connection, transaction
+
+from common.dish_stats import refresh_dish_stats
+from common.signals import notify_dishes_changed, notify_menu_changed
+
+
+class DeleteError(Exception):
+    """
+    Raised with the requested ids that do not exist (``missing``) and, for
+    dishes, the ones still linked to a date (``linked``). Nothing is deleted.
+    """
+
+    def __init__(self, missing=(), linked=()):
+        super().__init__(missing, linked)
+        self.missing = sorted(missing)
+        self.linked = sorted(linked)
+
+
+def _placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+
+def delete_links(date_has_dish_ids):
+    """
+    Delete DateHasDish rows by id.
+    """
+    ids = set(date_has_dish_ids)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM date_has_dish WHERE date_has_dish_id IN ({_placeholders(ids)}) '
+            'RETURNING date_has_dish_id, date, dish_id',
+            list(ids),
+        )
+        deleted = cursor.fetchall()
+        missing = ids - {row[0] for row in deleted}
+        if missing:
+            raise DeleteError(missing)
+
+        refresh_dish_stats({row[2] for row in deleted})
+        notify_menu_changed({row[1] for row in deleted})
+
+
+def delete_dishes(dish_ids):
+    """
+    Delete dishes that are not on any date.
+    """
+    ids = set(dish_ids)
+    unlinked = 'NOT EXISTS (SELECT 1 FROM date_has_dish AS h WHERE h.dish_id = {table}.dish_id)'
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Normally already gone: a dish loses its stats row with its last link
+        cursor.execute(
+            f'DELETE FROM dish_stats WHERE dish_id IN ({_placeholders(ids)}) '
+            f'AND {unlinked.format(table="dish_stats")}',
+            list(ids),
+        )
+        cursor.execute(
+            f'DELETE FROM dish WHERE dish_id IN ({_placeholders(ids)}) '
+            f'AND {unlinked.format(table="dish")} RETURNING dish_id',
+            list(ids),
+        )
+        deleted = {row[0] for row in cursor.fetchall()}
+        if deleted != ids:
+            kept = ids - deleted
+            cursor.execute(f'SELECT dish_id FROM dish WHERE dish_id IN ({_placeholders(kept)})', list(kept))
+            linked = {row[0] for row in cursor.fetchall()}
+            raise DeleteError(kept - linked, linked)
+
+        # The raw DELETE skips post_delete; the autocomplete index drops them on dishes_changed
+        notify_dishes_changed(deleted)
+
+
+def delete_dates(dates):
+    """
+    Delete DateSaved rows (date objects) with their links and attendance
+    shards.
+    """
+    days = {day.isoformat() for day in dates}
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM date_has_dish WHERE date IN ({_placeholders(days)}) RETURNING dish_id', list(days))
+        dish_ids = {row[0] for row in cursor.fetchall()}
+        cursor.execute(f'DELETE FROM attendance_shard WHERE date IN ({_placeholders(days)})', list(days))
+        cursor.execute(
+            f'DELETE FROM date_saved WHERE date_saved IN ({_placeholders(days)}) RETURNING date_saved', list(days),
+        )
+        missing = days - {str(row[0]) for row in cursor.fetchall()}
+        if missing:
+            raise DeleteError(missing)
+
+        refresh_dish_stats(dish_ids)
+        notify_menu_changed(days)
@@ -0,0 +1,148 @@
+# bbserver/common/dish_stats.py
+
+"""
+Maintenance of the DishStats rollup.
+
+Writes that change links, ratings or folded attendance call into this module
+inside their own transaction:
+
+* adding or removing links recomputes the affected dishes from their
+  DateHasDish rows (``refresh_dish_stats``, an index range per dish);
+* rating changes and attendance folds move the stored totals by a delta with
+  one UPDATE (``add_ratings``, ``add_attendance``).
+
+``rebuild_dish_stats`` recomputes every row and ``check_dish_stats`` reports
+rows that drifted from their DateHasDish rows.
+
+Single bookings only touch AttendanceShard rows, whose counts reach
+``attendance_sum`` when they are folded. Recomputing therefore folds the
+pending shards of the dates involved first, so the stored and recomputed
+totals are compared on the same footing.
+"""
+
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Max, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from common import counters
+from common.models import DateHasDish, DishStats
+
+STAT_FIELDS = ('times_served', 'last_served', 'rating_sum', 'rating_count', 'attendance_sum')
+
+
+def computed_stats(dish_ids=None):
+    """
+    Return {dish_id: tuple of STAT_FIELDS values} aggregated from
+    DateHasDish, for the given dishes or every linked dish. Attendance is
+    the folded DateSaved.attendance: call ``_fold`` first.
+    """
+    links = DateHasDish.objects.order_by()
+    if dish_ids is not None:
+        links = links.filter(dish_id__in=list(dish_ids))
+    rows = links.values('dish_id').annotate(
+        total_served=Count('pk'),
+        last_date=Max('date_saved'),
+        total_rating_sum=Sum('rating_sum'),
+        total_rating_count=Sum('rating_count'),
+        total_attendance=Coalesce(Sum('date_saved__attendance'), 0),
+    ).values_list(
+        'dish_id', 'total_served', 'last_date', 'total_rating_sum', 'total_rating_count', 'total_attendance',
+    )
+    return {row[0]: row[1:] for row in rows}
+
+
+def _fold(dish_ids=None):
+    """
+    Fold the pending attendance shards of the dates ``dish_ids`` are on (of
+    every date if None).
+    """
+    if dish_ids is None:
+        counters.fold_attendance()
+    else:
+        counters.fold_attendance(
+            DateHasDish.objects.filter(dish_id__in=list(dish_ids)).values_list('date_saved', flat=True)
+        )
+
+
+def _save(stats):
+    DishStats.objects.bulk_create(
+        [DishStats(dish_id_id=dish_id, **dict(zip(STAT_FIELDS, values))) for dish_id, values in stats.items()],
+        batch_size=1000,
+    )
+
+
+def refresh_dish_stats(dish_ids):
+    """
+    Recompute the DishStats rows of ``dish_ids`` from their links. Dishes
+    without links lose their row.
+    """
+    dish_ids = set(dish_ids)
+    if not dish_ids:
+        return
+    with transaction.atomic():
+        _fold(dish_ids)
+        DishStats.objects.filter(dish_id__in=dish_ids).delete()
+        _save(computed_stats(dish_ids))
+
+
+def rebuild_dish_stats():
+    """
+    Recompute every DishStats row. Returns the number of rows written.
+    """
+    with transaction.atomic():
+        _fold()
+        DishStats.objects.all().delete()
+        stats = computed_stats()
+        _save(stats)
+    return len(stats)
+
+
+def add_ratings(deltas):
+    """
+    Apply {dish_id: (rating_sum delta, rating_count delta)} with one UPDATE.
+    """
+    deltas = {dish_id: d for dish_id, d in deltas.items() if d[0] or d[1]}
+    if not deltas:
+        return
+    DishStats.objects.filter(dish_id__in=list(deltas)).update(
+        rating_sum=Case(
+            *[When(dish_id=i, then=F('rating_sum') + Value(d[0])) for i, d in deltas.items()],
+            default=F('rating_sum'),
+            output_field=IntegerField(),
+        ),
+        rating_count=Case(
+            *[When(dish_id=i, then=F('rating_count') + Value(d[1])) for i, d in deltas.items()],
+            default=F('rating_count'),
+            output_field=IntegerField(),
+        ),
+    )
+
+
+def add_attendance(deltas):
+    """
+    Apply {date: change of DateSaved.attendance} to every dish on those
+    dates, one UPDATE per date.
+    """
+    for day, delta in deltas.items():
+        if delta:
+            DishStats.objects.filter(
+                dish_id__in=DateHasDish.objects.filter(date_saved=day).values('dish_id')
+            ).update(attendance_sum=F('attendance_sum') + delta)
+
+
+def check_dish_stats():
+    """
+    Compare every stored row with its recomputed value. Returns a list of
+    (dish_id, stored, expected) for rows that differ; a missing or extra row
+    shows up as None on its side. Pending attendance shards are folded
+    first.
+    """
+    with transaction.atomic():
+        _fold()
+        expected = computed_stats()
+        stored = {row[0]: row[1:] for row in DishStats.objects.values_list('dish_id', *STAT_FIELDS)}
+    return [
+        (dish_id, stored.get(dish_id), expected.get(dish_id))
+        for dish_id in sorted(stored.keys() | expected.keys())
+        if stored.get(dish_id) != expected.get(dish_id)
+    ]
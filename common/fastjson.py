@@ -0,0 +1,56 @@
+# bbserver/common/fastjson.py
+
+"""
+JSON encoding shared by the function views (``FastJsonResponse``) and the DRF
+views (``common.renderers.FastJSONRenderer``).
+
+Uses orjson when it is installed and the stdlib encoder otherwise. Either way
+dates, datetimes, times, durations, decimals and UUIDs are encoded by
+DjangoJSONEncoder's rules (e.g. datetimes as ISO 8601 with milliseconds,
+decimals as strings), so the choice of backend never changes a value.
+"""
+
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+_encoder = DjangoJSONEncoder()
+
+if orjson is not None:
+    # Hand datetimes to DjangoJSONEncoder instead of orjson's own format
+    _ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME
+
+
+def dumps(data):
+    """
+    Encode ``data`` as compact UTF-8 JSON bytes.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, default=_encoder.default, option=_ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            # e.g. integers beyond 64 bits or non-str dict keys
+            pass
+    return json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+class FastJsonResponse(HttpResponse):
+    """
+    Drop-in for JsonResponse that encodes with ``dumps()``.
+    """
+
+    def __init__(self, data, safe=True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError(
+                "In order to allow non-dict objects to be serialized set the safe parameter to False."
+            )
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=dumps(data), **kwargs)
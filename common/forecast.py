@@ -0,0 +1,190 @@
+# bbserver/common/forecast.py
+
+"""
+Attendance forecasts for upcoming dates.
+
+The model is
+
+    attendance = level[weekday] + trend * years + mean(effect[dish] for dishes on the menu)
+
+fitted on every past DateSaved row. The weekday levels and the trend come
+from a least-squares solve; the dish effects are estimated by backfitting,
+each one the mean residual of the dates the dish was served, shrunk towards
+zero for rarely served dishes. Both steps are whole-array NumPy operations
+(``lstsq`` and ``bincount``), so a refit over ten years of history is a few
+milliseconds of arithmetic on top of loading the rows.
+
+``forecaster`` caches the predictions for every future DateSaved row and
+refits on first use after a MENU ``menu_changed`` or a change of day.
+Ratings and quantities are not model inputs, so RATINGS changes keep it.
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date
+
+import numpy as np
+from django.db import connection
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+from django.dispatch import receiver
+from django.utils import timezone
+
+from common.models import DateSaved
+from common.signals import MENU, menu_changed
+
+# Alternations between the weekday/trend solve and the dish effects
+ITERATIONS = 3
+
+# Pseudo-dates with zero residual added to every dish, so a dish served once
+# or twice gets a small effect rather than that day's whole residual
+SHRINKAGE = 5.0
+
+
+@dataclass
+class Forecast:
+    today: date
+    # Predicted attendance of every DateSaved row from today on
+    attendance: dict = field(default_factory=dict)
+    # Fit summary: past dates used, residual RMSE and seconds to load and fit
+    trained_dates: int = 0
+    rmse: float = None
+    seconds: float = 0.0
+
+    def get(self, day):
+        return self.attendance.get(day)
+
+
+def load_history():
+    """
+    Return (days, attendance, link_days, link_dishes) as NumPy arrays: every
+    DateSaved row as a date ordinal with its total attendance (including
+    unfolded shard counts), and every DateHasDish row as the index of its
+    date in ``days`` and its dish id.
+    """
+    dates = list(
+        DateSaved.objects
+        .annotate(pending=Coalesce(Sum('shards__count'), 0))
+        .order_by('date_saved')
+        .values_list('date_saved', 'attendance', 'pending')
+    )
+    days = np.fromiter((d.toordinal() for d, _, _ in dates), dtype=np.int64, count=len(dates))
+    attendance = np.fromiter(((a or 0) + p for _, a, p in dates), dtype=np.float64, count=len(dates))
+
+    # Links are most of the rows: let SQLite turn the dates into ordinals
+    # (julianday - 1721424.5) instead of building a date object per row
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT CAST(julianday(date) - 1721424.5 AS INTEGER), dish_id FROM date_has_dish')
+        links = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 2)
+    return days, attendance, np.searchsorted(days, links[:, 0]), links[:, 1]
+
+
+def fit_forecast(days, attendance, link_days, link_dishes, today):
+    """
+    Fit the model on the dates before ``today`` and return a Forecast for
+    the dates from ``today`` on.
+    """
+    forecast = Forecast(today=today)
+    n = len(days)
+    train = days < today.toordinal()
+    if not n or not train.any():
+        return forecast
+
+    # Design matrix: one column per weekday (ordinal 1 is a Monday) and the trend in years
+    X = np.zeros((n, 8))
+    X[np.arange(n), (days - 1) % 7] = 1.0
+    X[:, 7] = (days - days[0]) / 365.25
+
+    dishes, link_dish_index = np.unique(link_dishes, return_inverse=True)
+    menu_size = np.maximum(np.bincount(link_days, minlength=n), 1)
+    link_train = train[link_days]
+    train_dish_index = link_dish_index[link_train]
+    served = np.bincount(train_dish_index, minlength=len(dishes))
+
+    effects = np.zeros(len(dishes))
+    for _ in range(ITERATIONS):
+        menu = np.bincount(link_days, weights=effects[link_dish_index], minlength=n) / menu_size
+        beta = np.linalg.lstsq(X[train], attendance[train] - menu[train], rcond=None)[0]
+        residual = attendance - X @ beta
+        effects = np.bincount(
+            train_dish_index, weights=residual[link_days[link_train]], minlength=len(dishes),
+        ) / (served + SHRINKAGE)
+
+    menu = np.bincount(link_days, weights=effects[link_dish_index], minlength=n) / menu_size
+    predicted = np.maximum(X @ beta + menu, 0.0)
+
+    errors = attendance[train] - predicted[train]
+    future = ~train
+    forecast.attendance = {
+        date.fromordinal(int(day)): round(float(value), 1)
+        for day, value in zip(days[future], predicted[future])
+    }
+    forecast.trained_dates = int(train.sum())
+    forecast.rmse = round(float(np.sqrt(np.mean(errors ** 2))), 2)
+    return forecast
+
+
+class AttendanceForecaster:
+    """
+    Per-process cache of the latest Forecast. Concurrent misses wait for one
+    refit; a generation counter keeps a refit that raced with a menu change
+    out of the cache.
+    """
+
+    def __init__(self):
+        self._forecast = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def cached(self):
+        """
+        Return the cached Forecast if it is for today, else None.
+        """
+        forecast = self._forecast
+        if forecast is not None and forecast.today == timezone.now().date():
+            return forecast
+        return None
+
+    def current(self):
+        """
+        Return the Forecast for today, refitting it if it is stale.
+        """
+        forecast = self.cached()
+        if forecast is not None:
+            return forecast
+
+        with self._build_lock:
+            forecast = self.cached()
+            if forecast is not None:
+                return forecast
+            generation = self._generation
+            started = time.perf_counter()
+            forecast = fit_forecast(*load_history(), timezone.now().date())
+            forecast.seconds = time.perf_counter() - started
+            with self._lock:
+                if generation == self._generation:
+                    self._forecast = forecast
+            return forecast
+
+    def get(self, day):
+        """
+        Forecast attendance of a date, or None if it is in the past or has
+        no DateSaved row.
+        """
+        return self.current().get(day)
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._forecast = None
+
+
+forecaster = AttendanceForecaster()
+
+
+@receiver(menu_changed)
+def invalidate_forecast(sender, dates, kind=MENU, **kwargs):
+    if kind == MENU:
+        forecaster.invalidate()
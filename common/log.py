@@ -0,0 +1,242 @@
+# bbserver/common/log.py
+
+"""
+Non-blocking logging pipeline (wired up by ``LOGGING`` in settings).
+
+Request threads only run the logger's level check, the sampling filter and a
+``put_nowait`` onto an in-memory queue. A single background thread drains the
+queue in batches, formats each record as one JSON line and writes the batch
+to a rotating file with one flush. If the queue is full, records are dropped
+(and counted) rather than making a request wait.
+
+The background thread starts with the first record, so processes that never
+log (most management commands) do not run one, and is drained and stopped at
+exit.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# Attributes every LogRecord has; anything else was passed via ``extra``
+_RECORD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+
+def parse_levels(value):
+    """
+    Parse "booking=DEBUG,django.db=WARNING" into {'booking': 'DEBUG', ...}.
+    """
+    levels = {}
+    for item in value.split(','):
+        name, _, level = item.partition('=')
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def parse_rates(value):
+    """
+    Parse "bookingbite.timing=0.1,booking=0.5" into {'bookingbite.timing': 0.1, ...}.
+    """
+    return {name: float(rate) for name, rate in parse_levels(value).items()}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: ts, level, logger, thread, msg, any ``extra``
+    fields and the formatted traceback if there is one.
+    """
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and key not in entry:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of records below WARNING for the given logger name
+    prefixes, e.g. rates={'bookingbite.timing': 0.1} (or the same as a
+    "name=rate,..." string). The longest matching
+    prefix wins; unlisted loggers are not sampled.
+    """
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = parse_rates(rates) if isinstance(rates, str) else dict(rates or {})
+        self._cache = {}
+
+    def rate_for(self, name):
+        rate = self._cache.get(name)
+        if rate is None:
+            rate = 1.0
+            for prefix in sorted(self.rates, key=len, reverse=True):
+                if name == prefix or name.startswith(prefix + '.'):
+                    rate = self.rates[prefix]
+                    break
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+_traceback_formatter = logging.Formatter()
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler that never blocks: a full queue drops the record. If given
+    a ``listener``, it is started on the first record (and not restarted
+    once stop_listeners() has stopped it).
+    """
+
+    def __init__(self, log_queue, listener=None):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self.listener = listener
+        self._started = listener is None
+        self._start_lock = threading.Lock()
+
+    def prepare(self, record):
+        # Unlike QueueHandler.prepare, keep the traceback out of msg so the
+        # JSON formatter can put it in its own field
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _traceback_formatter.formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        if not self._started:
+            self._start_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start_listener(self):
+        with self._start_lock:
+            if not self._started:
+                self.listener.start()
+                _listeners.append(self.listener)
+                self._started = True
+
+
+class BatchingQueueListener(QueueListener):
+    """
+    QueueListener that handles up to ``batch_size`` queued records per
+    wake-up and flushes its handlers once per batch instead of per record.
+    """
+
+    def __init__(self, log_queue, *handlers, batch_size=256):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.batch_size = batch_size
+
+    def _monitor(self):
+        q = self.queue
+        while True:
+            batch = [q.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            for record in batch:
+                if record is self._sentinel:
+                    stop = True
+                else:
+                    self.handle(record)
+            for handler in self.handlers:
+                if hasattr(handler, 'flush_batch'):
+                    handler.flush_batch()
+                else:
+                    handler.flush()
+            for _ in batch:
+                q.task_done()
+            if stop:
+                break
+
+
+class _BatchFlushMixin:
+    """
+    Make StreamHandler.emit skip its per-record flush; the listener calls
+    flush_batch() after each batch.
+    """
+
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        super().flush()
+
+
+class BatchRotatingFileHandler(_BatchFlushMixin, RotatingFileHandler):
+    pass
+
+
+class BatchStreamHandler(_BatchFlushMixin, logging.StreamHandler):
+    pass
+
+
+_listeners = []
+
+
+def queue_handler(filename='', max_bytes=10 * 1024 * 1024, backup_count=5, queue_size=10000, batch_size=256):
+    """
+    ``LOGGING`` handler factory: return a DroppingQueueHandler whose records
+    a BatchingQueueListener, started with the first record, writes as JSON
+    lines to ``filename`` (rotated at ``max_bytes``) or to stderr if filename
+    is empty.
+    """
+    if filename:
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        target = BatchRotatingFileHandler(
+            filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True,
+        )
+    else:
+        target = BatchStreamHandler(sys.stderr)
+    target.setFormatter(JsonFormatter())
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    listener = BatchingQueueListener(log_queue, target, batch_size=batch_size)
+    return DroppingQueueHandler(log_queue, listener)
+
+
+@atexit.register
+def stop_listeners():
+    """
+    Drain and stop every listener (also registered to run at exit).
+    """
+    while _listeners:
+        listener = _listeners.pop()
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
@@ -0,0 +1,168 @@
+# bbserver/common/management/commands/bench_asgi.py
+
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from common.benchmarking import asgi_request, make_environ, percentile, scratch_database
+from common.models import DateHasDish
+from common.synthetic import BASES, DISHES, generate_menu_data
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare read latency under a background write load between the WSGI path (a fixed "
+        "Waitress-sized thread pool) and the ASGI path with async read views. Each mode runs "
+        "in a subprocess on its own synthetic scratch database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4, help="WSGI worker threads (Waitress default: 4).")
+        parser.add_argument('--readers', type=int, default=16, help="Concurrent reading clients.")
+        parser.add_argument('--writers', type=int, default=4, help="Concurrent booking clients.")
+        parser.add_argument('--write-dates', type=int, default=20, help="Dates booked per write request.")
+        parser.add_argument('--duration', type=float, default=5.0)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--mode', choices=['wsgi', 'asgi'], help="Run one mode in this process (internal).")
+
+    def handle(self, *args, **options):
+        if options['mode']:
+            return self.run_mode(options)
+
+        flags = []
+        for name in ('threads', 'readers', 'writers', 'write_dates', 'duration', 'seed'):
+            flags += [f"--{name.replace('_', '-')}", str(options[name])]
+        self.stdout.write(
+            f"{'mode':<6}{'reads/s':>9}{'read p50':>10}{'read p95':>10}{'read p99':>10}"
+            f"{'writes/s':>10}{'write p95':>11}{'errors':>8}   (latencies in ms)"
+        )
+        for mode in ('wsgi', 'asgi'):
+            env = dict(os.environ, ASYNC_READ_VIEWS='True' if mode == 'asgi' else 'False')
+            if mode == 'asgi':
+                env.setdefault('DB_CONN_MAX_AGE', '0')
+            completed = subprocess.run(
+                [sys.executable, '-m', 'django', 'bench_asgi', '--mode', mode, *flags],
+                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+            )
+            if completed.returncode:
+                raise CommandError(f"{mode} run failed:\n{completed.stderr}")
+            r = json.loads(completed.stdout.strip().splitlines()[-1])
+            self.stdout.write(
+                f"{mode:<6}{r['reads_per_s']:>9.0f}{r['read_p50']:>10.1f}{r['read_p95']:>10.1f}{r['read_p99']:>10.1f}"
+                f"{r['writes_per_s']:>10.1f}{r['write_p95']:>11.1f}{r['errors']:>8}"
+            )
+
+    def run_mode(self, options):
+        today = date.today()
+        with scratch_database(), override_settings(ALLOWED_HOSTS=['testserver'], DEBUG=False):
+            generate_menu_data(
+                start=today - timedelta(days=365), end=today + timedelta(weeks=4), today=today, seed=options['seed'],
+            )
+            self.days = sorted(set(DateHasDish.objects.values_list('date_saved', flat=True)))
+            if options['mode'] == 'wsgi':
+                from bookingbite.wsgi import application
+                result = self.run_wsgi(application, options)
+            else:
+                from bookingbite.asgi import application
+                result = asyncio.run(self.run_asgi(application, options))
+        self.stdout.write(json.dumps(result))
+
+    def read_request(self, rng):
+        """
+        (method, path, query, body) of a random read: day, search or week.
+        """
+        kind = rng.random()
+        if kind < 0.4:
+            return 'GET', f'/chef-management/day-dishes/{rng.choice(self.days).isoformat()}/', '', b''
+        if kind < 0.8:
+            return 'GET', '/chef-management/search-dishes/', f'q={rng.choice(BASES + DISHES)}', b''
+        return 'GET', '/booking/week/', f'date={rng.choice(self.days).isoformat()}', b''
+
+    def write_request(self, rng, options):
+        dates = [rng.choice(self.days).isoformat() for _ in range(options['write_dates'])]
+        return 'POST', '/booking/add-attendance/', '', json.dumps(dates).encode()
+
+    def run_wsgi(self, application, options):
+        """
+        Clients hand requests to a fixed pool of worker threads, like Waitress'
+        task queue; latency includes the time a request waits for a thread.
+        """
+        pool = ThreadPoolExecutor(max_workers=options['threads'])
+
+        def call(method, path, query, body):
+            status = []
+            response = application(make_environ(method, path, query, body), lambda s, h, e=None: status.append(s))
+            try:
+                for _ in response:
+                    pass
+            finally:
+                response.close()
+            return int(status[0].split()[0])
+
+        def client(samples, errors, make, seed, deadline):
+            rng = random.Random(seed)
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                if pool.submit(call, *make(rng)).result() >= 400:
+                    errors.append(1)
+                samples.append(time.perf_counter() - started)
+
+        reads, writes, errors = [], [], []
+        deadline = time.perf_counter() + options['duration']
+        clients = [
+            threading.Thread(target=client, args=(reads, errors, self.read_request, f'r{i}', deadline))
+            for i in range(options['readers'])
+        ] + [
+            threading.Thread(
+                target=client, args=(writes, errors, lambda rng: self.write_request(rng, options), f'w{i}', deadline),
+            )
+            for i in range(options['writers'])
+        ]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        pool.shutdown()
+        return self.summary(reads, writes, errors, options['duration'])
+
+    async def run_asgi(self, application, options):
+        reads, writes, errors = [], [], []
+        deadline = time.perf_counter() + options['duration']
+
+        async def client(samples, make, seed):
+            rng = random.Random(seed)
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                if await asgi_request(application, *make(rng)) >= 400:
+                    errors.append(1)
+                samples.append(time.perf_counter() - started)
+
+        await asyncio.gather(
+            *(client(reads, self.read_request, f'r{i}') for i in range(options['readers'])),
+            *(client(writes, lambda rng: self.write_request(rng, options), f'w{i}') for i in range(options['writers'])),
+        )
+        return self.summary(reads, writes, errors, options['duration'])
+
+    @staticmethod
+    def summary(reads, writes, errors, duration):
+        reads, writes = sorted(reads), sorted(writes)
+        return {
+            'reads_per_s': len(reads) / duration,
+            'read_p50': (percentile(reads, 50) or 0) * 1000,
+            'read_p95': (percentile(reads, 95) or 0) * 1000,
+            'read_p99': (percentile(reads, 99) or 0) * 1000,
+            'writes_per_s': len(writes) / duration,
+            'write_p95': (percentile(writes, 95) or 0) * 1000,
+            'errors': len(errors),
+        }
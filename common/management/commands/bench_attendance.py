@@ -0,0 +1,82 @@
+# bbserver/common/management/commands/bench_attendance.py
+
+import json
+import random
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError
+from django.db.models import F
+
+from common import counters
+from common.benchmarking import run_threads, scratch_database
+from common.models import DateSaved
+
+
+def single_row_increment(day):
+    """
+    The pre-sharding add_attendance write path: get_or_create, then an
+    F-expression save on the shared DateSaved row.
+    """
+    date_saved, _ = DateSaved.objects.get_or_create(date_saved=day)
+    date_saved.attendance = F('attendance') + 1
+    date_saved.save()
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark sustained attendance increments/sec for the single-row and "
+        "sharded counter designs on a scratch SQLite database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', default='8,16,32', help="Comma-separated writer thread counts.")
+        parser.add_argument('--duration', type=float, default=5.0, help="Seconds per run.")
+        parser.add_argument('--dates', type=int, default=5, help="Number of hot dates being booked.")
+        parser.add_argument('--json', action='store_true', help="Print results as JSON.")
+
+    def handle(self, *args, **options):
+        writer_counts = [int(w) for w in options['writers'].split(',') if w.strip()]
+        monday = date.today() - timedelta(days=date.today().weekday())
+        hot_dates = [monday + timedelta(days=i) for i in range(options['dates'])]
+        designs = {
+            'single_row': single_row_increment,
+            'sharded': lambda day: counters.increment(day, 1),
+        }
+
+        results = []
+        with scratch_database():
+            for design, increment in designs.items():
+                for writers in writer_counts:
+                    DateSaved.objects.all().delete()
+                    DateSaved.objects.bulk_create([DateSaved(date_saved=d, attendance=0) for d in hot_dates])
+
+                    def target():
+                        try:
+                            increment(random.choice(hot_dates))
+                            return True
+                        except OperationalError:
+                            # "database is locked"
+                            return False
+
+                    ok, failed, elapsed = run_threads(writers, target, options['duration'])
+                    counters.fold_attendance()
+                    total = sum(DateSaved.objects.values_list('attendance', flat=True))
+                    results.append({
+                        'design': design,
+                        'writers': writers,
+                        'increments_per_sec': round(ok / elapsed, 1),
+                        'failed': failed,
+                        'consistent': total == ok,
+                    })
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(f"{'design':<12}{'writers':>8}{'incr/s':>12}{'failed':>8}{'consistent':>12}")
+        for row in results:
+            self.stdout.write(
+                f"{row['design']:<12}{row['writers']:>8}{row['increments_per_sec']:>12}"
+                f"{row['failed']:>8}{str(row['consistent']):>12}"
+            )
@@ -0,0 +1,72 @@
+# bbserver/common/management/commands/bench_autocomplete.py
+
+import random
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from chef_management.autocomplete import DishPrefixIndex
+from common.benchmarking import percentile, scratch_database
+from common.synthetic import fake_dish
+from common.models import Dish
+
+QUERIES = ['c', 'ch', 'chi', 'chick', 'kalo', 'tenbu', 'soup', 'spicy ch', 'grilled salmon', 'zzz']
+
+
+class Command(BaseCommand):
+    help = "Benchmark the in-process dish autocomplete index: build time, memory and query latency."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dishes', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=1000, help="Lookups per query.")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with scratch_database():
+            Dish.objects.bulk_create((fake_dish(rng) for _ in range(options['dishes'])), batch_size=5000)
+
+            index = DishPrefixIndex()
+            started = time.perf_counter()
+            index.warm()
+            build_seconds = time.perf_counter() - started
+
+            # Measure retained memory with a second build under tracemalloc
+            # (tracing slows the build down, so it is not timed)
+            traced = DishPrefixIndex()
+            tracemalloc.start()
+            traced.warm()
+            memory, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del traced
+
+            self.stdout.write(
+                f"Built index for {options['dishes']} dishes in {build_seconds:.2f}s, "
+                f"{memory / 1024 / 1024:.1f} MiB retained "
+                f"({memory / options['dishes']:.0f} bytes/dish)\n"
+            )
+
+            self.stdout.write(f"{'query':<16}{'category':<10}{'p50 us':>10}{'p99 us':>10}{'hits':>6}")
+            for q in QUERIES:
+                for category in ('', 'main'):
+                    timings = []
+                    for _ in range(options['repeat']):
+                        t0 = time.perf_counter()
+                        results = index.complete(q, category)
+                        timings.append((time.perf_counter() - t0) * 1_000_000)
+                    timings.sort()
+                    self.stdout.write(
+                        f"{q:<16}{category or '-':<10}{percentile(timings, 50):>10.1f}"
+                        f"{percentile(timings, 99):>10.1f}{len(results):>6}"
+                    )
+
+            dish = fake_dish(rng)
+            dish.save()
+            t0 = time.perf_counter()
+            index.add(dish)
+            add_us = (time.perf_counter() - t0) * 1_000_000
+            t0 = time.perf_counter()
+            index.remove(dish.pk)
+            remove_us = (time.perf_counter() - t0) * 1_000_000
+            self.stdout.write(f"\nIncremental add: {add_us:.0f} us, remove: {remove_us:.0f} us")
@@ -0,0 +1,162 @@
+# bbserver/common/management/commands/bench_endpoints.py
+
+import json
+import platform
+import random
+import subprocess
+import threading
+import time
+from datetime import date, timedelta
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+
+from common.benchmarking import make_environ, percentile, run_threads, scratch_database
+from common.models import DateHasDish
+from common.synthetic import BASES, DISHES, generate_menu_data
+
+ENDPOINTS = ('week', 'add-attendance', 'rate', 'day-dishes', 'search-dishes')
+SEARCH_TERMS = [*BASES, *DISHES, 'chi', 'spicy ch', 'grilled salmon']
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the main endpoints in-process through the bookingbite.wsgi application on a "
+        "synthetic scratch database. Reports throughput, p50/p95/p99 latency and SQL count/time "
+        "per request, optionally as JSON for comparing runs across commits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', default='1,8',
+                            help="Comma-separated thread counts to run each endpoint with.")
+        parser.add_argument('--duration', type=float, default=5.0, help="Seconds per endpoint and concurrency.")
+        parser.add_argument('--endpoints', default=','.join(ENDPOINTS))
+        parser.add_argument('--years', type=float, default=2.0, help="Synthetic menu history to seed.")
+        parser.add_argument('--catalog-size', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help="Write the results as JSON to this path.")
+
+    def handle(self, *args, **options):
+        endpoints = [e.strip() for e in options['endpoints'].split(',') if e.strip()]
+        unknown = set(endpoints) - set(ENDPOINTS)
+        if unknown:
+            self.stderr.write(f"Unknown endpoints: {', '.join(sorted(unknown))}. Choose from {', '.join(ENDPOINTS)}.")
+            return
+        levels = [int(c) for c in options['concurrency'].split(',')]
+
+        today = date.today()
+        with scratch_database(), override_settings(ALLOWED_HOSTS=['testserver'], DEBUG=False):
+            generate_menu_data(
+                start=today - timedelta(days=round(365.25 * options['years'])),
+                end=today + timedelta(weeks=4),
+                today=today,
+                seed=options['seed'],
+                catalog_size=options['catalog_size'],
+            )
+            # Imported here so the autocomplete warm-up sees the scratch database
+            from bookingbite.wsgi import application
+
+            self.days = sorted(set(DateHasDish.objects.values_list('date_saved', flat=True)))
+            self.past_days = [d for d in self.days if d <= today]
+            self.rated_ids = list(
+                DateHasDish.objects.filter(date_saved__lte=today).values_list('pk', flat=True)
+            )
+            self.application = application
+
+            self.stdout.write(
+                f"{'endpoint':<16}{'threads':>8}{'req/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+                f"{'sql/req':>9}{'sql ms':>8}{'errors':>8}"
+            )
+            results = []
+            for endpoint in endpoints:
+                for workers in levels:
+                    result = self.run(endpoint, workers, options['duration'], options['seed'])
+                    results.append(result)
+                    self.stdout.write(
+                        f"{endpoint:<16}{workers:>8}{result['throughput']:>10.0f}"
+                        f"{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}{result['p99_ms']:>9.2f}"
+                        f"{result['sql_queries_per_request']:>9.1f}{result['sql_ms_per_request']:>8.2f}"
+                        f"{result['errors']:>8}"
+                    )
+
+        if options['output']:
+            report = {
+                'revision': git_revision(),
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'options': {k: options[k] for k in ('concurrency', 'duration', 'years', 'catalog_size', 'seed')},
+                'results': results,
+            }
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Wrote {options['output']}")
+
+    def make_request(self, endpoint, rng):
+        if endpoint == 'week':
+            return make_environ('GET', '/booking/week/', f'date={rng.choice(self.days).isoformat()}')
+        if endpoint == 'day-dishes':
+            return make_environ('GET', f'/chef-management/day-dishes/{rng.choice(self.days).isoformat()}/')
+        if endpoint == 'search-dishes':
+            return make_environ('GET', '/chef-management/search-dishes/', f'q={rng.choice(SEARCH_TERMS)}')
+        if endpoint == 'add-attendance':
+            body = json.dumps([rng.choice(self.days).isoformat()]).encode()
+            return make_environ('POST', '/booking/add-attendance/', body=body)
+        body = json.dumps({'date_has_dish_id': rng.choice(self.rated_ids), 'rating': rng.randint(1, 5)}).encode()
+        return make_environ('POST', '/booking/rate/', body=body)
+
+    def run(self, endpoint, workers, duration, seed):
+        samples = []     # (latency ms, SQL queries, SQL ms); list.append is thread-safe
+        local = threading.local()
+
+        def count_sql(execute, sql, params, many, context):
+            t0 = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                local.queries += 1
+                local.sql_time += time.perf_counter() - t0
+
+        def request():
+            if not hasattr(local, 'rng'):
+                local.rng = random.Random(f'{seed}-{endpoint}-{threading.get_ident()}')
+            environ = self.make_request(endpoint, local.rng)
+            status = []
+            local.queries, local.sql_time = 0, 0.0
+            t0 = time.perf_counter()
+            with connection.execute_wrapper(count_sql):
+                response = self.application(environ, lambda s, headers, exc_info=None: status.append(s))
+                try:
+                    for _ in response:
+                        pass
+                finally:
+                    response.close()
+            samples.append(((time.perf_counter() - t0) * 1000, local.queries, local.sql_time * 1000))
+            return int(status[0].split()[0]) < 400
+
+        successes, failures, elapsed = run_threads(workers, request, duration)
+        latencies = sorted(s[0] for s in samples)
+        count = len(samples) or 1
+        return {
+            'endpoint': endpoint,
+            'concurrency': workers,
+            'requests': successes + failures,
+            'errors': failures,
+            'throughput': (successes + failures) / elapsed,
+            'p50_ms': percentile(latencies, 50) or 0,
+            'p95_ms': percentile(latencies, 95) or 0,
+            'p99_ms': percentile(latencies, 99) or 0,
+            'sql_queries_per_request': sum(s[1] for s in samples) / count,
+            'sql_ms_per_request': sum(s[2] for s in samples) / count,
+        }
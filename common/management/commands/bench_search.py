@@ -0,0 +1,57 @@
+# bbserver/common/management/commands/bench_search.py
+
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+
+from common.benchmarking import scratch_database
+from common.synthetic import fake_dish
+from common.models import Dish, DateSaved, DateHasDish
+
+QUERIES = ['c', 'ch', 'kalo', 'tenbu', 'chi', 'chick', 'soup', 'spicy ch', 'grilled salmon', 'lentil cu', 'mush ri', 'zzz']
+
+
+class Command(BaseCommand):
+    help = "Benchmark search-dishes in LIKE and FTS mode on a synthetic catalog (scratch database)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dishes', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=20, help="Requests per query and mode.")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with scratch_database(), override_settings(ALLOWED_HOSTS=['testserver']):
+            started = time.perf_counter()
+            Dish.objects.bulk_create((fake_dish(rng) for _ in range(options['dishes'])), batch_size=5000)
+            # A year of menus so the recency boost has something to rank by
+            today = date.today()
+            days = [today - timedelta(days=i) for i in range(365) if (today - timedelta(days=i)).weekday() < 5]
+            DateSaved.objects.bulk_create([DateSaved(date_saved=d, attendance=0) for d in days])
+            DateHasDish.objects.bulk_create(
+                [
+                    DateHasDish(date_saved_id=d, dish_id_id=dish_id)
+                    for d in days for dish_id in rng.sample(range(1, options['dishes'] + 1), 8)
+                ],
+                batch_size=5000,
+            )
+            self.stdout.write(f"Seeded {options['dishes']} dishes in {time.perf_counter() - started:.1f}s\n")
+
+            client = Client()
+            self.stdout.write(f"{'query':<16}{'mode':<6}{'mean ms':>10}{'p95 ms':>10}{'hits':>6}")
+            for q in QUERIES:
+                for mode in ('like', 'fts'):
+                    timings = []
+                    for _ in range(options['repeat']):
+                        t0 = time.perf_counter()
+                        response = client.get('/chef-management/search-dishes/', {'q': q, 'mode': mode})
+                        timings.append((time.perf_counter() - t0) * 1000)
+                    timings.sort()
+                    hits = len(response.json()['results'])
+                    p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+                    self.stdout.write(f"{q:<16}{mode:<6}{statistics.mean(timings):>10.2f}{p95:>10.2f}{hits:>6}")
@@ -0,0 +1,73 @@
+# bbserver/common/management/commands/bench_serializers.py
+
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from common.benchmarking import scratch_database
+from common.models import DateHasDish, Dish
+from common.serializers import (
+    DATE_HAS_DISH_COLUMNS, DISH_FIELDS, DateHasDishSerializer, DishSerializer, date_has_dish_row, dish_row,
+)
+from common.synthetic import generate_menu_data
+
+
+def rate(rows, fn, repeat):
+    """
+    Best-of-``repeat`` rows per second for ``fn()``, which handles ``rows`` rows.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return rows / best
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare rows/s of the DRF DishSerializer/DateHasDishSerializer with the row fast path in "
+        "common.serializers, with and without the query (scratch database)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help="DateHasDish rows per run.")
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        today = date.today()
+        with scratch_database():
+            generate_menu_data(
+                start=today - timedelta(days=730), end=today, today=today, seed=options['seed'], dishes_per_day=10,
+            )
+            links = DateHasDish.objects.order_by('pk')[:options['rows']]
+            dishes = Dish.objects.order_by('pk')[:options['rows']]
+            repeat = options['repeat']
+
+            instances = list(links.select_related('date_saved', 'dish_id'))
+            tuples = list(links.values_list(*DATE_HAS_DISH_COLUMNS))
+            dish_instances = list(dishes)
+            dish_tuples = list(dishes.values_list(*DISH_FIELDS))
+            tz = timezone.get_current_timezone()
+
+            cases = [
+                ('DateHasDish serialize', len(instances),
+                 lambda: DateHasDishSerializer(instances, many=True).data,
+                 lambda: [date_has_dish_row(row, tz) for row in tuples]),
+                ('DateHasDish query+serialize', len(instances),
+                 lambda: DateHasDishSerializer(list(links.select_related('date_saved', 'dish_id')), many=True).data,
+                 lambda: [date_has_dish_row(row, tz) for row in links.values_list(*DATE_HAS_DISH_COLUMNS)]),
+                ('Dish serialize', len(dish_instances),
+                 lambda: DishSerializer(dish_instances, many=True).data,
+                 lambda: [dish_row(row, tz) for row in dish_tuples]),
+                ('Dish query+serialize', len(dish_instances),
+                 lambda: DishSerializer(list(dishes), many=True).data,
+                 lambda: [dish_row(row, tz) for row in dishes.values_list(*DISH_FIELDS)]),
+            ]
+            self.stdout.write(f"{'case':<30}{'rows':>7}{'DRF rows/s':>13}{'fast rows/s':>13}{'speedup':>9}")
+            for name, rows, drf, fast in cases:
+                drf_rate, fast_rate = rate(rows, drf, repeat), rate(rows, fast, repeat)
+                self.stdout.write(f"{name:<30}{rows:>7}{drf_rate:>13,.0f}{fast_rate:>13,.0f}{fast_rate / drf_rate:>8.1f}x")
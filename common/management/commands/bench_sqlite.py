@@ -0,0 +1,139 @@
+# bbserver/common/management/commands/bench_sqlite.py
+
+import random
+import threading
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+from django.db.models import F
+from django.test.utils import override_settings
+
+from common import counters
+from common.benchmarking import percentile, scratch_database
+from common.synthetic import fake_dish
+from common.models import Dish, DateSaved, DateHasDish
+
+# What the database ran with before the connection profile: SQLite defaults,
+# a new connection per request
+BASELINE_PRAGMAS = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare mixed read/write throughput on a scratch SQLite file with the "
+        "default connection setup versus settings.SQLITE_PRAGMAS + persistent connections."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=5.0)
+        parser.add_argument('--write-ratio', type=float, default=0.2)
+        parser.add_argument('--weeks', type=int, default=52)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with scratch_database():
+            mondays = self.seed(rng, options['weeks'])
+            runs = [
+                ('baseline', BASELINE_PRAGMAS, False),
+                ('profile', settings.SQLITE_PRAGMAS, True),
+            ]
+            self.stdout.write(
+                f"{'setup':<10}{'ops/s':>10}{'reads/s':>10}{'writes/s':>10}"
+                f"{'read p50 ms':>13}{'read p95 ms':>13}{'errors':>8}"
+            )
+            for name, pragmas, persistent in runs:
+                with override_settings(SQLITE_PRAGMAS=pragmas):
+                    connection.close()
+                    result = self.run(mondays, options, persistent)
+                self.stdout.write(
+                    f"{name:<10}{result['ops']:>10.0f}{result['reads']:>10.0f}{result['writes']:>10.0f}"
+                    f"{result['read_p50']:>13.2f}{result['read_p95']:>13.2f}{result['errors']:>8}"
+                )
+
+    def seed(self, rng, weeks):
+        Dish.objects.bulk_create([fake_dish(rng) for _ in range(500)])
+        first_monday = date.today() - timedelta(days=date.today().weekday() + 7 * weeks)
+        mondays = [first_monday + timedelta(weeks=w) for w in range(weeks)]
+        days = [m + timedelta(days=d) for m in mondays for d in range(5)]
+        DateSaved.objects.bulk_create([DateSaved(date_saved=d, attendance=0) for d in days])
+        DateHasDish.objects.bulk_create(
+            [DateHasDish(date_saved_id=d, dish_id_id=dish_id) for d in days for dish_id in rng.sample(range(1, 501), 8)]
+        )
+        return mondays
+
+    def run(self, mondays, options, persistent):
+        """
+        Reads are the week + attendance queries behind booking/week and
+        day-dishes (without serialization, so SQLite dominates); writes are
+        attendance increments and rating updates.
+        """
+        duration, write_ratio = options['duration'], options['write_ratio']
+        link_ids = list(DateHasDish.objects.values_list('pk', flat=True))
+        lock = threading.Lock()
+        totals = {'reads': 0, 'writes': 0, 'errors': 0}
+        read_times = []
+        window = {}
+
+        def open_window():
+            window['deadline'] = time.perf_counter() + duration
+
+        barrier = threading.Barrier(options['threads'], action=open_window)
+
+        def work(seed):
+            rng = random.Random(seed)
+            reads, writes, errors, timings = 0, 0, 0, []
+            barrier.wait()
+            while time.perf_counter() < window['deadline']:
+                monday = rng.choice(mondays)
+                try:
+                    if rng.random() < write_ratio:
+                        if rng.random() < 0.5:
+                            counters.increment(monday + timedelta(days=rng.randint(0, 4)), 1)
+                        else:
+                            DateHasDish.objects.filter(pk=rng.choice(link_ids)).update(
+                                rating_sum=F('rating_sum') + 4, rating_count=F('rating_count') + 1
+                            )
+                        writes += 1
+                    else:
+                        t0 = time.perf_counter()
+                        list(
+                            DateHasDish.objects
+                            .filter(date_saved__gte=monday, date_saved__lte=monday + timedelta(days=4))
+                            .values('pk', 'date_saved', 'quantity', 'rating_sum', 'rating_count',
+                                    'dish_id__dish_name', 'dish_id__dish_type')
+                        )
+                        counters.attendance_totals([monday + timedelta(days=i) for i in range(5)])
+                        timings.append((time.perf_counter() - t0) * 1000)
+                        reads += 1
+                except OperationalError:
+                    errors += 1
+                if not persistent:
+                    # CONN_MAX_AGE = 0: a fresh connection for every request
+                    connection.close()
+            connection.close()
+            with lock:
+                totals['reads'] += reads
+                totals['writes'] += writes
+                totals['errors'] += errors
+                read_times.extend(timings)
+
+        threads = [threading.Thread(target=work, args=(i,)) for i in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        read_times.sort()
+        return {
+            'ops': (totals['reads'] + totals['writes']) / duration,
+            'reads': totals['reads'] / duration,
+            'writes': totals['writes'] / duration,
+            'read_p50': percentile(read_times, 50) or 0,
+            'read_p95': percentile(read_times, 95) or 0,
+            'errors': totals['errors'],
+        }
@@ -0,0 +1,39 @@
+# bbserver/common/management/commands/check_dish_stats.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from common.dish_stats import STAT_FIELDS, check_dish_stats, refresh_dish_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the DishStats rollup with its DateHasDish rows and list the dishes that differ. "
+        "Exits with an error if any do, unless --fix is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help="Recompute the rows that differ.")
+        parser.add_argument('--limit', type=int, default=20, help="Dishes to list (default 20).")
+
+    def handle(self, *args, **options):
+        mismatches = check_dish_stats()
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS('DishStats is consistent.'))
+            return
+
+        for dish_id, stored, expected in mismatches[:options['limit']]:
+            self.stdout.write(f'dish {dish_id}: stored {self.describe(stored)}, expected {self.describe(expected)}')
+        if len(mismatches) > options['limit']:
+            self.stdout.write(f'... and {len(mismatches) - options["limit"]} more')
+
+        if options['fix']:
+            refresh_dish_stats(dish_id for dish_id, _, _ in mismatches)
+            self.stdout.write(self.style.SUCCESS(f'Recomputed stats for {len(mismatches)} dish(es).'))
+        else:
+            raise CommandError(f'{len(mismatches)} dish(es) have inconsistent stats. Run with --fix to repair them.')
+
+    @staticmethod
+    def describe(values):
+        if values is None:
+            return 'no row'
+        return ', '.join(f'{field}={value}' for field, value in zip(STAT_FIELDS, values))
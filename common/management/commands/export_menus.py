@@ -0,0 +1,40 @@
+# bbserver/common/management/commands/export_menus.py
+
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from booking.export import FORMATS, parse_range, stream_export
+
+
+class Command(BaseCommand):
+    help = (
+        "Export menus, attendance and ratings for a date range as NDJSON or CSV "
+        "(the same output as GET booking/export/)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', required=True, help="First date (YYYY-MM-DD).")
+        parser.add_argument('--end', required=True, help="Last date (YYYY-MM-DD), inclusive.")
+        parser.add_argument('--format', choices=FORMATS, default='ndjson')
+        parser.add_argument('--output', help="File to write. Default: standard output.")
+
+    def handle(self, *args, **options):
+        try:
+            start, end = parse_range(options['start'], options['end'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        chunks = stream_export(start, end, options['format'])
+        if options['output']:
+            written = 0
+            with open(options['output'], 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    written += len(chunk)
+            self.stderr.write(f"Wrote {written} bytes to {options['output']}.")
+        else:
+            out = sys.stdout.buffer
+            for chunk in chunks:
+                out.write(chunk)
+            out.flush()
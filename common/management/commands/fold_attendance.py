@@ -0,0 +1,28 @@
+# bbserver/common/management/commands/fold_attendance.py
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from common.counters import fold_attendance
+
+
+class Command(BaseCommand):
+    help = "Fold sharded attendance counts into DateSaved.attendance (schedule this periodically)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date', action='append', dest='dates', default=None,
+            help="Only fold this date (YYYY-MM-DD). May be repeated.",
+        )
+
+    def handle(self, *args, **options):
+        dates = options['dates']
+        if dates is not None:
+            try:
+                dates = [datetime.strptime(d, '%Y-%m-%d').date() for d in dates]
+            except ValueError:
+                raise CommandError('Dates must use YYYY-MM-DD.')
+
+        folded = fold_attendance(dates)
+        self.stdout.write(self.style.SUCCESS(f'Folded attendance shards into {folded} date(s).'))
@@ -0,0 +1,73 @@
+# bbserver/common/management/commands/generate_menu_data.py
+
+from datetime import date, datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from common.models import Dish, DateSaved
+from common.synthetic import clear_menu_data, generate_menu_data
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Invalid date {value!r}. Use YYYY-MM-DD.')
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate deterministic synthetic dishes, dates and dish links for scale testing. "
+        "Writes to the configured database; a running server picks the new menus up "
+        "within CHANGE_POLL_SECONDS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--years', type=float, default=10.0, help="History length before --today.")
+        parser.add_argument('--start', help="First date (YYYY-MM-DD); overrides --years.")
+        parser.add_argument('--end', help="Last date (YYYY-MM-DD). Default: four weeks after --today.")
+        parser.add_argument('--today', help="Dates after this are future menus. Default: today.")
+        parser.add_argument('--catalog-size', type=int, default=2000)
+        parser.add_argument('--dishes-per-day', type=int, default=8)
+        parser.add_argument('--sites', type=int, default=1, help="Multiplies dishes per day and attendance.")
+        parser.add_argument('--attendance-mean', type=float, default=120.0)
+        parser.add_argument('--attendance-sd', type=float, default=25.0)
+        parser.add_argument('--rating-rate', type=float, default=0.25,
+                            help="Fraction of diners who rate the dish they ate.")
+        parser.add_argument('--rating-mean', type=float, default=3.8)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--clear', action='store_true', help="Delete all existing menu data first.")
+
+    def handle(self, *args, **options):
+        today = parse_date(options['today']) if options['today'] else date.today()
+        start = parse_date(options['start']) if options['start'] else today - timedelta(days=round(365.25 * options['years']))
+        end = parse_date(options['end']) if options['end'] else today + timedelta(weeks=4)
+        if start > end:
+            raise CommandError('--start must not be after --end.')
+
+        if options['clear']:
+            clear_menu_data()
+        elif Dish.objects.exists() or DateSaved.objects.exists():
+            raise CommandError('The database already has menu data. Pass --clear to replace it.')
+
+        counts = generate_menu_data(
+            start=start,
+            end=end,
+            today=today,
+            seed=options['seed'],
+            catalog_size=options['catalog_size'],
+            dishes_per_day=options['dishes_per_day'],
+            sites=options['sites'],
+            attendance_mean=options['attendance_mean'],
+            attendance_sd=options['attendance_sd'],
+            rating_rate=options['rating_rate'],
+            rating_mean=options['rating_mean'],
+            batch_size=options['batch_size'],
+            log=lambda message: self.stdout.write(f'  inserted {message}'),
+        )
+        rows = counts['dishes'] + counts['dates'] + counts['links']
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {counts['dishes']} dishes, {counts['dates']} dates and {counts['links']} links "
+            f"({rows / counts['seconds']:,.0f} rows/s, {counts['seconds']:.1f}s)."
+        ))
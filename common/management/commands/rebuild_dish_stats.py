@@ -0,0 +1,13 @@
+# bbserver/common/management/commands/rebuild_dish_stats.py
+
+from django.core.management.base import BaseCommand
+
+from common.dish_stats import rebuild_dish_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the DishStats rollup of every dish from its DateHasDish rows."
+
+    def handle(self, *args, **options):
+        rows = rebuild_dish_stats()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {rows} dish(es).'))
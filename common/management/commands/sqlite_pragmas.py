@@ -0,0 +1,35 @@
+# bbserver/common/management/commands/sqlite_pragmas.py
+
+import sqlite3
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from common.db import PROFILE_PRAGMAS, active_pragmas, configured_pragmas
+
+
+class Command(BaseCommand):
+    help = "Show the configured SQLite connection profile and the PRAGMAs active on a new connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            self.stdout.write(f"Database '{options['database']}' is {connection.vendor}, not SQLite.")
+            return
+
+        configured = dict(configured_pragmas())
+        connection.ensure_connection()
+        active = active_pragmas(connection)
+
+        settings_dict = connection.settings_dict
+        self.stdout.write(f"Database:      {settings_dict['NAME']}")
+        self.stdout.write(f"SQLite:        {sqlite3.sqlite_version}")
+        self.stdout.write(f"CONN_MAX_AGE:  {settings_dict['CONN_MAX_AGE']}")
+        self.stdout.write(f"Driver timeout: {settings_dict['OPTIONS'].get('timeout', 5.0)}s\n")
+
+        self.stdout.write(f"{'pragma':<14}{'configured':>14}{'active':>14}")
+        for name in PROFILE_PRAGMAS:
+            self.stdout.write(f"{name:<14}{configured.get(name, '-'):>14}{str(active[name]):>14}")
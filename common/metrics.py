@@ -0,0 +1,154 @@
+# bbserver/common/metrics.py
+
+"""
+In-process request metrics, exposed in the Prometheus text format on
+``/metrics`` (see ``common.views.metrics``).
+
+Every thread records into its own shard of counters and histograms, so an
+update never takes a lock or touches memory another thread writes; the only
+lock is taken once per thread, when its shard is registered. A scrape sums
+the shards. Counts are per process: under Waitress that is all threads.
+"""
+
+import threading
+from bisect import bisect_left
+
+# Upper bounds in seconds; +Inf is implicit
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+class _Shard:
+    """
+    One thread's metrics. Only the owning thread writes to it.
+    """
+    __slots__ = ('requests', 'exceptions', 'latency', 'sql', 'in_flight')
+
+    def __init__(self):
+        self.requests = {}      # (view, method, status) -> count
+        self.exceptions = {}    # view -> count
+        self.latency = {}       # (view, method) -> [bucket counts..., +Inf count, sum]
+        self.sql = {}           # (view, method) -> same layout as latency
+        self.in_flight = 0
+
+
+def _observe(histograms, key, buckets, value):
+    histogram = histograms.get(key)
+    if histogram is None:
+        histogram = histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+    histogram[bisect_left(buckets, value)] += 1
+    histogram[-1] += value
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def request_started(self):
+        self._shard().in_flight += 1
+
+    def request_finished(self, view, method, status, seconds, sql_seconds=None):
+        shard = self._shard()
+        shard.in_flight -= 1
+        key = (view, method, status)
+        shard.requests[key] = shard.requests.get(key, 0) + 1
+        _observe(shard.latency, (view, method), LATENCY_BUCKETS, seconds)
+        if sql_seconds is not None:
+            _observe(shard.sql, (view, method), SQL_BUCKETS, sql_seconds)
+
+    def exception(self, view):
+        shard = self._shard()
+        shard.exceptions[view] = shard.exceptions.get(view, 0) + 1
+
+    def collect(self):
+        """
+        Merge all shards into plain dicts (a consistent-enough snapshot: each
+        dict/list copy is atomic, the whole scrape is not).
+        """
+        with self._lock:
+            shards = list(self._shards)
+        requests, exceptions, latency, sql, in_flight = {}, {}, {}, {}, 0
+        for shard in shards:
+            in_flight += shard.in_flight
+            for key, count in dict(shard.requests).items():
+                requests[key] = requests.get(key, 0) + count
+            for key, count in dict(shard.exceptions).items():
+                exceptions[key] = exceptions.get(key, 0) + count
+            for source, target in ((shard.latency, latency), (shard.sql, sql)):
+                for key, histogram in dict(source).items():
+                    merged = target.setdefault(key, [0] * len(histogram))
+                    for i, value in enumerate(list(histogram)):
+                        merged[i] += value
+        return {'requests': requests, 'exceptions': exceptions, 'latency': latency, 'sql': sql,
+                'in_flight': in_flight}
+
+    def render(self):
+        """
+        Return the metrics in the Prometheus text exposition format.
+        """
+        data = self.collect()
+        lines = [
+            '# HELP bookingbite_requests_total Requests by view, method and response status.',
+            '# TYPE bookingbite_requests_total counter',
+        ]
+        for (view, method, status), count in sorted(data['requests'].items()):
+            lines.append(f'bookingbite_requests_total{_labels(view=view, method=method, status=status)} {count}')
+
+        lines += [
+            '# HELP bookingbite_exceptions_total Unhandled exceptions raised by a view.',
+            '# TYPE bookingbite_exceptions_total counter',
+        ]
+        for view, count in sorted(data['exceptions'].items()):
+            lines.append(f'bookingbite_exceptions_total{_labels(view=view)} {count}')
+
+        for name, help_text, buckets, histograms in (
+            ('bookingbite_request_duration_seconds', 'Time spent in Django per request.',
+             LATENCY_BUCKETS, data['latency']),
+            ('bookingbite_request_sql_seconds', 'Total SQL time per request.', SQL_BUCKETS, data['sql']),
+        ):
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+            for (view, method), histogram in sorted(histograms.items()):
+                cumulative = 0
+                for bound, count in zip((*buckets, '+Inf'), histogram):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_labels(view=view, method=method, le=bound)} {cumulative}')
+                lines.append(f'{name}_sum{_labels(view=view, method=method)} {histogram[-1]:.6f}')
+                lines.append(f'{name}_count{_labels(view=view, method=method)} {cumulative}')
+
+        lines += [
+            '# HELP bookingbite_requests_in_flight Requests currently being handled.',
+            '# TYPE bookingbite_requests_in_flight gauge',
+            f"bookingbite_requests_in_flight {data['in_flight']}",
+            '# HELP bookingbite_waitress_threads Live Waitress worker threads (0 outside Waitress).',
+            '# TYPE bookingbite_waitress_threads gauge',
+            f'bookingbite_waitress_threads {waitress_threads()}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+def waitress_threads():
+    """
+    Count Waitress' task threads, which it names "waitress-<n>".
+    """
+    return sum(1 for thread in threading.enumerate() if thread.name.startswith('waitress-'))
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,228 @@
+# bbserver/common/middleware.py
+
+import logging
+import time
+from types import MethodType
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+from .changes import watcher
+from .metrics import registry
+from .timing import RequestTiming, activate, current_timing, deactivate
+
+logger = logging.getLogger('bookingbite.timing')
+
+
+def _async_hook(instance, method):
+    """
+    Wrap a cheap, non-blocking sync middleware hook as a coroutine method,
+    so the ASGI handler awaits it directly instead of running it in a thread.
+    """
+    async def hook(self, *args):
+        return method(*args)
+    return MethodType(hook, instance)
+
+
+class AsyncCapableMiddleware:
+    """
+    Base for middleware that runs natively in both WSGI and ASGI mode:
+    subclasses implement __call__ for sync and __acall__ for async.
+    """
+    sync_capable = True
+    async_capable = True
+    hooks = ()
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            for name in self.hooks:
+                setattr(self, name, _async_hook(self, getattr(self, name)))
+
+
+class ServerTimingMiddleware(AsyncCapableMiddleware):
+    """
+    Record SQL count/time, view time, render/serialization time and total
+    time per request. They are sent in a ``Server-Timing`` header (visible in
+    the browser's network panel) and logged as one structured line on the
+    ``bookingbite.timing`` logger at INFO.
+
+    ``view`` covers the view function including its SQL; ``render`` is time
+    spent in ``common.timing.timed('render')`` blocks plus DRF/template
+    response rendering. Keep it first in MIDDLEWARE so ``total`` covers the
+    other middleware too.
+    """
+    hooks = ('process_view', 'process_template_response')
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.enabled = getattr(settings, 'SERVER_TIMING', True)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        timing = RequestTiming()
+        request._timing = timing
+        token = activate(timing)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            deactivate(token)
+        return self.finish(request, response, timing, started)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        timing = RequestTiming()
+        request._timing = timing
+        token = activate(timing)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            deactivate(token)
+        return self.finish(request, response, timing, started)
+
+    def finish(self, request, response, timing, started):
+        # Plain HttpResponses skip process_template_response
+        self.finish_view(request)
+        total = time.perf_counter() - started
+
+        response['Server-Timing'] = self.header(timing, total)
+        if logger.isEnabledFor(logging.INFO):
+            self.log(request, response, timing, total)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if hasattr(request, '_timing'):
+            request._view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # Called between the view returning and the response being rendered
+        timing = getattr(request, '_timing', None)
+        if timing is not None and hasattr(request, '_view_started'):
+            view_ended = time.perf_counter()
+            timing.add('view', view_ended - request._view_started)
+            request._view_started = None
+            response.add_post_render_callback(
+                lambda rendered: timing.add('render', time.perf_counter() - view_ended)
+            )
+        return response
+
+    def finish_view(self, request):
+        timing = getattr(request, '_timing', None)
+        started = getattr(request, '_view_started', None)
+        if timing is not None and started is not None:
+            timing.add('view', time.perf_counter() - started)
+            request._view_started = None
+
+    @staticmethod
+    def header(timing, total):
+        entries = [f'db;dur={timing.sql * 1000:.2f};desc="{timing.queries} queries"']
+        entries += [f'{name};dur={seconds * 1000:.2f}' for name, seconds in timing.spans.items()]
+        entries.append(f'total;dur={total * 1000:.2f}')
+        return ', '.join(entries)
+
+    @staticmethod
+    def log(request, response, timing, total):
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'sql_queries': timing.queries,
+            'sql_ms': round(timing.sql * 1000, 2),
+        }
+        fields.update((f'{name}_ms', round(seconds * 1000, 2)) for name, seconds in timing.spans.items())
+        logger.info(' '.join(f'{key}={value}' for key, value in fields.items()), extra={'timing': fields})
+
+
+def view_label(request):
+    """
+    Metrics label for the view that handled ``request``: its URL name
+    ("week_dishes", "admin:index"), or "unmatched" for a 404 on routing.
+    """
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unmatched'
+
+
+class MetricsMiddleware(AsyncCapableMiddleware):
+    """
+    Record every request in ``common.metrics.registry``: count by status,
+    latency and SQL time histograms per view, and the in-flight gauge.
+
+    Place it after ServerTimingMiddleware to reuse its SQL timings; without
+    it (SERVER_TIMING=False) it activates its own timing record.
+    """
+    hooks = ('process_exception',)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        registry.request_started()
+        started = time.perf_counter()
+        status = 500
+        timing = current_timing()
+        token = None
+        if timing is None:
+            timing = RequestTiming()
+            token = activate(timing)
+        try:
+            response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            if token is not None:
+                deactivate(token)
+            registry.request_finished(
+                view_label(request), request.method, status, time.perf_counter() - started, timing.sql,
+            )
+
+    async def __acall__(self, request):
+        registry.request_started()
+        started = time.perf_counter()
+        status = 500
+        timing = current_timing()
+        token = None
+        if timing is None:
+            timing = RequestTiming()
+            token = activate(timing)
+        try:
+            response = await self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            if token is not None:
+                deactivate(token)
+            registry.request_finished(
+                view_label(request), request.method, status, time.perf_counter() - started, timing.sql,
+            )
+
+    def process_exception(self, request, exception):
+        registry.exception(view_label(request))
+
+
+class ChangePollMiddleware(AsyncCapableMiddleware):
+    """
+    Poll ``common.changes.watcher`` before each request, so cached week
+    snapshots and forecasts reflect writes made by other processes. The poll
+    is a no-op until CHANGE_POLL_SECONDS have passed since the last one.
+    """
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        watcher.poll()
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if watcher.due():
+            await sync_to_async(watcher.poll)()
+        return await self.get_response(request)
@@ -0,0 +1,30 @@
+# Generated by Django 5.0 on 2026-10-18 10:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0007_dish_created_at_dish_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('date_saved', models.ForeignKey(db_column='date', on_delete=django.db.models.deletion.CASCADE, related_name='shards', to='common.datesaved')),
+            ],
+            options={
+                'db_table': 'attendance_shard',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='attendanceshard',
+            constraint=models.UniqueConstraint(fields=('date_saved', 'shard'), name='attendance_shard_date_shard_uniq'),
+        ),
+    ]
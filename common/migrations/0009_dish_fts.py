@@ -0,0 +1,66 @@
+# Full-text search index over dish names and descriptions (SQLite FTS5).
+
+from django.db import migrations
+
+
+FORWARD_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS dish_fts USING fts5(
+        dish_name,
+        dish_description,
+        content='dish',
+        content_rowid='dish_id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dish_fts_ai AFTER INSERT ON dish BEGIN
+        INSERT INTO dish_fts(rowid, dish_name, dish_description)
+        VALUES (new.dish_id, new.dish_name, new.dish_description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dish_fts_ad AFTER DELETE ON dish BEGIN
+        INSERT INTO dish_fts(dish_fts, rowid, dish_name, dish_description)
+        VALUES ('delete', old.dish_id, old.dish_name, old.dish_description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dish_fts_au AFTER UPDATE OF dish_name, dish_description ON dish BEGIN
+        INSERT INTO dish_fts(dish_fts, rowid, dish_name, dish_description)
+        VALUES ('delete', old.dish_id, old.dish_name, old.dish_description);
+        INSERT INTO dish_fts(rowid, dish_name, dish_description)
+        VALUES (new.dish_id, new.dish_name, new.dish_description);
+    END
+    """,
+    "INSERT INTO dish_fts(dish_fts) VALUES ('rebuild')",
+]
+
+REVERSE_SQL = [
+    "DROP TRIGGER IF EXISTS dish_fts_au",
+    "DROP TRIGGER IF EXISTS dish_fts_ad",
+    "DROP TRIGGER IF EXISTS dish_fts_ai",
+    "DROP TABLE IF EXISTS dish_fts",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        # FTS5 is SQLite-only; other backends keep the LIKE search
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0008_attendanceshard'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(FORWARD_SQL), _run(REVERSE_SQL)),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.0 on 2026-10-18 10:25
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def merge_duplicate_links(apps, schema_editor):
+    """
+    Collapse DateHasDish rows that link the same dish to the same date into
+    the oldest one, adding up their ratings and keeping the first quantity set.
+    """
+    DateHasDish = apps.get_model('common', 'DateHasDish')
+    duplicates = (
+        DateHasDish.objects
+        .values('date_saved', 'dish_id')
+        .annotate(n=Count('pk'), rating_sum_total=Sum('rating_sum'), rating_count_total=Sum('rating_count'))
+        .filter(n__gt=1)
+    )
+    for group in duplicates:
+        rows = list(
+            DateHasDish.objects
+            .filter(date_saved=group['date_saved'], dish_id=group['dish_id'])
+            .order_by('pk')
+        )
+        keeper = rows[0]
+        keeper.rating_sum = group['rating_sum_total']
+        keeper.rating_count = group['rating_count_total']
+        if keeper.quantity is None:
+            keeper.quantity = next((r.quantity for r in rows if r.quantity is not None), None)
+        keeper.save(update_fields=['rating_sum', 'rating_count', 'quantity'])
+        DateHasDish.objects.filter(pk__in=[r.pk for r in rows[1:]]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0009_dish_fts'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_links, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='datehasdish',
+            index=models.Index(fields=['dish_id', 'date_saved'], name='date_has_dish_dish_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(django.db.models.functions.comparison.Collate('dish_type', 'NOCASE'), models.F('dish_name'), name='dish_type_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(django.db.models.functions.comparison.Collate('dish_name', 'NOCASE'), name='dish_name_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='datehasdish',
+            constraint=models.UniqueConstraint(fields=('date_saved', 'dish_id'), name='date_has_dish_date_dish_uniq'),
+        ),
+    ]
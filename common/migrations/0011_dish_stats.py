@@ -0,0 +1,38 @@
+# Generated by Django 5.0 on 2026-10-18 10:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+POPULATE_SQL = """
+INSERT INTO dish_stats (dish_id, times_served, last_served, rating_sum, rating_count, attendance_sum)
+SELECT h.dish_id, COUNT(*), MAX(h.date), SUM(h.rating_sum), SUM(h.rating_count), COALESCE(SUM(d.attendance), 0)
+FROM date_has_dish AS h
+JOIN date_saved AS d ON d.date_saved = h.date
+GROUP BY h.dish_id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0010_date_has_dish_unique_and_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DishStats',
+            fields=[
+                ('dish_id', models.OneToOneField(db_column='dish_id', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='common.dish')),
+                ('times_served', models.PositiveIntegerField(default=0)),
+                ('last_served', models.DateField(null=True)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('rating_count', models.PositiveIntegerField(default=0)),
+                ('attendance_sum', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'dish_stats',
+            },
+        ),
+        migrations.RunSQL(POPULATE_SQL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,89 @@
+# Database-side change stamps for the in-process caches (see common/changes.py).
+#
+# Triggers bump change_version('menu') and record the new version against
+# every date whose links or dishes changed, whichever process (server,
+# management command, admin, shell) made the change.
+
+from django.db import migrations
+
+
+def _record_dates(select):
+    """
+    Bump the menu version and stamp the dates returned by ``select`` (a
+    SELECT of one date column) with it.
+    """
+    return f"""
+        UPDATE change_version SET version = version + 1 WHERE name = 'menu';
+        INSERT INTO menu_change (date, version)
+        SELECT changed.date, v.version FROM ({select}) AS changed, change_version AS v
+        WHERE v.name = 'menu'
+        ON CONFLICT(date) DO UPDATE SET version = excluded.version;
+    """
+
+
+FORWARD_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS change_version (
+        name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    "INSERT OR IGNORE INTO change_version (name, version) VALUES ('menu', 0)",
+    """
+    CREATE TABLE IF NOT EXISTS menu_change (
+        date DATE PRIMARY KEY,
+        version INTEGER NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS menu_change_version_idx ON menu_change (version)",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS menu_change_link_ai AFTER INSERT ON date_has_dish BEGIN
+        {_record_dates('SELECT new.date AS date')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS menu_change_link_ad AFTER DELETE ON date_has_dish BEGIN
+        {_record_dates('SELECT old.date AS date')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS menu_change_link_au AFTER UPDATE ON date_has_dish BEGIN
+        {_record_dates('SELECT new.date AS date UNION SELECT old.date')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS menu_change_dish_au AFTER UPDATE ON dish BEGIN
+        {_record_dates('SELECT date FROM date_has_dish WHERE dish_id = new.dish_id')}
+    END
+    """,
+]
+
+REVERSE_SQL = [
+    "DROP TRIGGER IF EXISTS menu_change_dish_au",
+    "DROP TRIGGER IF EXISTS menu_change_link_au",
+    "DROP TRIGGER IF EXISTS menu_change_link_ad",
+    "DROP TRIGGER IF EXISTS menu_change_link_ai",
+    "DROP TABLE IF EXISTS menu_change",
+    "DROP TABLE IF EXISTS change_version",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        # Triggers are written for SQLite; other backends rely on the in-process signals
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0011_dish_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(FORWARD_SQL), _run(REVERSE_SQL)),
+    ]
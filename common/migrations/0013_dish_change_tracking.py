@@ -0,0 +1,70 @@
+# Database-side change stamps for the dish catalog (see common/changes.py):
+# triggers bump change_version('dish') and record the new version against
+# every dish inserted, updated or deleted, whichever process made the change.
+
+from django.db import migrations
+
+
+def _record_dish(dish_id):
+    return f"""
+        UPDATE change_version SET version = version + 1 WHERE name = 'dish';
+        INSERT INTO dish_change (dish_id, version)
+        SELECT {dish_id}, version FROM change_version WHERE name = 'dish'
+        ON CONFLICT(dish_id) DO UPDATE SET version = excluded.version;
+    """
+
+
+FORWARD_SQL = [
+    "INSERT OR IGNORE INTO change_version (name, version) VALUES ('dish', 0)",
+    """
+    CREATE TABLE IF NOT EXISTS dish_change (
+        dish_id INTEGER PRIMARY KEY,
+        version INTEGER NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS dish_change_version_idx ON dish_change (version)",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS dish_change_ai AFTER INSERT ON dish BEGIN
+        {_record_dish('new.dish_id')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS dish_change_au AFTER UPDATE ON dish BEGIN
+        {_record_dish('new.dish_id')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS dish_change_ad AFTER DELETE ON dish BEGIN
+        {_record_dish('old.dish_id')}
+    END
+    """,
+]
+
+REVERSE_SQL = [
+    "DROP TRIGGER IF EXISTS dish_change_ad",
+    "DROP TRIGGER IF EXISTS dish_change_au",
+    "DROP TRIGGER IF EXISTS dish_change_ai",
+    "DROP TABLE IF EXISTS dish_change",
+    "DELETE FROM change_version WHERE name = 'dish'",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        # Triggers are written for SQLite; other backends rely on the in-process signals
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0012_change_tracking'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(FORWARD_SQL), _run(REVERSE_SQL)),
+    ]
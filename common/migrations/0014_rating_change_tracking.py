@@ -0,0 +1,77 @@
+# Narrows the link UPDATE trigger of 0012_change_tracking to the columns that
+# change which dishes are on which date. Rating and quantity updates stamp
+# change_version('rating') and rating_change instead, so common.changes can
+# send them as RATINGS and keep the forecast (see common/signals.py).
+
+from django.db import migrations
+
+
+def _record_dates(name, select):
+    """
+    Bump change_version(``name``) and stamp the dates returned by ``select``
+    with it in ``{name}_change``.
+    """
+    return f"""
+        UPDATE change_version SET version = version + 1 WHERE name = '{name}';
+        INSERT INTO {name}_change (date, version)
+        SELECT changed.date, v.version FROM ({select}) AS changed, change_version AS v
+        WHERE v.name = '{name}'
+        ON CONFLICT(date) DO UPDATE SET version = excluded.version;
+    """
+
+
+FORWARD_SQL = [
+    "INSERT OR IGNORE INTO change_version (name, version) VALUES ('rating', 0)",
+    """
+    CREATE TABLE IF NOT EXISTS rating_change (
+        date DATE PRIMARY KEY,
+        version INTEGER NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS rating_change_version_idx ON rating_change (version)",
+    "DROP TRIGGER IF EXISTS menu_change_link_au",
+    f"""
+    CREATE TRIGGER menu_change_link_au AFTER UPDATE OF date, dish_id ON date_has_dish BEGIN
+        {_record_dates('menu', 'SELECT new.date AS date UNION SELECT old.date')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS rating_change_link_au
+    AFTER UPDATE OF rating_sum, rating_count, quantity ON date_has_dish BEGIN
+        {_record_dates('rating', 'SELECT new.date AS date')}
+    END
+    """,
+]
+
+REVERSE_SQL = [
+    "DROP TRIGGER IF EXISTS rating_change_link_au",
+    "DROP TRIGGER IF EXISTS menu_change_link_au",
+    f"""
+    CREATE TRIGGER menu_change_link_au AFTER UPDATE ON date_has_dish BEGIN
+        {_record_dates('menu', 'SELECT new.date AS date UNION SELECT old.date')}
+    END
+    """,
+    "DROP TABLE IF EXISTS rating_change",
+    "DELETE FROM change_version WHERE name = 'rating'",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        # Triggers are written for SQLite; other backends rely on the in-process signals
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0013_dish_change_tracking'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(FORWARD_SQL), _run(REVERSE_SQL)),
+    ]
@@ -1,6 +1,7 @@
 # bbserver/common/models.py
 
 from django.db import models
+from django.db.models.functions import Collate
 
 
 class Dish(models.Model):
@@ -16,6 +17,11 @@ class Dish(models.Model):
 
     class Meta:
         db_table = 'dish'
+        indexes = [
+            # Category filter of search-dishes (case-insensitive, like dish_type__iexact)
+            models.Index(Collate('dish_type', 'NOCASE'), 'dish_name', name='dish_type_name_idx'),
+            models.Index(Collate('dish_name', 'NOCASE'), name='dish_name_idx'),
+        ]
 
 
 class DateSaved(models.Model):
@@ -46,4 +52,65 @@ class DateHasDish(models.Model):
         return self.rating_sum / self.rating_count
     
     class Meta:
-        db_table = 'date_has_dish'
\ No newline at end of file
+        db_table = 'date_has_dish'
+        constraints = [
+            # A dish is linked to a date at most once; also serves date range scans
+            models.UniqueConstraint(fields=['date_saved', 'dish_id'], name='date_has_dish_date_dish_uniq'),
+        ]
+        indexes = [
+            # Serving history and "last served" lookups per dish
+            models.Index(fields=['dish_id', 'date_saved'], name='date_has_dish_dish_date_idx'),
+        ]
+
+
+class AttendanceShard(models.Model):
+    """
+    One of ``settings.ATTENDANCE_SHARDS`` partial attendance counters for a
+    date. The reported attendance is ``DateSaved.attendance`` plus the sum of
+    its shards; ``common.counters.fold_attendance`` moves shard counts into
+    ``DateSaved.attendance``.
+    """
+    date_saved = models.ForeignKey(DateSaved, on_delete=models.CASCADE, db_column='date', related_name='shards')
+    shard = models.PositiveSmallIntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'attendance_shard'
+        constraints = [
+            models.UniqueConstraint(fields=['date_saved', 'shard'], name='attendance_shard_date_shard_uniq'),
+        ]
+
+
+class DishStats(models.Model):
+    """
+    Lifetime rollup of a dish's DateHasDish rows, kept in step by
+    ``common.dish_stats`` in the same transaction as the writes. A dish has a
+    row exactly when it is linked to at least one date.
+
+    ``attendance_sum`` adds up ``DateSaved.attendance`` of the dates the dish
+    is on; attendance still sitting in AttendanceShard rows is included when
+    it is folded.
+    """
+    dish_id = models.OneToOneField(
+        Dish, on_delete=models.CASCADE, primary_key=True, db_column='dish_id', related_name='stats',
+    )
+    times_served = models.PositiveIntegerField(default=0)
+    last_served = models.DateField(null=True)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    attendance_sum = models.IntegerField(default=0)
+
+    @property
+    def average_rating(self):
+        if self.rating_count == 0:
+            return None
+        return self.rating_sum / self.rating_count
+
+    @property
+    def average_attendance(self):
+        if self.times_served == 0:
+            return None
+        return self.attendance_sum / self.times_served
+
+    class Meta:
+        db_table = 'dish_stats'
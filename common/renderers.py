@@ -0,0 +1,24 @@
+# bbserver/common/renderers.py
+
+from rest_framework.renderers import JSONRenderer
+
+from .fastjson import dumps
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    DRF JSON renderer backed by ``common.fastjson.dumps``. Indented output
+    (browsable API, ``Accept: application/json; indent=4``) and types only
+    DRF's encoder knows (querysets, generators...) still go through DRF's
+    own renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type or '', renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            return dumps(data)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
@@ -1,5 +1,6 @@
 # bbserver/common/serializers.py
 
+from django.utils import timezone
 from rest_framework import serializers
 from common.models import DateSaved, DateHasDish, Dish
 
@@ -43,3 +44,71 @@ class DateHasDishSerializer(serializers.ModelSerializer):
     def get_average_rating(self, obj):
         return obj.average_rating
 
+
+
+# Row-oriented fast path: the same output as DishSerializer /
+# DateHasDishSerializer, built from values_list() tuples without DRF's
+# per-field machinery. common.tests.SerializerParityTests keeps them in step.
+
+DISH_FIELDS = (
+    'dish_id', 'dish_name', 'dish_description', 'dish_type', 'dish_calories',
+    'light_healthy', 'sugar_free', 'created_at', 'updated_at',
+)
+
+# DateHasDish columns for date_has_dish_row(), dish joined in the same query
+DATE_HAS_DISH_COLUMNS = (
+    'pk', 'date_saved', 'dish_id', *(f'dish_id__{field}' for field in DISH_FIELDS[1:]),
+    'quantity', 'rating_sum', 'rating_count',
+)
+_DISH_COLUMNS = slice(2, 2 + len(DISH_FIELDS))
+
+
+def format_datetime(value, tz):
+    """
+    Format a datetime like DRF's DateTimeField: ISO 8601 in ``tz`` (the
+    current time zone), UTC written as 'Z'.
+    """
+    if not value:
+        return None
+    value = value.astimezone(tz) if timezone.is_aware(value) else timezone.make_aware(value, tz)
+    text = value.isoformat()
+    return text[:-6] + 'Z' if text.endswith('+00:00') else text
+
+
+def dish_row(row, tz):
+    """
+    DishSerializer representation of a tuple of DISH_FIELDS values.
+    """
+    dish = dict(zip(DISH_FIELDS, row))
+    dish['created_at'] = format_datetime(dish['created_at'], tz)
+    dish['updated_at'] = format_datetime(dish['updated_at'], tz)
+    return dish
+
+
+def dish_rows(queryset):
+    tz = timezone.get_current_timezone()
+    return [dish_row(row, tz) for row in queryset.values_list(*DISH_FIELDS)]
+
+
+def date_has_dish_row(row, tz):
+    """
+    DateHasDishSerializer representation of a tuple of DATE_HAS_DISH_COLUMNS values.
+    """
+    rating_sum, rating_count = row[-2], row[-1]
+    return {
+        'date_has_dish_id': row[0],
+        'date_saved': {'date_saved': row[1].isoformat()},
+        'dish': dish_row(row[_DISH_COLUMNS], tz),
+        'quantity': row[-3],
+        'rating_sum': rating_sum,
+        'rating_count': rating_count,
+        'average_rating': rating_sum / rating_count if rating_count else None,
+    }
+
+
+def date_has_dish_rows(queryset):
+    """
+    Serialize a DateHasDish queryset with one joined query.
+    """
+    tz = timezone.get_current_timezone()
+    return [date_has_dish_row(row, tz) for row in queryset.values_list(*DATE_HAS_DISH_COLUMNS)]
@@ -0,0 +1,54 @@
+# bbserver/common/signals.py
+
+from datetime import date, datetime
+
+from django.db import transaction
+from django.dispatch import Signal
+
+# Sent once the transaction that changed the published menu has committed.
+# Receivers get ``dates``: a set of ``datetime.date`` objects whose dishes,
+# links or ratings changed, and ``kind``: MENU when links were added, moved
+# or removed or a dish was edited, RATINGS when only the ratings or
+# quantities of existing links changed.
+menu_changed = Signal()
+
+MENU = 'menu'
+RATINGS = 'ratings'
+
+# Sent by common.changes when another process added, changed or deleted
+# dishes, and by in-process raw writes that skip Dish post_save/post_delete
+# (see notify_dishes_changed). Receivers get ``dish_ids``: a set of ids, or
+# None if every dish may have changed.
+dishes_changed = Signal()
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value), '%Y-%m-%d').date()
+
+
+def notify_menu_changed(dates, kind=MENU):
+    """
+    Schedule a ``menu_changed`` signal of ``kind`` for the given dates (date
+    objects or 'YYYY-MM-DD' strings). Fires immediately in autocommit mode,
+    otherwise after the surrounding transaction commits.
+    """
+    changed = {_as_date(d) for d in dates}
+    if not changed:
+        return
+    transaction.on_commit(lambda: menu_changed.send(sender=None, dates=changed, kind=kind))
+
+
+def notify_dishes_changed(dish_ids):
+    """
+    Schedule a ``dishes_changed`` signal for dishes written without the
+    model signals (raw SQL, bulk operations). Fires immediately in autocommit
+    mode, otherwise after the surrounding transaction commits.
+    """
+    changed = set(dish_ids)
+    if not changed:
+        return
+    transaction.on_commit(lambda: dishes_changed.send(sender=None, dish_ids=changed))
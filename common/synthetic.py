@@ -0,0 +1,167 @@
+# bbserver/common/synthetic.py
+
+"""
+Deterministic synthetic menus for scale testing: a dish catalog, weekday
+DateSaved rows with attendance, and DateHasDish links with quantities and
+ratings. Everything is drawn from one seeded ``random.Random``, so the same
+arguments always produce the same rows.
+"""
+
+import random
+import time
+from datetime import date, timedelta
+
+from django.db import connection, transaction
+
+from common.changes import stamp, untracked
+from common.dish_stats import rebuild_dish_stats
+from common.models import Dish
+
+
+ADJECTIVES = ['grilled', 'roasted', 'spicy', 'creamy', 'baked', 'fried', 'steamed', 'smoked',
+              'braised', 'crispy', 'tangy', 'garlic', 'lemon', 'herb', 'honey', 'sweet']
+BASES = ['chicken', 'beef', 'salmon', 'tofu', 'lentil', 'chickpea', 'pork', 'turkey', 'cod',
+         'mushroom', 'potato', 'rice', 'noodle', 'pasta', 'vegetable', 'bean', 'egg', 'lamb']
+DISHES = ['soup', 'curry', 'stew', 'salad', 'bowl', 'wrap', 'pie', 'risotto', 'burger',
+          'lasagne', 'casserole', 'skewers', 'tacos', 'gratin', 'stir fry', 'pudding']
+EXTRAS = ['with rice', 'with salad', 'and greens', 'with fries', 'on toast', 'with couscous', '', '', '']
+TYPES = ['starter', 'main', 'dessert', 'side', 'vegetarian']
+# Pseudo-words (cuisines, house names...) so the catalog vocabulary grows with
+# its size instead of repeating the same few dozen words
+SYLLABLES = ['ka', 'lo', 'mi', 'ra', 'ten', 'bu', 'shi', 'zo', 'per', 'an', 'do', 'vel',
+             'qui', 'mar', 'sa', 'ti', 'gor', 'el', 'nu', 'fa', 'ros', 'che', 'la', 'po']
+
+
+def pseudo_word(rng):
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3)))
+
+
+def fake_dish(rng):
+    """
+    Return an unsaved Dish with a plausible synthetic name, drawn from ``rng``.
+    """
+    name = f"{pseudo_word(rng)} {rng.choice(ADJECTIVES)} {rng.choice(BASES)} {rng.choice(DISHES)} {rng.choice(EXTRAS)}"
+    name = name.strip()
+    return Dish(
+        dish_name=name.capitalize(),
+        dish_description=f"{rng.choice(ADJECTIVES)} {rng.choice(BASES)} {rng.choice(EXTRAS)}".strip(),
+        dish_type=rng.choice(TYPES),
+        dish_calories=rng.randint(150, 1200),
+        light_healthy=rng.random() < 0.3,
+        sugar_free=rng.random() < 0.2,
+    )
+
+
+# Relative attendance Monday..Friday
+WEEKDAY_FACTORS = (1.0, 1.05, 1.1, 1.0, 0.75)
+
+
+def clamp(value, low, high):
+    return max(low, min(high, value))
+
+
+def _batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def clear_menu_data():
+    """
+    Delete every dish, date and link (raw DELETEs; no per-row signals or
+    change stamps, the keys are stamped once).
+    """
+    with transaction.atomic(), untracked('dish_change_ad', 'menu_change_link_ad'):
+        stamp('dish', 'SELECT dish_id FROM dish')
+        stamp('menu', 'SELECT DISTINCT date FROM date_has_dish')
+        with connection.cursor() as cursor:
+            for table in ('dish_stats', 'date_has_dish', 'attendance_shard', 'date_saved', 'dish'):
+                cursor.execute(f'DELETE FROM {table}')
+
+
+def generate_menu_data(
+    *, start, end, today=None, seed=42, catalog_size=2000, dishes_per_day=8, sites=1,
+    attendance_mean=120.0, attendance_sd=25.0, rating_rate=0.25, rating_mean=3.8,
+    batch_size=10_000, log=None,
+):
+    """
+    Insert synthetic data for every weekday in [start, end].
+
+    ``sites`` multiplies both attendance and the number of dishes served per
+    day (the schema has no site column, so sites share the date rows). Days
+    after ``today`` are partially booked, unrated and have no quantity yet.
+
+    Returns a dict of row counts and the elapsed seconds.
+    """
+    rng = random.Random(seed)
+    today = today or date.today()
+    log = log or (lambda message: None)
+    started = time.perf_counter()
+    per_day = min(dishes_per_day * sites, catalog_size)
+
+    # The change-tracking triggers would stamp every row; stamp the new keys once instead
+    with transaction.atomic(), untracked('dish_change_ai', 'menu_change_link_ai'):
+        # Catalog (through the ORM so timestamps and the FTS triggers apply)
+        dishes = Dish.objects.bulk_create((fake_dish(rng) for _ in range(catalog_size)), batch_size=batch_size)
+        dish_ids = [dish.pk for dish in dishes]
+        quality = {pk: clamp(rng.gauss(rating_mean, 0.6), 1.0, 5.0) for pk in dish_ids}
+        log(f'{len(dish_ids)} dishes')
+
+        days = []
+        day = start
+        while day <= end:
+            if day.weekday() < 5:
+                days.append(day)
+            day += timedelta(days=1)
+
+        attendance = {}
+        for day in days:
+            expected = attendance_mean * sites * WEEKDAY_FACTORS[day.weekday()]
+            booked = max(0, round(rng.gauss(expected, attendance_sd * sites ** 0.5)))
+            if day > today:
+                booked = round(booked * rng.uniform(0.2, 0.8))
+            attendance[day] = booked
+
+        def links():
+            for day in days:
+                past = day <= today
+                share = attendance[day] / per_day
+                for dish_id in rng.sample(dish_ids, per_day):
+                    quantity = rating_sum = rating_count = None
+                    if past:
+                        quantity = max(0, round(share * rng.uniform(0.8, 1.4)))
+                        rating_count = max(0, round(rng.gauss(share * rating_rate, 1.5)))
+                        stars = clamp(rng.gauss(quality[dish_id], 0.4), 1.0, 5.0)
+                        rating_sum = clamp(round(rating_count * stars), rating_count, 5 * rating_count)
+                    yield (day, dish_id, quantity, rating_sum or 0, rating_count or 0)
+
+        with connection.cursor() as cursor:
+            for batch in _batched(((day, attendance[day]) for day in days), batch_size):
+                cursor.executemany('INSERT INTO date_saved (date_saved, attendance) VALUES (%s, %s)', batch)
+            log(f'{len(days)} dates')
+
+            link_count = 0
+            for batch in _batched(links(), batch_size):
+                cursor.executemany(
+                    'INSERT INTO date_has_dish (date, dish_id, quantity, rating_sum, rating_count) '
+                    'VALUES (%s, %s, %s, %s, %s)',
+                    batch,
+                )
+                link_count += len(batch)
+            log(f'{link_count} links')
+
+        rebuild_dish_stats()
+        stamp('dish', 'SELECT dish_id FROM dish WHERE dish_id >= %s', [min(dish_ids, default=0)])
+        stamp('menu', 'SELECT DISTINCT date FROM date_has_dish WHERE date BETWEEN %s AND %s', [start, end])
+
+    return {
+        'dishes': len(dish_ids),
+        'dates': len(days),
+        'links': link_count,
+        'seconds': time.perf_counter() - started,
+    }
@@ -1,3 +1,711 @@
-from django.test import TestCase
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import tempfile
+import uuid
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, connections
+from django.http import JsonResponse
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from booking.week_cache import week_menu_cache
+from chef_management.planner import apply_recommendations, plan_quantities
+from common import fastjson, log
+from common.changes import watcher
+from common.counters import attendance_total, attendance_totals, decrement, fold_attendance, increment
+from common.deletes import delete_links
+from common.dish_stats import check_dish_stats, rebuild_dish_stats
+from common.forecast import fit_forecast, forecaster
+from common.metrics import registry
+from common.models import AttendanceShard, Dish, DateSaved, DateHasDish, DishStats
+from common.renderers import FastJSONRenderer
+from common.serializers import DateHasDishSerializer, DishSerializer, date_has_dish_rows, dish_rows
+from common.signals import dishes_changed
+from common.synthetic import clear_menu_data, generate_menu_data
+
+# Tables whose full scans are a regression on a hot path. Scans of subquery
+# results and the FTS virtual table are fine.
+HOT_TABLES = ('dish', 'date_saved', 'date_has_dish', 'attendance_shard', 'dish_stats')
+FULL_SCAN_RE = re.compile(r'^SCAN (%s)\b' % '|'.join(HOT_TABLES))
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class QueryPlanTests(TestCase):
+    """
+    Run each endpoint, EXPLAIN QUERY PLAN every statement it issued and fail
+    if any of them falls back to a full scan of a hot table.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.monday = date(2025, 1, 13)
+        cls.dishes = Dish.objects.bulk_create([
+            Dish(dish_name=f'Dish {i}', dish_type='main' if i % 2 else 'starter') for i in range(20)
+        ])
+        days = [cls.monday + timedelta(days=i) for i in range(5)]
+        DateSaved.objects.bulk_create([DateSaved(date_saved=d, attendance=3) for d in days])
+        cls.links = DateHasDish.objects.bulk_create([
+            DateHasDish(date_saved_id=d, dish_id=cls.dishes[(i * 4 + j) % 20])
+            for i, d in enumerate(days) for j in range(4)
+        ])
+
+    def setUp(self):
+        week_menu_cache.clear()
+        # A refit reads the whole history by design; keep it out of the requests
+        forecaster.invalidate()
+        forecaster.current()
+
+    def assertNoFullScans(self, method, path, payload=None, **params):
+        with CaptureQueriesContext(connection) as queries:
+            if payload is None:
+                response = getattr(self.client, method)(path, params)
+            else:
+                response = getattr(self.client, method)(path, json.dumps(payload), content_type='application/json')
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertLess(response.status_code, 400, getattr(response, 'content', b''))
+
+        explained = 0
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE', 'WITH')):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                plan = [row[3] for row in cursor.fetchall()]
+            explained += 1
+            scans = [step for step in plan if FULL_SCAN_RE.match(step)]
+            self.assertFalse(scans, f"{method.upper()} {path} full scan {scans} in:\n{sql}")
+        return explained
+
+    def test_week_dishes(self):
+        self.assertTrue(self.assertNoFullScans('get', '/booking/week/', date='2025-01-15'))
+
+    def test_day_dishes(self):
+        self.assertTrue(self.assertNoFullScans('get', '/chef-management/day-dishes/2025-01-15/'))
+
+    def test_export(self):
+        self.assertTrue(self.assertNoFullScans('get', '/booking/export/', start='2025-01-01', end='2025-01-31'))
+
+    def test_attendance(self):
+        self.assertNoFullScans('post', '/booking/add-attendance/', ['2025-01-14', '2025-01-20'])
+        self.assertNoFullScans('delete', '/booking/remove-attendance/', ['2025-01-14'])
+        self.assertNoFullScans('post', '/booking/bulk-attendance/', [
+            {'date': '2025-01-14', 'delta': 1}, {'date': '2025-01-21', 'delta': 1},
+        ])
+
+    def test_rating(self):
+        dhd_id = self.links[0].pk
+        self.assertNoFullScans('get', '/booking/rate/', date_has_dish_id=dhd_id)
+        self.assertNoFullScans('post', '/booking/rate/', {'date_has_dish_id': dhd_id, 'rating': 4})
+        self.assertNoFullScans('post', '/booking/rate/batch/', {'items': [
+            {'date_has_dish_id': dhd_id, 'rating': 5}, {'date_has_dish_id': self.links[1].pk, 'rating': 3},
+        ]})
+        self.assertNoFullScans('get', '/booking/rate/batch/', ids=f'{dhd_id},{self.links[1].pk}')
+
+    def test_search(self):
+        # The default LIKE '%q%' mode cannot use an index by design
+        self.assertNoFullScans('get', '/chef-management/search-dishes/', q='dish', mode='fts')
+        self.assertNoFullScans('get', '/chef-management/search-dishes/', q='dish', mode='fts', category='MAIN')
+
+    def test_import(self):
+        self.assertNoFullScans('post', '/chef-management/import/', {'entries': [
+            {'date': '2025-01-13', 'existing_dish_id': self.dishes[0].pk},
+            {'dates': ['2025-01-14', '2025-01-27'], 'dish': {'dish_name': 'Dish 1', 'dish_type': 'main'}},
+        ]})
+
+    def test_clone(self):
+        payload = {
+            'source_start': '2025-01-13', 'source_end': '2025-01-17', 'target_start': '2025-01-20',
+            'weekdays': {'fri': 'mon'},
+        }
+        self.assertNoFullScans('post', '/chef-management/clone/', dict(payload, dry_run=True))
+        self.assertNoFullScans('post', '/chef-management/clone/', payload)
+
+    def test_create_and_delete_links(self):
+        self.assertNoFullScans('post', '/chef-management/create/', {
+            'existing_dish_id': self.dishes[0].pk, 'dates': ['2025-01-13', '2025-01-27'],
+        })
+        self.assertNoFullScans('delete', '/chef-management/delete-dish-from-date/', {
+            'date_has_dish_ids': [self.links[2].pk],
+        })
+
+    def test_catalog(self):
+        self.assertNoFullScans('get', '/chef-management/dishes/', limit=7, fields='dish_name,updated_at')
+        self.assertNoFullScans('get', '/chef-management/dishes/', after=self.dishes[7].pk, limit=7)
+        self.assertNoFullScans('get', '/chef-management/dishes/', dish_type='MAIN', fields='dish_type')
+        self.assertNoFullScans('get', '/chef-management/dishes/', updated_after='2025-01-01', sugar_free='false')
+
+    def test_dish_detail(self):
+        dish = self.dishes[0]
+        self.assertNoFullScans('get', f'/booking/dish/{dish.pk}/', limit=4)
+        self.assertNoFullScans('get', f'/booking/dish/{dish.pk}/', before='2025-01-15')
+
+    def test_deletes(self):
+        future = timezone.now().date() + timedelta(days=7)
+        DateSaved.objects.create(date_saved=future, attendance=0)
+        DateHasDish.objects.bulk_create([DateHasDish(date_saved_id=future, dish_id=d) for d in self.dishes[:12]])
+        increment(future, 1)
+        unused = Dish.objects.create(dish_name='Unused', dish_type='main')
+
+        self.assertNoFullScans('delete', '/chef-management/delete-dish-from-date/', {
+            'date_has_dish_ids': [self.links[0].pk, self.links[1].pk],
+        })
+        self.assertNoFullScans('delete', '/booking/delete-dishes/', {'dish_ids': [unused.pk]})
+        self.assertNoFullScans('delete', '/booking/delete-future-dates/', {'dates': [future.isoformat()]})
+        self.assertNoFullScans('delete', '/booking/date/2025-01-17/')
+
+
+class SerializerParityTests(TestCase):
+    """
+    The row fast path in common.serializers must render exactly the same JSON
+    as the DRF serializers it replaces.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        full = Dish.objects.create(
+            dish_name='Crème brûlée', dish_description='Burnt "cream"', dish_type='dessert',
+            dish_calories=450, light_healthy=False, sugar_free=True,
+        )
+        # Every nullable column left empty
+        bare = Dish.objects.create(dish_name='Soup', dish_type='main')
+        Dish.objects.filter(pk=bare.pk).update(created_at=None, updated_at=None)
+        DateSaved.objects.create(date_saved=date(2025, 1, 13), attendance=10)
+        DateHasDish.objects.create(date_saved_id=date(2025, 1, 13), dish_id=full, quantity=7, rating_sum=9, rating_count=2)
+        DateHasDish.objects.create(date_saved_id=date(2025, 1, 13), dish_id=bare)
+
+    def assertSameJson(self, fast, drf):
+        self.assertEqual(
+            json.dumps(fast, cls=DjangoJSONEncoder).encode(),
+            json.dumps(drf, cls=DjangoJSONEncoder).encode(),
+        )
+
+    def test_dish_rows(self):
+        dishes = Dish.objects.order_by('pk')
+        self.assertSameJson(dish_rows(dishes), DishSerializer(dishes, many=True).data)
+
+    def test_date_has_dish_rows(self):
+        links = DateHasDish.objects.order_by('pk')
+        self.assertSameJson(date_has_dish_rows(links), DateHasDishSerializer(links, many=True).data)
+
+    @override_settings(TIME_ZONE='Europe/Helsinki')
+    def test_non_utc_time_zone(self):
+        links = DateHasDish.objects.order_by('pk')
+        self.assertSameJson(date_has_dish_rows(links), DateHasDishSerializer(links, many=True).data)
+
+
+@override_settings(ATTENDANCE_SHARDS=4)
+class AttendanceCounterTests(TestCase):
+    """
+    Sharded increments, shard-aware totals and folding.
+    """
+
+    def test_increment_creates_rows(self):
+        increment(date(2025, 1, 13), 2)
+        increment('2025-01-13', 1)
+        self.assertEqual(DateSaved.objects.get(date_saved=date(2025, 1, 13)).attendance, 0)
+        self.assertEqual(AttendanceShard.objects.filter(date_saved=date(2025, 1, 13)).count(), 4)
+        self.assertEqual(attendance_total(date(2025, 1, 13)), 3)
+
+    def test_totals_include_shards(self):
+        DateSaved.objects.create(date_saved=date(2025, 1, 13), attendance=10)
+        DateSaved.objects.create(date_saved=date(2025, 1, 14), attendance=None)
+        increment(date(2025, 1, 13), 5)
+        increment(date(2025, 1, 13), -1)
+        self.assertEqual(
+            attendance_totals([date(2025, 1, 13), date(2025, 1, 14), date(2025, 1, 15)]),
+            {date(2025, 1, 13): 14, date(2025, 1, 14): 0},
+        )
+        self.assertIsNone(attendance_total(date(2025, 1, 15)))
+
+    def test_decrement_stops_at_zero(self):
+        DateSaved.objects.create(date_saved=date(2025, 1, 13), attendance=1)
+        increment(date(2025, 1, 13), 1)
+        self.assertIs(decrement(date(2025, 1, 13)), True)
+        self.assertIs(decrement(date(2025, 1, 13)), True)
+        self.assertIs(decrement(date(2025, 1, 13)), False)
+        self.assertEqual(attendance_total(date(2025, 1, 13)), 0)
+        self.assertIsNone(decrement(date(2025, 1, 15)))
+        self.assertFalse(DateSaved.objects.filter(date_saved=date(2025, 1, 15)).exists())
+
+    @override_settings(ALLOWED_HOSTS=['testserver'])
+    def test_remove_attendance_conflict(self):
+        DateSaved.objects.create(date_saved=date(2025, 1, 13), attendance=1)
+        DateSaved.objects.create(date_saved=date(2025, 1, 14), attendance=0)
+
+        def remove(*dates):
+            return self.client.delete('/booking/remove-attendance/', json.dumps(dates), content_type='application/json')
+
+        response = remove('2025-01-13', '2025-01-14')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(json.loads(response.content)['dates'], ['2025-01-14'])
+        self.assertEqual(attendance_total(date(2025, 1, 13)), 1)
+
+        self.assertEqual(remove('2025-01-13').status_code, 200)
+        self.assertEqual(remove('2025-01-13').status_code, 409)
+        self.assertEqual(attendance_total(date(2025, 1, 13)), 0)
+
+    def test_fold(self):
+        DateSaved.objects.create(date_saved=date(2025, 1, 13), attendance=10)
+        for _ in range(6):
+            increment(date(2025, 1, 13), 1)
+        increment(date(2025, 1, 14), 2)
+
+        self.assertEqual(fold_attendance([date(2025, 1, 13)]), 1)
+        self.assertEqual(DateSaved.objects.get(date_saved=date(2025, 1, 13)).attendance, 16)
+        self.assertFalse(AttendanceShard.objects.filter(date_saved=date(2025, 1, 13)).exclude(count=0).exists())
+        self.assertEqual(attendance_totals([date(2025, 1, 13), date(2025, 1, 14)]),
+                         {date(2025, 1, 13): 16, date(2025, 1, 14): 2})
+
+        self.assertEqual(fold_attendance(), 1)
+        self.assertEqual(fold_attendance(), 0)
+        self.assertFalse(AttendanceShard.objects.exclude(count=0).exists())
+        self.assertEqual(attendance_totals([date(2025, 1, 13), date(2025, 1, 14)]),
+                         {date(2025, 1, 13): 16, date(2025, 1, 14): 2})
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class DishStatsTests(TestCase):
+    """
+    Every write path keeps DishStats equal to a recomputation from DateHasDish.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dishes = Dish.objects.bulk_create([Dish(dish_name=f'Dish {i}', dish_type='main') for i in range(3)])
+        DateSaved.objects.bulk_create([
+            DateSaved(date_saved=date(2025, 1, 13), attendance=10),
+            DateSaved(date_saved=date(2025, 1, 14), attendance=20),
+        ])
+        cls.links = DateHasDish.objects.bulk_create([
+            DateHasDish(date_saved_id=date(2025, 1, 13), dish_id=cls.dishes[0], rating_sum=8, rating_count=2),
+            DateHasDish(date_saved_id=date(2025, 1, 14), dish_id=cls.dishes[0]),
+            DateHasDish(date_saved_id=date(2025, 1, 14), dish_id=cls.dishes[1]),
+        ])
+        rebuild_dish_stats()
+
+    def send(self, method, path, payload):
+        response = getattr(self.client, method)(path, json.dumps(payload), content_type='application/json')
+        self.assertLess(response.status_code, 400, response.content)
+
+    def test_rebuild(self):
+        stats = DishStats.objects.get(pk=self.dishes[0].pk)
+        self.assertEqual((stats.times_served, stats.last_served), (2, date(2025, 1, 14)))
+        self.assertEqual((stats.average_rating, stats.average_attendance), (4.0, 15.0))
+        self.assertFalse(DishStats.objects.filter(pk=self.dishes[2].pk).exists())
+
+    def test_write_paths(self):
+        self.send('post', '/chef-management/create/', {
+            'existing_dish_id': self.dishes[2].pk, 'dates': ['2025-01-13', '2025-01-20'],
+        })
+        self.send('post', '/booking/rate/', {'date_has_dish_id': self.links[1].pk, 'rating': 5})
+        self.send('put', '/booking/rate/', {'date_has_dish_id': self.links[1].pk, 'old_rating': 5, 'new_rating': 3})
+        self.send('post', '/booking/rate/batch/', {'items': [
+            {'date_has_dish_id': self.links[0].pk, 'rating': 2}, {'date_has_dish_id': self.links[2].pk, 'rating': 4},
+        ]})
+        self.send('delete', '/booking/rate/', {'date_has_dish_id': self.links[0].pk, 'rating': 2})
+        self.send('post', '/booking/bulk-attendance/', [
+            {'date': '2025-01-14', 'delta': 1}, {'date': '2025-01-21', 'delta': 1},
+        ])
+        self.send('post', '/booking/add-attendance/', ['2025-01-13', '2025-01-13'])
+        self.send('delete', '/booking/remove-attendance/', ['2025-01-14'])
+        # Pending shards are folded before comparing or recomputing
+        self.assertEqual(check_dish_stats(), [])
+        self.assertEqual(DishStats.objects.get(pk=self.dishes[2].pk).attendance_sum, 12)
+        increment(date(2025, 1, 13), 1)
+        self.send('post', '/chef-management/create/', {'existing_dish_id': self.dishes[0].pk, 'dates': ['2025-01-27']})
+        self.assertEqual(DishStats.objects.get(pk=self.dishes[0].pk).attendance_sum, 33)
+        self.assertEqual(check_dish_stats(), [])
+        self.send('delete', '/chef-management/delete-dish-from-date/', {'date_has_dish_ids': [self.links[2].pk]})
+        self.assertEqual(check_dish_stats(), [])
+        self.assertFalse(DishStats.objects.filter(pk=self.dishes[1].pk).exists())
+
+
+class SyntheticDataTests(TestCase):
+    """
+    Generated menus bypass the per-row change triggers but are still
+    stamped, once, for the other processes.
+    """
+
+    def versions(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT name, version FROM change_version')
+            return dict(cursor.fetchall())
+
+    def test_stamps_once(self):
+        watcher.poll(force=True)
+        before = self.versions()
+        counts = generate_menu_data(start=date(2025, 1, 6), end=date(2025, 1, 17), today=date(2025, 1, 10),
+                                    catalog_size=30, dishes_per_day=4)
+        after = self.versions()
+        self.assertEqual((after['menu'] - before['menu'], after['dish'] - before['dish']), (1, 1))
+
+        received = []
+        dishes_changed.connect(lambda sender, dish_ids, **kwargs: received.append(dish_ids), weak=False,
+                               dispatch_uid='test_stamps_once')
+        self.addCleanup(dishes_changed.disconnect, dispatch_uid='test_stamps_once')
+        self.assertEqual(len(watcher.poll(force=True)), counts['dates'])
+        self.assertEqual(received, [set(Dish.objects.values_list('pk', flat=True))])
+
+        # The triggers are back for later writes
+        DateHasDish.objects.filter(date_saved_id=date(2025, 1, 6)).delete()
+        self.assertEqual(self.versions()['menu'], after['menu'] + 4)
+
+        clear_menu_data()
+        self.assertEqual(self.versions()['menu'], after['menu'] + 5)
+
+
+class ForecastTests(SimpleTestCase):
+    """
+    fit_forecast recovers weekday levels, trend and a dish effect from
+    noiseless history.
+    """
+
+    def test_recovers_model(self):
+        start, today = date(2020, 1, 6), date(2024, 1, 1)
+        days = [start + timedelta(days=i) for i in range((today - start).days + 28)]
+        days = [d for d in days if d.weekday() < 5]
+        # Dish 1 is served every Wednesday and draws 40 extra diners; every day also has dish 2
+        links = [(i, 2) for i in range(len(days))] + [(i, 1) for i, d in enumerate(days) if d.weekday() == 2]
+        attendance = [
+            100 + 10 * d.weekday() + 5 * (d - start).days / 365.25 + (40 / 2 if d.weekday() == 2 else 0)
+            for d in days
+        ]
+        forecast = fit_forecast(
+            np.array([d.toordinal() for d in days]), np.array(attendance, dtype=float),
+            np.array([i for i, _ in links]), np.array([dish for _, dish in links]), today,
+        )
+        self.assertEqual(len(forecast.attendance), 20)
+        self.assertEqual(forecast.trained_dates, sum(d < today for d in days))
+        for day, value in forecast.attendance.items():
+            expected = attendance[days.index(day)]
+            self.assertAlmostEqual(value, expected, delta=1)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class ForecastInvalidationTests(TestCase):
+    """
+    Ratings leave the fitted forecast alone; menu changes drop it.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        today = timezone.now().date()
+        past = [today - timedelta(days=i) for i in range(1, 4)]
+        DateSaved.objects.bulk_create([DateSaved(date_saved=d, attendance=50) for d in past])
+        cls.links = DateHasDish.objects.bulk_create([
+            DateHasDish(date_saved_id=d, dish_id=Dish.objects.create(dish_name=f'Dish {d}', dish_type='main'))
+            for d in past
+        ])
+
+    def setUp(self):
+        # Take the fixture's change stamps first, so a poll in the request cannot drop the forecast
+        watcher.poll(force=True)
+        forecaster.invalidate()
+        self.fitted = forecaster.current()
+
+    def test_rating_keeps_forecast(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/booking/rate/', json.dumps({'date_has_dish_id': self.links[0].pk, 'rating': 4}),
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200, response.content)
+        with mock.patch('common.forecast.fit_forecast') as fit:
+            self.assertIs(forecaster.current(), self.fitted)
+        fit.assert_not_called()
+
+    def test_menu_change_drops_forecast(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            delete_links([self.links[0].pk])
+        self.assertIsNone(forecaster.cached())
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class PlanQuantitiesTests(TestCase):
+    """
+    The planner fills empty quantities from each dish's past portions per
+    diner and keeps quantities a chef already set.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        today = timezone.now().date()
+        cls.upcoming = today + timedelta(days=7)
+        cls.popular, cls.rare = Dish.objects.bulk_create([
+            Dish(dish_name='Popular', dish_type='main'), Dish(dish_name='Rare', dish_type='main'),
+        ])
+        past = [today - timedelta(days=7 * i) for i in range(1, 11)]
+        DateSaved.objects.bulk_create([DateSaved(date_saved=d, attendance=100) for d in past + [cls.upcoming]])
+        DateHasDish.objects.bulk_create(
+            [DateHasDish(date_saved_id=d, dish_id=cls.popular, quantity=60) for d in past]
+            + [DateHasDish(date_saved_id=d, dish_id=cls.rare, quantity=20) for d in past]
+        )
+        cls.links = DateHasDish.objects.bulk_create([
+            DateHasDish(date_saved_id=cls.upcoming, dish_id=cls.popular),
+            DateHasDish(date_saved_id=cls.upcoming, dish_id=cls.rare, quantity=5),
+        ])
+
+    def setUp(self):
+        forecaster.invalidate()
+
+    def plan(self, **payload):
+        payload.update(start=self.upcoming.isoformat(), end=self.upcoming.isoformat())
+        response = self.client.post('/chef-management/plan-quantities/', json.dumps(payload), content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return json.loads(response.content)
+
+    def test_plan(self):
+        result = self.plan(dry_run=True)
+        popular, rare = [r['recommended'] for r in result['recommendations']]
+        self.assertGreater(popular, rare)
+        self.assertEqual(result['updated'], 0)
+
+        self.assertEqual(self.plan()['updated'], 1)
+        self.assertEqual(DateHasDish.objects.get(pk=self.links[0].pk).quantity, popular)
+        self.assertEqual(DateHasDish.objects.get(pk=self.links[1].pk).quantity, 5)
+
+        self.assertEqual(self.plan(overwrite=True)['updated'], 1)
+        self.assertEqual(DateHasDish.objects.get(pk=self.links[1].pk).quantity, rare)
+
+    def test_history_includes_unfolded_attendance(self):
+        expected = [r['recommended'] for r in self.plan(dry_run=True)['recommendations']]
+        past = DateSaved.objects.filter(date_saved__lt=self.upcoming)
+        AttendanceShard.objects.bulk_create([AttendanceShard(date_saved=d, shard=0, count=100) for d in past])
+        past.update(attendance=0)
+        forecaster.invalidate()
+        self.assertEqual([r['recommended'] for r in self.plan(dry_run=True)['recommendations']], expected)
+
+    def test_apply_keeps_quantity_set_after_planning(self):
+        _, recommendations = plan_quantities(self.upcoming, self.upcoming)
+        DateHasDish.objects.filter(pk=self.links[0].pk).update(quantity=7)
+        self.assertEqual(apply_recommendations(recommendations), 0)
+        self.assertEqual(DateHasDish.objects.get(pk=self.links[0].pk).quantity, 7)
+
+    def test_apply_writes_with_one_update(self):
+        DateHasDish.objects.filter(pk=self.links[1].pk).update(quantity=None)
+        _, recommendations = plan_quantities(self.upcoming, self.upcoming)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(apply_recommendations(recommendations), 2)
+        updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE date_has_dish')]
+        self.assertEqual(len(updates), 1)
+        for link, recommendation in zip(self.links, recommendations):
+            self.assertEqual(DateHasDish.objects.get(pk=link.pk).quantity, recommendation.recommended)
+
+
+class LogPipelineTests(SimpleTestCase):
+    """
+    JSON formatting, sampling and the batching queue handler of common.log.
+    """
+
+    def record(self, name='booking.views', level=logging.INFO, msg='hello %s', args=('world',), **extra):
+        record = logging.makeLogRecord({'name': name, 'levelno': level, 'levelname': logging.getLevelName(level),
+                                        'msg': msg, 'args': args})
+        record.__dict__.update(extra)
+        return record
+
+    def test_json_formatter(self):
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            record = self.record(timing={'total_ms': 1.5}, exc_info=sys.exc_info())
+        entry = json.loads(log.JsonFormatter().format(record))
+        self.assertEqual(
+            {key: entry[key] for key in ('level', 'logger', 'msg', 'timing')},
+            {'level': 'INFO', 'logger': 'booking.views', 'msg': 'hello world', 'timing': {'total_ms': 1.5}},
+        )
+        self.assertIn('ValueError: boom', entry['exc'])
+        self.assertTrue(entry['ts'].endswith('+00:00'))
+
+    def test_parse_levels(self):
+        self.assertEqual(log.parse_levels(' booking=debug, ,bad,common.db=WARNING'),
+                         {'booking': 'DEBUG', 'common.db': 'WARNING'})
+        self.assertEqual(log.parse_levels(''), {})
+
+    def test_sampling_filter(self):
+        sampling = log.SamplingFilter('booking=0,booking.views=1')
+        self.assertTrue(sampling.filter(self.record('booking.views.detail')))
+        self.assertFalse(sampling.filter(self.record('booking.export')))
+        self.assertFalse(sampling.filter(self.record('booking')))
+        self.assertTrue(sampling.filter(self.record('booking', level=logging.WARNING)))
+        self.assertTrue(sampling.filter(self.record('bookingbite.timing')))
+
+    def test_full_queue_drops(self):
+        handler = log.DroppingQueueHandler(queue.Queue(maxsize=1))
+        handler.handle(self.record())
+        handler.handle(self.record())
+        self.assertEqual(handler.dropped, 1)
+
+    def test_batching_handler(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'logs', 'test.log')
+            handler = log.queue_handler(filename, batch_size=4)
+            # The writer thread starts with the first record
+            self.assertNotIn(handler.listener, log._listeners)
+            try:
+                for i in range(10):
+                    handler.handle(self.record(msg='line %d', args=(i,), request_id=i))
+                self.assertIn(handler.listener, log._listeners)
+            finally:
+                handler.listener.stop()
+                log._listeners.remove(handler.listener)
+                for target in handler.listener.handlers:
+                    target.close()
+            with open(filename, encoding='utf-8') as f:
+                entries = [json.loads(line) for line in f]
+        self.assertEqual([(e['msg'], e['request_id']) for e in entries], [(f'line {i}', i) for i in range(10)])
+
+
+class FastJsonTests(SimpleTestCase):
+    """
+    The orjson path and the stdlib fallback of common.fastjson produce the
+    same bytes, and the same values as JsonResponse.
+    """
+    data = {
+        'datetime': datetime(2025, 1, 13, 12, 30, 5, 123456, tzinfo=dt_timezone.utc),
+        'date': date(2025, 1, 13),
+        'time': time(7, 5, 1, 250000),
+        'duration': timedelta(days=1, seconds=5),
+        'decimal': Decimal('1.50'),
+        'uuid': uuid.UUID(int=5),
+        'text': 'Crème "brûlée" \u2713',
+        'values': [1, 2.5, -0.1, None, True, {'nested': []}],
+    }
+
+    def stdlib_dumps(self, data):
+        with mock.patch.object(fastjson, 'orjson', None):
+            return fastjson.dumps(data)
+
+    def test_backends_match(self):
+        self.assertEqual(fastjson.dumps(self.data), self.stdlib_dumps(self.data))
+        self.assertEqual(json.loads(fastjson.dumps(self.data)), json.loads(JsonResponse(self.data).content))
+
+    def test_orjson_unsupported_values_fall_back(self):
+        data = {'big': 2 ** 70, 1: 'int key'}
+        self.assertEqual(fastjson.dumps(data), self.stdlib_dumps(data))
+        self.assertEqual(json.loads(fastjson.dumps(data)), {'big': 2 ** 70, '1': 'int key'})
+
+    def test_response_and_renderer(self):
+        response = fastjson.FastJsonResponse(self.data)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.content, fastjson.dumps(self.data))
+        with self.assertRaises(TypeError):
+            fastjson.FastJsonResponse([1])
+        self.assertEqual(FastJSONRenderer().render(self.data), fastjson.dumps(self.data))
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+
+class SqlitePragmaTests(TestCase):
+    """
+    The connection profile of common.db is applied to every new connection.
+    """
+
+    def read(self, conn):
+        values = {}
+        with conn.cursor() as cursor:
+            for name in ('journal_mode', 'synchronous', 'busy_timeout', 'mmap_size', 'cache_size', 'temp_store'):
+                cursor.execute(f'PRAGMA {name}')
+                row = cursor.fetchone()
+                # mmap_size has no value on an in-memory database
+                values[name] = row[0] if row else None
+        return values
+
+    def test_test_connection(self):
+        pragmas = self.read(connection)
+        expected = settings.SQLITE_PRAGMAS
+        self.assertEqual(pragmas['busy_timeout'], int(expected['busy_timeout']))
+        self.assertEqual(pragmas['cache_size'], int(expected['cache_size']))
+
+    @override_settings(SQLITE_PRAGMAS={
+        'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'busy_timeout': '4321', 'mmap_size': '1048576',
+        'cache_size': '-2048', 'temp_store': 'MEMORY',
+    })
+    def test_file_connection(self):
+        # WAL needs a database file; the test database is in memory
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        conn = connections['default'].__class__(
+            {**connections['default'].settings_dict, 'NAME': os.path.join(tmpdir.name, 'db.sqlite3')}
+        )
+        self.addCleanup(conn.close)
+        self.assertEqual(self.read(conn), {
+            'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 4321, 'mmap_size': 1048576,
+            'cache_size': -2048, 'temp_store': 2,
+        })
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class ServerTimingTests(TestCase):
+    """
+    ServerTimingMiddleware reports db, view and total time in a
+    Server-Timing header.
+    """
+
+    def setUp(self):
+        week_menu_cache.clear()
+
+    def test_header(self):
+        DateSaved.objects.create(date_saved=date(2025, 1, 13), attendance=3)
+        response = self.client.get('/booking/week/', {'date': '2025-01-13'})
+        entries = {}
+        for entry in response['Server-Timing'].split(', '):
+            name, *params = entry.split(';')
+            entries[name] = dict(param.split('=', 1) for param in params)
+
+        self.assertTrue({'db', 'view', 'total'} <= set(entries), entries)
+        durations = {name: float(params['dur']) for name, params in entries.items()}
+        self.assertTrue(all(value >= 0 for value in durations.values()), durations)
+        self.assertGreaterEqual(durations['total'], durations['view'])
+        self.assertRegex(entries['db']['desc'], r'^"[1-9]\d* queries"$')
+
+    @override_settings(SERVER_TIMING=False)
+    def test_disabled(self):
+        self.assertNotIn('Server-Timing', self.client.get('/booking/week/', {'date': '2025-01-13'}))
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class MetricsMiddlewareTests(TestCase):
+    """
+    MetricsMiddleware records each request in common.metrics.registry.
+    """
+
+    def test_request_recorded(self):
+        week = ('week_dishes', 'GET', 200)
+        before = registry.collect()
+        self.client.get('/booking/week/', {'date': '2025-01-13'})
+        self.client.get('/no-such-page/')
+        after = registry.collect()
+
+        self.assertEqual(after['requests'][week], before['requests'].get(week, 0) + 1)
+        unmatched = ('unmatched', 'GET', 404)
+        self.assertEqual(after['requests'][unmatched], before['requests'].get(unmatched, 0) + 1)
+        latency_before = before['latency'].get(('week_dishes', 'GET'))
+        self.assertEqual(
+            sum(after['latency'][('week_dishes', 'GET')][:-1]),
+            (sum(latency_before[:-1]) if latency_before else 0) + 1,
+        )
+        self.assertEqual(after['in_flight'], 0)
+        self.assertIn(
+            'bookingbite_requests_total{view="week_dishes",method="GET",status="200"}',
+            self.client.get('/metrics/').content.decode(),
+        )
+
+    def test_metrics_restricted(self):
+        self.assertEqual(self.client.get('/metrics/', REMOTE_ADDR='194.9.161.1').status_code, 404)
+        # IIS proxies from loopback
+        self.assertEqual(self.client.get('/metrics/', HTTP_X_FORWARDED_FOR='194.9.161.1').status_code, 404)
+        with override_settings(METRICS_ALLOWED_IPS=['10.0.0.5']):
+            self.assertEqual(self.client.get('/metrics/', REMOTE_ADDR='10.0.0.5').status_code, 200)
+            self.assertEqual(self.client.get('/metrics/').status_code, 404)
@@ -0,0 +1,91 @@
+# bbserver/common/timing.py
+
+"""
+Per-request timing record used by ``common.middleware.ServerTimingMiddleware``.
+
+The middleware puts a ``RequestTiming`` into a context variable for the
+duration of the request; code below it adds named spans with ``timed()``.
+``record_sql`` is installed on every database connection (see
+``common.apps``) and charges each query to the current request's record. A
+context variable follows the request into the threads async views use for
+the ORM, where a per-request ``connection.execute_wrapper`` would not reach.
+Outside a request both are no-ops.
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+
+_current = contextvars.ContextVar('request_timing', default=None)
+
+
+class RequestTiming:
+    """
+    SQL query count/time and named span durations (seconds) for one request.
+    """
+    __slots__ = ('queries', 'sql', 'spans')
+
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0.0
+        self.spans = {}
+
+    def add(self, name, seconds):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def record_sql(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql += time.perf_counter() - started
+            self.queries += 1
+
+
+def record_sql(execute, sql, params, many, context):
+    """
+    Database execute wrapper: time the query into the current request, if any.
+    """
+    timing = _current.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    return timing.record_sql(execute, sql, params, many, context)
+
+
+def install_sql_timer(sender, connection, **kwargs):
+    """
+    connection_created receiver adding record_sql to every new connection.
+    """
+    # At the bottom of the stack: connection.execute_wrapper() pops the last
+    # entry when its block exits, and the connection may have been opened
+    # inside such a block
+    if record_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_sql)
+
+
+def current_timing():
+    return _current.get()
+
+
+def activate(timing):
+    return _current.set(timing)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+@contextmanager
+def timed(name):
+    """
+    Add the time spent in the block to span ``name`` of the current request.
+    """
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(name, time.perf_counter() - started)
@@ -1,3 +1,23 @@
-from django.shortcuts import render
+# bbserver/common/views.py
 
-# Create your views here.
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.views.decorators.http import require_GET
+
+from .metrics import registry
+
+
+@require_GET
+def metrics(request):
+    """
+    Request metrics in the Prometheus text format:
+    GET /metrics/
+
+    Only served to METRICS_ALLOWED_IPS (loopback by default) and never
+    through a proxy: IIS forwards from 127.0.0.1 too, but adds
+    X-Forwarded-For. Anyone else gets a 404.
+    """
+    allowed = getattr(settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1', '::1'])
+    if request.META.get('REMOTE_ADDR') not in allowed or 'HTTP_X_FORWARDED_FOR' in request.META:
+        raise Http404
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')